@@ -0,0 +1,166 @@
+"""
+端到端吞吐量基准（基于本地 OpenList 替身，无需真实存储）
+
+对每个目录规模（默认 10 / 1000 / 50000 个文件）分别测量：
+  list    分页列出整个源目录（OpenListAPI.get_all_files_from_dir）
+  rename  按命名规则生成计划并提交重命名（OpenListAPI.rename_file；命名规整时使用正则重命名）
+  copy    分块提交复制任务（OpenListAPI.copy_file，只计提交）
+  ingest  批量模式处理一个剧集的完整流程（main.ingest_show：列目录 → 重命名 → 建目录 → 复制 → 跟踪 → 校验）
+
+    python benchmarks/bench_e2e.py
+    python benchmarks/bench_e2e.py --sizes 10,1000 --latency 0.02 --error-rate 0.01 --json bench_e2e.json
+    python benchmarks/bench_e2e.py --uniform   # 源目录命名规整，比较正则重命名的请求数与请求体大小
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main as app  # noqa: E402
+from copy_tracker import format_bytes  # noqa: E402
+from fake_openlist import FakeOpenList  # noqa: E402
+from journal import Journal  # noqa: E402
+from oplist_api import OpenListAPI  # noqa: E402
+from rename_rules import MAX_REGEX_RULES, RenameRules  # noqa: E402
+from request_policy import RequestPolicy  # noqa: E402
+
+SOURCE = "/share/一起去看流星雨"
+LIBRARY = "/lib"
+
+
+def make_server(args, files):
+    server = FakeOpenList(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                          error_kind=args.error_kind, task_duration=args.task_duration)
+    server.add_show(SOURCE, files, uniform=args.uniform)
+    server.mkdir(LIBRARY)
+    server.start()
+    return server
+
+
+async def connect(server):
+    # 基准只关心吞吐量，重试等待缩短到毫秒级
+    api = OpenListAPI(server.url, policy=RequestPolicy(base_delay=0.01, max_delay=0.1, failure_threshold=1000))
+    await api.open()
+    _, token = await api.get_token({"username": server.username, "password": server.password})
+    await api.verify_token(token)
+    return api
+
+
+def requests_made(server, before):
+    return sum(server.stats.values()) - before
+
+
+def bytes_sent(api):
+    return sum(s["request_bytes"] for s in api.metrics.summary().values())
+
+
+async def bench_api(args, files):
+    """list / rename / copy 三项"""
+    server = make_server(args, files)
+    api = await connect(server)
+    results = {}
+    try:
+        before = sum(server.stats.values())
+        start = time.perf_counter()
+        entries = await api.get_all_files_from_dir(SOURCE, refresh=True)
+        results["list"] = {"items": len(entries), "s": time.perf_counter() - start,
+                           "requests": requests_made(server, before)}
+
+        rules = RenameRules()
+        names = [entry["name"] for entry in entries]
+        plan = rules.plan(names, "YiQiQuKanLiuXingYu")
+        # 与 main.plan_seasons 相同：正则规则数不多于按块提交的请求数时才采用
+        regex_rules = rules.regex_plan(names, "YiQiQuKanLiuXingYu",
+                                       max_rules=min(MAX_REGEX_RULES, math.ceil(len(plan) / api.chunk_size)))
+        before, sent = sum(server.stats.values()), bytes_sent(api)
+        start = time.perf_counter()
+        renamed = await api.rename_file(SOURCE, plan, regex_rules=regex_rules)
+        results["rename"] = {"items": len(renamed.succeeded), "s": time.perf_counter() - start,
+                             "requests": requests_made(server, before), "failed": len(renamed.failed),
+                             "request_bytes": bytes_sent(api) - sent, "regex": bool(regex_rules)}
+
+        dst = f"{LIBRARY}/copy"
+        await api.mkdir(dst)
+        names = [entry["name"] async for entry in api.iter_dir(SOURCE)]
+        before = sum(server.stats.values())
+        start = time.perf_counter()
+        copied = await api.copy_file(SOURCE, dst, names)
+        results["copy"] = {"items": len(copied.succeeded), "s": time.perf_counter() - start,
+                           "requests": requests_made(server, before), "failed": len(copied.failed)}
+    finally:
+        await api.close()
+        server.stop()
+    return results
+
+
+async def bench_ingest(args, files, journal_dir):
+    """main.ingest_show 的完整流程"""
+    server = make_server(args, files)
+    app.HEADLESS = True
+    app.journal = Journal(os.path.join(journal_dir, f"journal_{files}.jsonl"))
+    app.oplist_api = await connect(server)
+    try:
+        before = sum(server.stats.values())
+        start = time.perf_counter()
+        result = await app.ingest_show({"source": SOURCE, "library": LIBRARY, "sync": True})
+        return {"items": files + 1, "s": time.perf_counter() - start, "requests": requests_made(server, before),
+                "status": result["status"], "error": result.get("error", "")}
+    finally:
+        await app.oplist_api.close()
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端吞吐量基准")
+    parser.add_argument("--sizes", default="10,1000,50000", help="源目录文件数，逗号分隔")
+    parser.add_argument("--latency", type=float, default=0.005, help="替身服务器每个请求的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机附加延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="请求注入错误的概率")
+    parser.add_argument("--error-kind", choices=("http", "code", "reset"), default="http")
+    parser.add_argument("--task-duration", type=float, default=0.0, help="每个复制任务耗时（秒）")
+    parser.add_argument("--uniform", action="store_true", help="源目录命名规整（只有集数不同），可用正则重命名")
+    parser.add_argument("--skip-ingest", action="store_true", help="不测量 ingest")
+    parser.add_argument("--verbose", action="store_true", help="输出程序日志")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL,
+                        format="[%(levelname)s][%(asctime)s] %(message)s", datefmt="%H:%M:%S")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = {"latency": args.latency, "error_rate": args.error_rate, "uniform": args.uniform, "sizes": {}}
+    ok = True
+    with tempfile.TemporaryDirectory() as journal_dir:
+        for files in sizes:
+            results = asyncio.run(bench_api(args, files))
+            if not args.skip_ingest:
+                results["ingest"] = asyncio.run(bench_ingest(args, files, journal_dir))
+            report["sizes"][files] = results
+            print(f"== {files} 个文件")
+            for name, r in results.items():
+                rate = r["items"] / r["s"] if r["s"] > 0 else 0
+                extra = ""
+                if "request_bytes" in r:
+                    extra += f"，请求体 {format_bytes(r['request_bytes'])}" + ("（正则）" if r.get("regex") else "")
+                if r.get("failed"):
+                    extra += f"，失败 {r['failed']} 项"
+                if r.get("status") and r["status"] != "ok":
+                    extra += f"，失败: {r['error']}"
+                print(f"  {name:<7}{r['s'] * 1000:10.1f} ms {rate:12,.0f} 项/秒 {r['requests']:6d} 个请求{extra}")
+                r["items_per_s"] = round(rate)
+                r["s"] = round(r["s"], 4)
+                ok = ok and not r.get("failed") and r.get("status", "ok") == "ok"
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+"""
+本地目录索引的搜索延迟基准
+
+向内存中的 RemoteIndex 写入合成目录树（默认 10 万个目录），测量逐字输入时每次模糊搜索的耗时。
+最慢一次超过 --max-ms 毫秒时以非零退出码结束，用于发现搜索性能回退。
+
+    python benchmarks/bench_index.py
+    python benchmarks/bench_index.py --dirs 200000 --max-ms 50 --json bench_index.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from remote_index import RemoteIndex  # noqa: E402
+
+WORDS = ("一起去看流星雨", "流星花园", "仙剑奇侠传", "甄嬛传", "琅琊榜", "Breaking Bad", "The Office",
+         "Friends", "Season", "合集", "国语", "1080P", "4K", "完结", "字幕组")
+# 模拟逐字输入，每个前缀搜索一次
+QUERIES = ("流星花园", "lang", "Breaking", "s02", "仙剑3")
+
+
+def build(index, dirs, seed=0):
+    """生成约 dirs 个目录：/share/分类/剧名/季"""
+    rng = random.Random(seed)
+    count = 0
+    categories = [f"分类{i}" for i in range(max(1, dirs // 2000))]
+    index.update_dir("/share", [{"name": c, "is_dir": True, "modified": "t"} for c in categories])
+    count += len(categories)
+    per_category = max(1, (dirs - count) // len(categories) // 4)
+    for category in categories:
+        shows = [f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.randint(1, 99999)}" for _ in range(per_category)]
+        index.update_dir(f"/share/{category}", [{"name": s, "is_dir": True, "modified": "t"} for s in shows])
+        for show in shows:
+            index.update_dir(f"/share/{category}/{show}",
+                             [{"name": f"S{n}", "is_dir": True, "modified": "t"} for n in range(1, 4)])
+        count += per_category * 4
+    return len(index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地目录索引搜索延迟基准")
+    parser.add_argument("--dirs", type=int, default=100_000, help="合成目录数量")
+    parser.add_argument("--max-ms", type=float, default=100.0, help="单次搜索的最长允许耗时（毫秒）")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    index = RemoteIndex(":memory:")
+    start = time.perf_counter()
+    total = build(index, args.dirs)
+    build_s = time.perf_counter() - start
+    print(f"索引 {total:,} 个目录，写入耗时 {build_s:.2f}s")
+
+    timings = {}
+    for query in QUERIES:
+        for i in range(1, len(query) + 1):
+            prefix = query[:i]
+            start = time.perf_counter()
+            results = index.search(prefix)
+            timings[prefix] = ((time.perf_counter() - start) * 1000, len(results))
+    for prefix, (ms, hits) in timings.items():
+        print(f"  {prefix:<12}{ms:8.2f} ms {hits:5d} 个结果")
+    worst = max(ms for ms, _ in timings.values())
+    print(f"最慢 {worst:.2f} ms（上限 {args.max_ms:.0f} ms）")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"dirs": total, "build_s": round(build_s, 3), "worst_ms": round(worst, 3),
+                       "queries": {q: round(ms, 3) for q, (ms, _) in timings.items()}}, f, indent=4, ensure_ascii=False)
+    return 0 if worst <= args.max_ms else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+"""
+命名规则引擎的吞吐量基准
+
+生成 10 万个风格各异的合成文件名，测量 RenameRules 编译与批量生成重命名计划的耗时。
+吞吐量低于 --min-rate（个/秒）时以非零退出码结束，用于在修改规则后发现性能回退。
+
+    python benchmarks/bench_rename.py
+    python benchmarks/bench_rename.py --count 100000 --repeat 5 --min-rate 100000 --json bench_rename.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rename_rules import RenameRules  # noqa: E402
+
+TEMPLATES = (
+    "一起去看流星雨 第{ep}集 1080P.mp4",
+    "[Group] Show Name - EP{ep:02d} [1080p][HEVC][10bit].mkv",
+    "Show.Name.S01E{ep:02d}.2160p.WEB-DL.x265.DDP5.1.mkv",
+    "Show Name E{ep:02d}-E{ep2:02d}.mkv",
+    "剧名第{ep}话.mp4",
+    "show_name_{ep:03d}.avi",
+    "Show Name {ep}.flv",
+    "Show Name {ep} 字幕.ass",
+    "海报.jpg",
+)
+
+
+def synthetic_names(count, seed=0):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        ep = rng.randint(1, 2000)
+        names.append(rng.choice(TEMPLATES).format(ep=ep, ep2=ep + 1))
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="命名规则引擎吞吐量基准")
+    parser.add_argument("--count", type=int, default=100_000, help="合成文件名数量")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最快的一次")
+    parser.add_argument("--min-rate", type=float, default=50_000, help="最低吞吐量（个/秒），低于则失败")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    names = synthetic_names(args.count)
+
+    start = time.perf_counter()
+    rules = RenameRules()
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    planned = 0
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        planned = len(rules.plan(names, "Show", season=1))
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    rate = args.count / best
+
+    result = {
+        "count": args.count,
+        "planned": planned,
+        "compile_ms": round(compile_ms, 3),
+        "best_s": round(best, 4),
+        "mean_s": round(sum(timings) / len(timings), 4),
+        "names_per_s": round(rate),
+    }
+    print(f"编译规则 {compile_ms:.2f}ms；{args.count} 个文件名生成 {planned} 条重命名，"
+          f"最快 {best * 1000:.1f}ms，平均 {result['mean_s'] * 1000:.1f}ms，{rate:,.0f} 个/秒")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=4, ensure_ascii=False)
+    if args.min_rate and rate < args.min_rate:
+        print(f"吞吐量低于阈值 {args.min_rate:,.0f} 个/秒")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
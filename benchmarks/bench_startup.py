@@ -0,0 +1,110 @@
+"""
+冷启动基准
+
+分两部分测量启动耗时，每次都在新的解释器进程中进行：
+1. 导入耗时分解：python -X importtime 导入 main 与 tui，列出主要依赖的累计导入时间；
+2. 首帧时间：从启动解释器到 FileSelectorApp 完成第一次绘制（headless 模式）的耗时。
+
+首帧时间中位数超过 --max-ms 时以非零退出码结束，用于逐个版本跟踪启动性能。
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10 --max-ms 600 --json bench_startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入耗时分解中关注的模块（按累计时间统计）
+WATCHED = ("main", "tui", "textual.app", "httpx", "pypinyin", "colorama", "oplist_api", "copy_tracker")
+
+# 子进程：与 ui() 相同地构建 FileSelectorApp 并运行真实的 main_logic（读取配置、准备连接），
+# 首帧绘制完成后输出耗时并退出
+FIRST_FRAME_SCRIPT = """
+import time
+start = time.perf_counter()
+import main, tui
+
+async def logic():
+    app.call_after_refresh(lambda: (print(f"FIRST_FRAME {time.perf_counter() - start:.6f}", flush=True), app.exit()))
+    await main.main_logic()
+
+app = main.tui_app = tui.FileSelectorApp(logic)
+app.run(headless=True)
+"""
+
+
+def import_breakdown():
+    """返回 {模块名: 累计导入耗时 ms}"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main, tui"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cum.isdigit() and name in WATCHED:
+            cumulative[name] = int(cum) / 1000
+    return cumulative
+
+
+def first_frame():
+    """返回 (从启动进程到首帧的墙钟时间 ms, 进程内导入+绘制耗时 ms)"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", FIRST_FRAME_SCRIPT], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in proc.stdout:
+        if line.startswith("FIRST_FRAME"):
+            wall = (time.perf_counter() - start) * 1000
+            inner = float(line.split()[1]) * 1000
+            proc.wait()
+            return wall, inner
+    proc.wait()
+    raise RuntimeError("子进程未完成首帧绘制")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动基准")
+    parser.add_argument("--repeat", type=int, default=5, help="首帧测量次数，取中位数")
+    parser.add_argument("--max-ms", type=float, default=800, help="首帧时间中位数上限（ms），超过则失败")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    breakdown = import_breakdown()
+    print("导入耗时（累计）:")
+    for name, ms in sorted(breakdown.items(), key=lambda item: -item[1]):
+        print(f"  {name:<14} {ms:8.1f} ms")
+
+    walls, inners = [], []
+    for _ in range(args.repeat):
+        wall, inner = first_frame()
+        walls.append(wall)
+        inners.append(inner)
+    median = statistics.median(walls)
+
+    result = {
+        "imports_ms": {name: round(ms, 1) for name, ms in breakdown.items()},
+        "first_frame_ms": round(median, 1),
+        "first_frame_min_ms": round(min(walls), 1),
+        "in_process_ms": round(statistics.median(inners), 1),
+        "repeat": args.repeat,
+    }
+    print(f"首帧时间中位数 {median:.1f}ms（最快 {min(walls):.1f}ms），"
+          f"其中进程内导入与绘制 {result['in_process_ms']:.1f}ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=4, ensure_ascii=False)
+    if args.max_ms and median > args.max_ms:
+        print(f"首帧时间超过阈值 {args.max_ms:.0f}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+"""
+监视模式的检查开销基准（基于本地 OpenList 替身）
+
+在替身中生成 --shows 个已处理过的分享目录（每个含 --seasons 个季子目录），然后测量：
+  idle     没有任何变化时一轮检查的请求数
+  new      新增 --changed 个分享目录后一轮检查的请求数
+  grown    --changed 个已有分享目录的某一季新增文件后一轮检查的请求数
+每轮的请求数应当只取决于变化的目录数，与分享目录总数无关；超过 --max-requests 时以非零退出码结束。
+
+    python benchmarks/bench_watch.py
+    python benchmarks/bench_watch.py --shows 5000 --changed 20 --json bench_watch.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_openlist import FakeOpenList  # noqa: E402
+from oplist_api import OpenListAPI  # noqa: E402
+from watcher import ShareWatcher  # noqa: E402
+
+ROOT = "/share"
+
+
+async def measure(watcher, api, server):
+    before = server.stats.get("/api/fs/list", 0)
+    start = time.perf_counter()
+    await watcher.poll(api)
+    return server.stats.get("/api/fs/list", 0) - before, time.perf_counter() - start
+
+
+async def run(args):
+    server = FakeOpenList(latency=args.latency)
+    server.mkdir(ROOT)
+    server.start()
+    api = OpenListAPI(server.url)
+    await api.open()
+    _, token = await api.get_token({"username": server.username, "password": server.password})
+    await api.verify_token(token)
+    watcher = ShareWatcher(ROOT, os.path.join(tempfile.mkdtemp(), "watch.json"), settle=0)
+    await watcher.poll(api)  # 空目录作为基线
+
+    def add_show(i):
+        for season in range(1, args.seasons + 1):
+            server.add_show(f"{ROOT}/剧集{i}/S{season}", 3, show=f"剧集{i}")
+
+    for i in range(args.shows):
+        add_show(i)
+    requests, seconds = await measure(watcher, api, server)
+    print(f"首次发现 {args.shows:,} 个分享目录：{requests:,} 个请求，{seconds:.2f}s")
+    for path in watcher.ready():
+        watcher.finish(path, True)
+
+    results = {}
+    results["idle"] = await measure(watcher, api, server)
+    for i in range(args.shows, args.shows + args.changed):
+        add_show(i)
+    results["new"] = await measure(watcher, api, server)
+    for i in range(args.changed):
+        server.add_file(f"{ROOT}/剧集{i}/S1", "新增 第99集.mp4", 1024)
+        server.touch(f"{ROOT}/剧集{i}")
+    results["grown"] = await measure(watcher, api, server)
+    grown = sum(watcher.shows[f"{ROOT}/剧集{i}"]["status"] == "pending" for i in range(args.changed))
+    await api.close()
+    server.stop()
+
+    for name, (requests, seconds) in results.items():
+        print(f"  {name:<6}{requests:6d} 个请求 {seconds * 1000:8.1f} ms")
+    print(f"发现内容变化 {grown}/{args.changed} 个（上限 {args.max_requests} 个请求/轮）")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"shows": args.shows, "seasons": args.seasons, "changed": args.changed,
+                       "rounds": {name: {"requests": r, "seconds": round(s, 4)} for name, (r, s) in results.items()}},
+                      f, indent=4, ensure_ascii=False)
+    ok = grown == args.changed and all(r <= args.max_requests for r, _ in results.values())
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="监视模式检查开销基准")
+    parser.add_argument("--shows", type=int, default=2000, help="已处理过的分享目录数")
+    parser.add_argument("--seasons", type=int, default=2, help="每个分享目录的季子目录数")
+    parser.add_argument("--changed", type=int, default=10, help="新增与内容增加的分享目录数")
+    parser.add_argument("--latency", type=float, default=0.0, help="替身每个请求的延迟（秒）")
+    parser.add_argument("--max-requests", type=int, default=None,
+                        help="单轮检查的最多请求数，默认 1 + changed × (seasons + 1)")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+    args.max_requests = args.max_requests or 1 + args.changed * (args.seasons + 1)
+    logging.basicConfig(level=logging.WARNING)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,506 @@
+"""
+本地 OpenList 替身服务器
+
+只依赖标准库，实现本工具用到的接口：
+  POST /api/auth/login          GET  /api/me
+  GET  /api/fs/list             POST /api/fs/batch_rename
+  POST /api/fs/regex_rename     POST /api/fs/copy
+  POST /api/fs/move             POST /api/fs/mkdir
+  GET  /api/admin/storage/list
+  GET  /api/task/copy/undone    GET  /api/task/copy/done
+  POST /api/task/copy/retry     POST /api/task/copy/cancel
+
+目录树保存在内存中，可以配置目录大小、每个请求的延迟、复制任务耗时以及错误注入，
+用于离线复现行为与比较性能（见 bench_e2e.py）。也可以单独运行，把 conf.json 的 dest 指向它：
+
+    python benchmarks/fake_openlist.py --port 5244 --files 1000 --latency 0.02 --error-rate 0.05
+    # 账号 admin / admin，源目录 /share/一起去看流星雨，媒体库 /lib
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import PurePosixPath
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from copy_tracker import PENDING, RUNNING, SUCCEEDED, CANCELED, ERRORED  # noqa: E402
+from dir_cache import norm_path  # noqa: E402
+
+DONE_STATES = {SUCCEEDED, CANCELED, ERRORED}
+
+# 生成源目录时使用的文件名模板
+NAME_TEMPLATES = (
+    "{show} 第{ep}集 1080P.mp4",
+    "[Group] {show} - EP{ep:02d} [1080p][HEVC].mkv",
+    "{show}.S01E{ep:02d}.2160p.WEB-DL.x265.mkv",
+    "{show}_{ep:03d}.mp4",
+)
+# 命名规整的源目录（add_show(uniform=True)），集数位数由总集数决定
+UNIFORM_TEMPLATE = "[字幕组] {show} - {ep:0{width}d} [1080p].mkv"
+
+
+def go_expand(match, template):
+    """按 Go regexp.Expand 的规则展开替换串：$1、${1}、$name、${name}、$$"""
+    def repl(m):
+        if m.group(0) == "$$":
+            return "$"
+        name = m.group(1) or m.group(2)
+        try:
+            return match.group(int(name) if name.isdigit() else name) or ""
+        except (IndexError, re.error):
+            return ""
+    return re.sub(r"\$\$|\$\{(\w+)\}|\$(\w+)", repl, template)
+
+
+class FakeOpenList(ThreadingHTTPServer):
+    """
+    内存中的 OpenList 替身
+
+    :param latency: 每个请求的固定延迟（秒）
+    :param jitter: 在固定延迟上再加 0~jitter 秒的随机延迟
+    :param error_rate: 每个请求注入错误的概率
+    :param error_kind: "http" 返回 HTTP 503，"code" 返回 code=500 的业务错误，"reset" 直接断开连接
+    :param error_endpoints: 只对这些前缀的接口注入错误，默认全部（登录除外）
+    :param task_duration: 每个复制任务从提交到完成的秒数
+    :param task_fail_rate: 复制任务首次执行失败的概率（重试后成功）
+    :param copy_tasks: False 时复制立即完成且不产生任务（模拟同存储复制）
+    :param token_ttl: 登录签发的 JWT 有效期（秒），过期后请求返回 code=401
+    :param mounts: 存储挂载路径，默认只有一个挂载在 / 的存储
+    :param admin: False 时账号不是管理员，获取存储列表返回 code=403
+    """
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), username="admin", password="admin", latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_kind="http", error_endpoints=None, task_duration=0.0, task_fail_rate=0.0,
+                 copy_tasks=True, token_ttl=48 * 3600, mounts=("/",), admin=True, seed=0):
+        super().__init__(address, FakeOpenListHandler)
+        self.username = username
+        self.password = password
+        self.token_ttl = token_ttl
+        self.issued = {}       # Token -> 过期时间
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.error_endpoints = tuple(error_endpoints or ())
+        self.task_duration = task_duration
+        self.task_fail_rate = task_fail_rate
+        self.copy_tasks = copy_tasks
+        self.mounts = [norm_path(m) for m in mounts]
+        self.admin = admin
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.dirs = {"/": {}}  # 目录路径 -> {文件名: 条目}
+        self.tasks = {}        # 任务 id -> 任务
+        self.stats = {}        # 接口 -> 请求次数
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程中运行，返回服务器地址"""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-openlist", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    # ----------- 认证 -------------
+    def issue_token(self):
+        """签发一个与 OpenList 格式相同的 JWT（签名部分只是随机串）"""
+        exp = int(time.time() + self.token_ttl)
+        parts = [{"alg": "HS256", "typ": "JWT"}, {"username": self.username, "exp": exp}]
+        token = ".".join(base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+                         for part in parts) + "." + uuid.uuid4().hex
+        self.issued[token] = exp
+        return token
+
+    def expire_tokens(self):
+        """让已签发的 Token 全部立即失效（模拟服务器重启或修改密码）"""
+        self.issued.clear()
+
+    # ----------- 目录树 -------------
+    def mkdir(self, path):
+        """创建目录（含上级目录），已存在时不做任何事"""
+        path = norm_path(path)
+        for parent in reversed([PurePosixPath(path), *PurePosixPath(path).parents]):
+            parent = str(parent)
+            if parent in self.dirs:
+                continue
+            self.dirs[parent] = {}
+            up = str(PurePosixPath(parent).parent)
+            self.dirs[up][PurePosixPath(parent).name] = self._entry(PurePosixPath(parent).name, 0, is_dir=True)
+            self.touch(up)
+
+    def touch(self, path):
+        """目录内容变化时更新它在上级目录中的修改时间（与多数存储一致，不向更上层传递）"""
+        path = PurePosixPath(norm_path(path))
+        entry = self.dirs.get(str(path.parent), {}).get(path.name) if path.name else None
+        if entry is not None:
+            entry["modified"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()) + f".{time.time_ns() % 10**9:09d}Z"
+
+    def add_file(self, path, name, size):
+        self.mkdir(path)
+        self.dirs[norm_path(path)][name] = self._entry(name, size)
+        self.touch(path)
+
+    def add_show(self, path, files, show=None, uniform=False):
+        """
+        生成一个包含 files 个剧集文件（集数打乱）与一张海报的源目录
+
+        :param uniform: 所有剧集文件使用同一命名模板（字幕组发布的常见情况），否则命名风格混杂
+        """
+        show = show or PurePosixPath(path).name
+        self.mkdir(path)
+        entries = self.dirs[norm_path(path)]
+        episodes = list(range(1, files + 1))
+        self.random.shuffle(episodes)
+        width = max(2, len(str(files)))
+        for ep in episodes:
+            if uniform:
+                name = UNIFORM_TEMPLATE.format(show=show, ep=ep, width=width)
+            else:
+                name = self.random.choice(NAME_TEMPLATES).format(show=show, ep=ep)
+            entries[name] = self._entry(name, self.random.randint(100, 2000) * 1024 ** 2)
+        entries["poster.jpg"] = self._entry("poster.jpg", 200 * 1024)
+
+    @staticmethod
+    def _entry(name, size, is_dir=False):
+        md5 = "" if is_dir else hashlib.md5(f"{name}:{size}".encode()).hexdigest()
+        return {
+            "name": name, "size": size, "is_dir": is_dir, "modified": "2024-01-01T00:00:00Z",
+            "sign": "", "thumb": "", "type": 1 if is_dir else 2,
+            "hash_info": {"md5": md5} if md5 else None,
+        }
+
+    # ----------- 复制任务 -------------
+    def _new_task(self, src_dir, dst_dir, entry):
+        now = time.monotonic()
+        task = {
+            "id": uuid.uuid4().hex[:20],
+            "name": f"copy [/]({norm_path(src_dir).rstrip('/')}/{entry['name']}) to [/]({norm_path(dst_dir)})",
+            "state": PENDING, "status": "", "progress": 0, "error": "",
+            "total_bytes": entry["size"],
+            # 以下为内部字段，不返回给客户端
+            "_dst": norm_path(dst_dir), "_entry": dict(entry), "_started": now,
+            "_fail": self.random.random() < self.task_fail_rate,
+        }
+        self.tasks[task["id"]] = task
+        return task
+
+    def _advance(self, task):
+        """按经过的时间推进任务进度，完成时把文件写入目标目录"""
+        if task["state"] in DONE_STATES:
+            return
+        elapsed = time.monotonic() - task["_started"]
+        if self.task_duration > 0 and elapsed < self.task_duration:
+            task["state"] = RUNNING
+            task["progress"] = round(elapsed / self.task_duration * 100, 2)
+            return
+        if task["_fail"]:
+            task.update(state=ERRORED, error="injected task failure")
+            return
+        task.update(state=SUCCEEDED, progress=100)
+        self.mkdir(task["_dst"])
+        self.dirs[task["_dst"]][task["_entry"]["name"]] = task["_entry"]
+        self.touch(task["_dst"])
+
+    @staticmethod
+    def public_task(task):
+        return {k: v for k, v in task.items() if not k.startswith("_")}
+
+    # ----------- 错误注入 -------------
+    def inject_error(self, endpoint):
+        if not self.error_rate or endpoint == "/api/auth/login":
+            return None
+        if self.error_endpoints and not endpoint.startswith(self.error_endpoints):
+            return None
+        with self.lock:
+            hit = self.random.random() < self.error_rate
+        return self.error_kind if hit else None
+
+
+class FakeOpenListHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive，与连接池配合
+    server: FakeOpenList
+
+    def setup(self):
+        super().setup()
+        # 响应头与正文分两次写出，关闭 Nagle 以免每个请求额外等待约 40ms 的延迟确认
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _ok(self, data=None):
+        self._reply({"code": 200, "message": "success", "data": data})
+
+    def _fail(self, code, message):
+        self._reply({"code": code, "message": message, "data": None})
+
+    def _dispatch(self, method):
+        srv = self.server
+        url = urlparse(self.path)
+        endpoint = url.path
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = {}
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                return self._fail(400, "invalid json")
+        with srv.lock:
+            srv.stats[endpoint] = srv.stats.get(endpoint, 0) + 1
+
+        delay = srv.latency + (srv.random.uniform(0, srv.jitter) if srv.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        error = srv.inject_error(endpoint)
+        if error == "reset":
+            self.close_connection = True
+            return
+        if error == "http":
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if error == "code":
+            return self._fail(500, "injected error")
+
+        if endpoint == "/api/auth/login" and method == "POST":
+            if body.get("username") == srv.username and body.get("password") == srv.password:
+                return self._ok({"token": srv.issue_token()})
+            return self._fail(400, "password is incorrect or you have no permission")
+        exp = srv.issued.get(self.headers.get("Authorization"))
+        if exp is None:
+            return self._fail(401, "that's not even a token")
+        if exp <= time.time():
+            return self._fail(401, "token is expired")
+
+        handler = ROUTES.get((method, endpoint))
+        if handler is None:
+            return self._reply({"code": 404, "message": "not found"}, status=404)
+        with srv.lock:
+            handler(self, srv, query, body)
+
+    # ----------- 接口实现（持有 server.lock） -------------
+    def api_me(self, srv, query, body):
+        self._ok({"id": 1, "username": srv.username, "base_path": "/", "role": 2})
+
+    def api_list(self, srv, query, body):
+        path = norm_path(query.get("path", "/"))
+        if path not in srv.dirs:
+            return self._fail(500, "object not found")
+        content = list(srv.dirs[path].values())
+        page = max(1, int(query.get("page") or 1))
+        per_page = int(query.get("per_page") or 0)
+        if per_page > 0:
+            content = content[(page - 1) * per_page:page * per_page]
+        self._ok({"content": content, "total": len(srv.dirs[path]), "readme": "", "header": "",
+                  "write": True, "provider": "Local"})
+
+    def api_batch_rename(self, srv, query, body):
+        path = norm_path(body.get("src_dir", "/"))
+        entries = srv.dirs.get(path)
+        if entries is None:
+            return self._fail(500, "object not found")
+        # 与 OpenList 一致：逐项执行，遇到错误即停止，之前的改名已经生效
+        for item in body.get("rename_objects") or []:
+            entry = entries.pop(item.get("src_name"), None)
+            if entry is None:
+                return self._fail(500, f"failed get src object: {item.get('src_name')}: object not found")
+            entry = {**entry, "name": item["new_name"]}
+            entries[item["new_name"]] = entry
+            if entry["is_dir"]:
+                old, new = f"{path.rstrip('/')}/{item['src_name']}", f"{path.rstrip('/')}/{item['new_name']}"
+                srv.dirs[new] = srv.dirs.pop(old, {})
+            srv.touch(path)
+        self._ok()
+
+    def api_regex_rename(self, srv, query, body):
+        path = norm_path(body.get("src_dir", "/"))
+        entries = srv.dirs.get(path)
+        if entries is None:
+            return self._fail(500, "object not found")
+        try:
+            regex = re.compile(body.get("src_name_regex", ""))
+        except re.error as e:
+            return self._fail(500, f"error parsing regexp: {e}")
+        template = body.get("new_name_regex", "")
+        # 与 OpenList 一致：列出目录后逐个改名，遇到错误即停止
+        for name in list(entries):
+            if not regex.search(name):
+                continue
+            new_name = regex.sub(lambda m: go_expand(m, template), name)
+            if new_name == name:
+                continue
+            entry = {**entries.pop(name), "name": new_name}
+            entries[new_name] = entry
+            if entry["is_dir"]:
+                old, new = f"{path.rstrip('/')}/{name}", f"{path.rstrip('/')}/{new_name}"
+                srv.dirs[new] = srv.dirs.pop(old, {})
+            srv.touch(path)
+        self._ok()
+
+    def api_copy(self, srv, query, body):
+        src, dst = norm_path(body.get("src_dir", "/")), norm_path(body.get("dst_dir", "/"))
+        if src not in srv.dirs or dst not in srv.dirs:
+            return self._fail(500, "object not found")
+        names = body.get("names") or []
+        missing = [name for name in names if name not in srv.dirs[src]]
+        if missing:
+            return self._fail(500, f"failed get src [{missing[0]}] file: object not found")
+        if not srv.copy_tasks:
+            for name in names:
+                srv.dirs[dst][name] = dict(srv.dirs[src][name])
+            srv.touch(dst)
+            return self._ok({"tasks": []})
+        tasks = [srv.public_task(srv._new_task(src, dst, srv.dirs[src][name])) for name in names]
+        self._ok({"tasks": tasks})
+
+    def api_move(self, srv, query, body):
+        # 同一存储内的移动立即完成，与 OpenList 一致不产生任务
+        src, dst = norm_path(body.get("src_dir", "/")), norm_path(body.get("dst_dir", "/"))
+        if src not in srv.dirs or dst not in srv.dirs:
+            return self._fail(500, "object not found")
+        names = body.get("names") or []
+        missing = [name for name in names if name not in srv.dirs[src]]
+        if missing:
+            return self._fail(500, f"failed get src [{missing[0]}] file: object not found")
+        for name in names:
+            srv.dirs[dst][name] = srv.dirs[src].pop(name)
+            old, new = f"{src.rstrip('/')}/{name}", f"{dst.rstrip('/')}/{name}"
+            for path in [p for p in srv.dirs if p == old or p.startswith(old + "/")]:
+                srv.dirs[new + path[len(old):]] = srv.dirs.pop(path)
+        srv.touch(src)
+        srv.touch(dst)
+        self._ok()
+
+    def api_storage_list(self, srv, query, body):
+        if not srv.admin:
+            return self._fail(403, "You are not an admin")
+        content = [{"id": i + 1, "mount_path": m, "driver": "Local", "status": "work", "disabled": False}
+                   for i, m in enumerate(srv.mounts)]
+        self._ok({"content": content, "total": len(content)})
+
+    def api_mkdir(self, srv, query, body):
+        srv.mkdir(body.get("path", "/"))
+        self._ok()
+
+    def _task_list(self, srv, done):
+        tasks = []
+        for task in srv.tasks.values():
+            srv._advance(task)
+            if (task["state"] in DONE_STATES) == done:
+                tasks.append(srv.public_task(task))
+        self._ok(tasks)
+
+    def api_tasks_undone(self, srv, query, body):
+        self._task_list(srv, done=False)
+
+    def api_tasks_done(self, srv, query, body):
+        self._task_list(srv, done=True)
+
+    def api_task_retry(self, srv, query, body):
+        task = srv.tasks.get(query.get("tid"))
+        if task is None:
+            return self._fail(500, "task not found")
+        task.update(state=PENDING, progress=0, error="", _started=time.monotonic(), _fail=False)
+        self._ok()
+
+    def api_task_cancel(self, srv, query, body):
+        task = srv.tasks.get(query.get("tid"))
+        if task is None:
+            return self._fail(500, "task not found")
+        if task["state"] not in DONE_STATES:
+            task.update(state=CANCELED, error="canceled")
+        self._ok()
+
+
+ROUTES = {
+    ("GET", "/api/me"): FakeOpenListHandler.api_me,
+    ("GET", "/api/fs/list"): FakeOpenListHandler.api_list,
+    ("POST", "/api/fs/list"): FakeOpenListHandler.api_list,
+    ("POST", "/api/fs/batch_rename"): FakeOpenListHandler.api_batch_rename,
+    ("POST", "/api/fs/regex_rename"): FakeOpenListHandler.api_regex_rename,
+    ("POST", "/api/fs/copy"): FakeOpenListHandler.api_copy,
+    ("POST", "/api/fs/move"): FakeOpenListHandler.api_move,
+    ("POST", "/api/fs/mkdir"): FakeOpenListHandler.api_mkdir,
+    ("GET", "/api/admin/storage/list"): FakeOpenListHandler.api_storage_list,
+    ("GET", "/api/task/copy/undone"): FakeOpenListHandler.api_tasks_undone,
+    ("GET", "/api/task/copy/done"): FakeOpenListHandler.api_tasks_done,
+    ("POST", "/api/task/copy/retry"): FakeOpenListHandler.api_task_retry,
+    ("POST", "/api/task/copy/cancel"): FakeOpenListHandler.api_task_cancel,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OpenList 替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5244)
+    parser.add_argument("--files", type=int, default=24, help="源目录中的剧集文件数")
+    parser.add_argument("--uniform", action="store_true", help="剧集文件使用同一命名模板（可用正则重命名）")
+    parser.add_argument("--source", default="/share/一起去看流星雨", help="源目录")
+    parser.add_argument("--library", default="/lib", help="媒体库目录")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机附加延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="请求注入错误的概率")
+    parser.add_argument("--error-kind", choices=("http", "code", "reset"), default="http")
+    parser.add_argument("--error-endpoint", action="append", help="只对该前缀的接口注入错误，可多次指定")
+    parser.add_argument("--task-duration", type=float, default=3.0, help="每个复制任务耗时（秒）")
+    parser.add_argument("--task-fail-rate", type=float, default=0.0, help="复制任务首次失败的概率")
+    parser.add_argument("--no-tasks", action="store_true", help="复制立即完成且不产生任务")
+    parser.add_argument("--token-ttl", type=float, default=48 * 3600, help="登录签发的 Token 有效期（秒）")
+    parser.add_argument("--mount", action="append", help="存储挂载路径，可多次指定，默认只有挂载在 / 的一个存储")
+    args = parser.parse_args()
+
+    server = FakeOpenList((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, error_kind=args.error_kind,
+                          error_endpoints=args.error_endpoint, task_duration=args.task_duration,
+                          task_fail_rate=args.task_fail_rate, copy_tasks=not args.no_tasks,
+                          token_ttl=args.token_ttl, mounts=args.mount or ("/",))
+    server.add_show(args.source, args.files, uniform=args.uniform)
+    server.mkdir(args.library)
+    print(f"OpenList 替身已启动: {server.url}（账号 {server.username} / {server.password}）")
+    print(f"源目录 {args.source}（{args.files} 集），媒体库 {args.library}，Ctrl+C 退出")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
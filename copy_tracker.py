@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from dir_cache import ListingError, norm_path
+
+# OpenList 任务状态（tache）
+PENDING, RUNNING, SUCCEEDED, CANCELING, CANCELED, ERRORED, FAILING, FAILED, WAITING_RETRY, BEFORE_RETRY = range(10)
+FAILED_STATES = {CANCELED, ERRORED, FAILED}
+
+
+def copy_task_paths(task_name):
+    """
+    从复制任务名解析 (源文件路径, 目标目录)，格式不符时返回 None
+
+    任务名形如 "copy [/源挂载](/源路径/文件名) to [/目标挂载](/目标路径)"，路径相对于各自的存储。
+    """
+    if ") to [" not in task_name or not task_name.endswith(")"):
+        return None
+    src, dst = task_name.partition("[")[2][:-1].rsplit(") to [", 1)
+    src_mount, _, src_path = src.partition("](")
+    dst_mount, _, dst_path = dst.partition("](")
+    return (norm_path(src_mount.rstrip("/") + "/" + src_path.lstrip("/")),
+            norm_path(dst_mount.rstrip("/") + "/" + dst_path.lstrip("/")))
+
+def format_bytes(size):
+    """字节数转为易读格式，例如 1536 -> 1.5 KB"""
+    size = float(size)
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if abs(size) < 1024 or unit == "TB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size:.0f} B"
+        size /= 1024
+
+
+def format_eta(seconds):
+    """秒数转为 时:分:秒"""
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class CopyTracker:
+    """
+    跟踪一次复制提交产生的 OpenList 任务：轮询 undone/done 任务列表，
+    计算每个文件的进度、整体速度与剩余时间，自动重试失败或卡住的任务，
+    最后通过一次目标目录列表校验文件是否全部到达且大小一致。
+    """
+    def __init__(self, api, src_dir, dst_dir, files, on_progress=None, poll_interval=2.0,
+                 stall_timeout=300.0, max_retries=2, untracked_polls=3, log_interval=15.0, name=""):
+        """
+        :param api: OpenListAPI 实例
+        :param src_dir: 源目录
+        :param dst_dir: 目标目录
+        :param files: 源文件信息列表（包含 name/size/is_dir）
+        :param on_progress: 每次轮询后以 snapshot() 结果调用的回调
+        :param stall_timeout: 进度多久（秒）不变视为卡住
+        :param max_retries: 每个任务最多自动重试次数
+        :param untracked_polls: 连续多少次轮询都找不到任务时停止跟踪（同存储复制不产生任务）
+        :param name: 目标名称，同时复制到多个目标时用于区分日志与进度
+        """
+        self.api = api
+        self.src_dir = src_dir
+        self.dst_dir = dst_dir
+        self.name = name
+        self._log_prefix = f"[{name}] " if name else ""
+        self._dst_key = norm_path(dst_dir)
+        self.on_progress = on_progress
+        self.poll_interval = poll_interval
+        self.stall_timeout = stall_timeout
+        self.max_retries = max_retries
+        self.untracked_polls = untracked_polls
+        self.log_interval = log_interval
+
+        now = time.monotonic()
+        self.files = {
+            f["name"]: {
+                "name": f["name"], "size": f.get("size") or 0, "is_dir": f.get("is_dir", False),
+                "task_id": None, "state": "pending", "progress": 0.0, "retries": 0,
+                "last_change": now, "retry_at": 0.0, "error": "",
+            }
+            for f in files
+        }
+        self._task_names = {}      # task id -> 文件名
+        self._old_task_ids = set()  # 提交前就已存在的任务，避免误匹配历史任务
+        self._samples = deque(maxlen=10)  # (时间, 已完成字节) 用于计算速度
+        self._last_log = 0.0
+        self.started_at = now
+
+    async def baseline(self):
+        """提交复制前记录已存在的任务 id"""
+        for state in ("undone", "done"):
+            tasks = await self.api.get_copy_tasks(state) or []
+            self._old_task_ids.update(task.get("id") for task in tasks)
+
+    def add_tasks(self, tasks):
+        """登记复制接口直接返回的任务"""
+        for task in tasks or []:
+            f = self._match_by_name(task.get("name", ""))
+            if f is not None:
+                self._task_names[task.get("id")] = f["name"]
+                f["task_id"] = task.get("id")
+
+    def mark_failed(self, names, reason):
+        """标记未能提交的文件，不再等待它们的任务"""
+        for name in names:
+            if name in self.files:
+                self.files[name].update(state="failed", error=reason)
+
+    def mark_done(self, names):
+        """标记已同步完成、不产生任务的文件（例如同一存储内的移动）"""
+        for name in names:
+            if name in self.files:
+                self.files[name].update(state="done", progress=100.0)
+
+    def _match_by_name(self, task_name):
+        paths = copy_task_paths(task_name)
+        # 比较完整的目标路径：同一剧集复制到多个媒体库时，末级目录名（Season 01）相同
+        if paths is None or paths[1] != self._dst_key:
+            return None
+        # 取源路径的最后一段作为文件名，直接查表
+        return self.files.get(paths[0].rsplit("/", 1)[-1])
+
+    def _match(self, task):
+        tid = task.get("id")
+        if tid in self._task_names:
+            return self.files[self._task_names[tid]]
+        if tid in self._old_task_ids:
+            return None
+        f = self._match_by_name(task.get("name", ""))
+        if f is not None:
+            self._task_names[tid] = f["name"]
+            f["task_id"] = tid
+        return f
+
+    async def _retry(self, f, reason, cancel_first=False):
+        if f["retries"] >= self.max_retries:
+            f["state"] = "failed"
+            f["error"] = reason
+            logging.error(f"{self._log_prefix}复制失败: {f['name']}（{reason}），已重试 {f['retries']} 次", extra={"detail": True})
+            return
+        f["retries"] += 1
+        logging.warning(f"{self._log_prefix}复制任务异常（{reason}）: {f['name']}，第 {f['retries']} 次自动重试", extra={"detail": True})
+        if cancel_first:
+            await self.api.copy_task_action("cancel", f["task_id"])
+        if await self.api.copy_task_action("retry", f["task_id"]):
+            now = time.monotonic()
+            f.update(state="pending", progress=0.0, last_change=now, retry_at=now)
+        else:
+            f["state"] = "failed"
+            f["error"] = reason
+
+    async def _update(self, f, task):
+        if f["state"] in ("done", "failed"):
+            return
+        now = time.monotonic()
+        state = task.get("state")
+        progress = float(task.get("progress") or 0)
+        if state == SUCCEEDED:
+            f.update(state="done", progress=100.0, last_change=now)
+        elif state in FAILED_STATES:
+            # 刚提交重试的任务可能仍短暂停留在已结束列表中
+            if now - f["retry_at"] > self.poll_interval * 1.5:
+                await self._retry(f, task.get("error") or "失败")
+        else:
+            if progress != f["progress"]:
+                f.update(progress=progress, last_change=now)
+            f["state"] = "running" if state == RUNNING else "pending"
+            if state == RUNNING and now - f["last_change"] > self.stall_timeout:
+                await self._retry(f, f"{self.stall_timeout:.0f}s 无进度", cancel_first=True)
+
+    def snapshot(self):
+        """当前进度：每个文件的状态与整体字节数、速度、剩余时间"""
+        files = list(self.files.values())
+        bytes_total = sum(f["size"] for f in files)
+        bytes_done = sum(f["size"] if f["state"] == "done" else f["size"] * f["progress"] / 100 for f in files)
+        now = time.monotonic()
+        self._samples.append((now, bytes_done))
+        rate = 0.0
+        if len(self._samples) >= 2:
+            (t0, b0), (t1, b1) = self._samples[0], self._samples[-1]
+            rate = (b1 - b0) / (t1 - t0) if t1 > t0 else 0.0
+        eta = (bytes_total - bytes_done) / rate if rate > 0 else None
+        return {
+            "name": self.name,
+            "dst_dir": self.dst_dir,
+            "files": files,
+            "done": sum(f["state"] == "done" for f in files),
+            "failed": sum(f["state"] == "failed" for f in files),
+            "total": len(files),
+            "bytes_done": bytes_done,
+            "bytes_total": bytes_total,
+            "rate": rate,
+            "eta": eta,
+            "elapsed": now - self.started_at,
+        }
+
+    def _report(self, force=False):
+        snap = self.snapshot()
+        if self.on_progress is not None:
+            self.on_progress(snap)
+        now = time.monotonic()
+        if force or now - self._last_log >= self.log_interval:
+            self._last_log = now
+            logging.info(f"{self._log_prefix}复制进度 {snap['done']}/{snap['total']}，"
+                         f"{format_bytes(snap['bytes_done'])}/{format_bytes(snap['bytes_total'])}，"
+                         f"{format_bytes(snap['rate'])}/s，剩余 {format_eta(snap['eta'])}")
+
+    async def wait(self):
+        """轮询任务直到全部结束，返回是否全部成功"""
+        polls_without_tasks = 0
+        poll_failures = 0
+        while any(f["state"] not in ("done", "failed") for f in self.files.values()):
+            undone, done = await asyncio.gather(self.api.get_copy_tasks("undone"),
+                                                self.api.get_copy_tasks("done"))
+            if undone is None or done is None:
+                poll_failures += 1
+                if poll_failures >= 3:
+                    logging.warning(f"{self._log_prefix}无法获取复制任务状态，停止跟踪，直接校验目标目录")
+                    break
+            else:
+                poll_failures = 0
+                matched = False
+                for task in undone + done:
+                    f = self._match(task)
+                    if f is not None and f["state"] not in ("done", "failed"):
+                        matched = True
+                        await self._update(f, task)
+                if matched:
+                    polls_without_tasks = 0
+                else:
+                    # 剩余文件一直没有对应任务（同存储复制会直接完成）
+                    polls_without_tasks += 1
+                    if polls_without_tasks >= self.untracked_polls:
+                        logging.info(f"{self._log_prefix}未找到剩余文件的复制任务（可能已同步完成），直接校验目标目录")
+                        break
+            self._report()
+            if all(f["state"] in ("done", "failed") for f in self.files.values()):
+                break
+            await asyncio.sleep(self.poll_interval)
+        self._report(force=True)
+        return all(f["state"] == "done" for f in self.files.values())
+
+    async def verify(self):
+        """列一次目标目录，返回缺失或大小不一致的文件 [(文件名, 原因)]"""
+        logging.info(f"{self._log_prefix}正在校验目标目录: {self.dst_dir}")
+        try:
+            arrived = {entry["name"]: entry async for entry in self.api.iter_dir(self.dst_dir, refresh=True)}
+        except ListingError as e:
+            logging.error(f"{self._log_prefix}校验失败，{e}")
+            return [(self.dst_dir, "目标目录列出失败")]
+        problems = []
+        for f in self.files.values():
+            entry = arrived.get(f["name"])
+            if entry is None:
+                problems.append((f["name"], "目标目录中不存在"))
+            elif not f["is_dir"] and f["size"] and entry.get("size") != f["size"]:
+                problems.append((f["name"], f"大小不一致 {entry.get('size')} != {f['size']}"))
+        if problems:
+            for name, reason in problems:
+                logging.error(f"{self._log_prefix}校验失败: {name}，{reason}", extra={"detail": True})
+            logging.error(f"{self._log_prefix}校验失败 {len(problems)}/{len(self.files)} 个文件")
+        else:
+            logging.info(f"{self._log_prefix}校验通过，{len(self.files)} 个文件已全部到达")
+        return problems
@@ -46,7 +46,44 @@ class ConfigManager:
             "password": "",
             "token": "",
             "base_dir": "",
-            "dst_dir": ""
+            "dst_dir": "",
+            "sync": True,
+            "transfer": "copy",
+            "dedupe": "warn",
+            "destinations": [],
+            "network": {
+                "connect_timeout": 5.0,
+                "read_timeout": 30.0,
+                "max_attempts": 4,
+                "failure_threshold": 5,
+                "reset_timeout": 30.0
+            },
+            "batch": {
+                "chunk_size": 100,
+                "chunk_concurrency": 3,
+                "step_concurrency": 8,
+                "regex_rename": True
+            },
+            "watch": {
+                "interval": 300,
+                "settle": 300,
+                "workers": 2,
+                "max_depth": 3,
+                "rescan_after": 86400,
+                "state": "watch.json"
+            },
+            "index": {
+                "enabled": True,
+                "file": "index.db",
+                "max_depth": 8,
+                "concurrency": 2,
+                "stale_after": 86400
+            },
+            "log": {
+                "file": "",
+                "max_bytes": 5242880,
+                "backup_count": 3
+            }
         }
         self.save()
 
@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+from pathlib import PurePosixPath
+
+
+def norm_path(path):
+    """统一路径格式作为缓存键，例如 "/a/b/" 与 Path("/a/b") 视为同一目录"""
+    return str(PurePosixPath("/") / str(path).replace("\\", "/"))
+
+
+class ListingError(Exception):
+    """目录列表获取失败或不完整（某一页请求失败），由 OpenListAPI.iter_dir 抛出"""
+
+
+class DirCache:
+    """
+    目录列表缓存：按 (路径, 密码, 页码, 每页数量) 缓存 /api/fs/list 的结果，
+    超过 ttl 秒视为过期，超过 max_entries 条时淘汰最久未使用的条目。
+    """
+    def __init__(self, ttl=60.0, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (写入时间, info_dict)
+
+    @staticmethod
+    def make_key(path, password="", page=1, per_page=5):
+        return norm_path(path), password, page, per_page
+
+    def get(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        stored_at, info = item
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return self._copy(info)
+
+    def put(self, key, info):
+        self._entries[key] = (time.monotonic(), self._copy(info))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, path):
+        """删除某个目录的全部分页缓存"""
+        path = norm_path(path)
+        for key in [k for k in self._entries if k[0] == path]:
+            del self._entries[key]
+
+    def apply_renames(self, path, rename_list):
+        """重命名成功后就地更新该目录的缓存，省去一次重新列目录"""
+        mapping = {item["src_name"]: item["new_name"] for item in rename_list}
+        path = norm_path(path)
+        for key, (stored_at, info) in list(self._entries.items()):
+            if key[0] != path:
+                continue
+            content = [{**entry, "name": mapping.get(entry["name"], entry["name"])}
+                       for entry in info.get("content") or []]
+            self._entries[key] = (stored_at, {**info, "content": content})
+
+    def clear(self):
+        self._entries.clear()
+
+    @staticmethod
+    def _copy(info):
+        # 浅拷贝，避免调用方修改列表影响缓存
+        return {**info, "content": list(info.get("content") or [])}
@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import time
+import uuid
+
+from create_conf import resource_path
+
+
+class JournalRun:
+    """日志中的一次运行（一个剧集的 重命名 → 建目录 → 复制 流程）"""
+    def __init__(self, journal, run_id, events=None):
+        self.journal = journal
+        self.run_id = run_id
+        self.events = events if events is not None else []
+
+    def record(self, event, **data):
+        """追加一条记录并立即落盘"""
+        entry = {"run": self.run_id, "event": event, "time": time.time(), **data}
+        self.events.append(entry)
+        self.journal.append(entry)
+
+    def finish(self, status="done"):
+        self.record("run_finished", status=status)
+
+    def scoped(self, dest):
+        """记录镜像目标步骤的视图，事件会附带目标名称 dest"""
+        return ScopedRun(self, dest)
+
+    @property
+    def finished(self):
+        return any(e["event"] == "run_finished" for e in self.events)
+
+    def state(self):
+        """把事件序列折叠为当前进度，供恢复时跳过已完成的步骤"""
+        st = {
+            "source": "", "rename_plan": None, "renamed": set(), "video_path": "",
+            "mkdir_done": False, "copy_tasks": [], "copy_names": [], "copy_verified": False,
+            "step": "开始", "mirrors": {},
+        }
+        for e in self.events:
+            event = e["event"]
+            if e.get("dest"):
+                # 镜像目标的步骤单独折叠，键为目标名称
+                m = st["mirrors"].setdefault(e["dest"], {
+                    "video_path": "", "mkdir_done": False, "copy_tasks": [], "copy_names": [], "copy_verified": False,
+                })
+                if event == "target_planned":
+                    m["video_path"] = e["video_path"]
+                elif event == "mkdir_done":
+                    m["mkdir_done"] = True
+                elif event == "copy_chunk" and e.get("ok"):
+                    m["copy_names"].extend(e["names"])
+                    m["copy_tasks"].extend(e.get("tasks") or [])
+                elif event == "copy_verified":
+                    m["copy_verified"] = e.get("ok", False)
+                continue
+            if event == "run_started":
+                st["source"] = e.get("source", "")
+                st["params"] = e.get("params", {})
+            elif event == "rename_planned":
+                st["rename_plan"] = e["rename_list"]
+                st["step"] = "重命名"
+            elif event == "rename_chunk" and e.get("ok"):
+                st["renamed"].update(e["names"])
+            elif event == "target_planned":
+                st["video_path"] = e["video_path"]
+                st["step"] = "创建目录"
+            elif event == "mkdir_done":
+                st["mkdir_done"] = True
+                st["step"] = "复制"
+            elif event == "copy_chunk" and e.get("ok"):
+                st["copy_names"].extend(e["names"])
+                st["copy_tasks"].extend(e.get("tasks") or [])
+            elif event == "copy_verified":
+                st["copy_verified"] = e.get("ok", False)
+                st["step"] = "校验"
+        return st
+
+
+class ScopedRun:
+    """JournalRun 的视图：记录的事件都带上镜像目标名称 dest"""
+    def __init__(self, run, dest):
+        self.run = run
+        self.dest = dest
+
+    def record(self, event, **data):
+        self.run.record(event, dest=self.dest, **data)
+
+
+class Journal:
+    """
+    本地追加写入的操作日志（JSON Lines），位于配置文件同目录。
+
+    每个步骤开始前记录计划、完成后记录结果；程序中断后可据此从上次的检查点继续，
+    而不是重复执行云端的重命名和复制。
+    """
+    def __init__(self, filename="journal.jsonl"):
+        self.filename = resource_path(filename)
+
+    def append(self, entry):
+        with open(self.filename, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, source, **params):
+        """开始一次新的运行"""
+        run = JournalRun(self, uuid.uuid4().hex[:12])
+        run.record("run_started", source=source, params=params)
+        return run
+
+    def load_runs(self):
+        """读取全部运行，按开始顺序返回 {run_id: JournalRun}"""
+        runs = {}
+        if not os.path.exists(self.filename):
+            return runs
+        with open(self.filename, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 中断时可能只写了半行，忽略即可
+                    logging.warning("操作日志中有损坏的记录，已跳过")
+                    continue
+                run_id = entry.get("run")
+                runs.setdefault(run_id, JournalRun(self, run_id)).events.append(entry)
+        return runs
+
+    def unfinished_runs(self):
+        """未完成的运行，最近的在前"""
+        return [run for run in reversed(list(self.load_runs().values())) if not run.finished]
+
+    def compact(self, keep=50):
+        """只保留未完成的运行和最近 keep 次已完成的运行"""
+        runs = list(self.load_runs().values())
+        finished = [run for run in runs if run.finished]
+        drop = {run.run_id for run in finished[:-keep]} if len(finished) > keep else set()
+        if not drop:
+            return
+        tmp = self.filename + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for run in runs:
+                if run.run_id in drop:
+                    continue
+                for entry in run.events:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.filename)
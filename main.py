@@ -1,38 +1,147 @@
+import argparse
 import asyncio
+import json
 import logging
 import math
-import os
 import re
-from pathlib import Path
+import threading
+import time
+from functools import lru_cache, partial
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING
 
-import tui
-from colorama import init
-from create_conf import ConfigManager
-from oplist_api import OpenListAPI
+from copy_tracker import CopyTracker, format_bytes
+from create_conf import ConfigManager, resource_path
+from dir_cache import ListingError, norm_path
+from journal import Journal
+from metrics import RequestMetrics
+from plan import Plan
+from rename_rules import MAX_REGEX_RULES, RenameRules
+from sync_diff import diff_listings
+from token_manager import jwt_expiry
 
-from pypinyin import lazy_pinyin, Style
-
-init(autoreset=True)
+# textual / httpx / pypinyin 导入较慢，只在用到时导入，见 import_network()、preload_pinyin()
+if TYPE_CHECKING:
+    import tui
+    from oplist_api import OpenListAPI
+    from remote_index import RemoteIndex
 
 formatter = logging.Formatter('[%(levelname)s][%(asctime)s][%(filename)s] %(message)s',
                               datefmt='%H:%M:%S')
 
+# 逐个文件的明细日志：界面中合并为摘要，完整内容写入日志文件
+DETAIL = {"detail": True}
+
 # TUI 日志适配器
 class TUILogHandler(logging.Handler):
+    """把日志交给界面批量写入，不为每条记录单独发消息"""
     def __init__(self, app):
         super().__init__()
         self.app = app
     def emit(self, record):
         msg = self.format(record)
-        self.app.post_message(tui.LogMessage(msg, record.levelno))
+        # httpx 每个请求一条的日志同样视为明细
+        detail = getattr(record, "detail", False) or record.name.startswith("httpx")
+        self.app.queue_log(msg, record.levelno, detail)
+
+def setup_log_file():
+    """
+    按配置中的 log 段开启滚动日志文件，记录包括明细在内的全部日志
+
+    写文件在后台线程中进行（QueueHandler + QueueListener），不阻塞事件循环。
+    """
+    global config_manager, log_listener
+    log_conf = config_manager.get("log", {}) or {}
+    filename = log_conf.get("file", "")
+    if not filename or log_listener is not None:
+        return None
+    import logging.handlers
+    import queue
+    path = resource_path(filename)
+    try:
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=log_conf.get("max_bytes", 5 * 1024 * 1024),
+            backupCount=log_conf.get("backup_count", 3), encoding="utf-8")
+    except OSError as e:
+        logging.error(f"无法打开日志文件 {path}: {e}")
+        return None
+    file_handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    logging.getLogger().addHandler(logging.handlers.QueueHandler(log_queue))
+    log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+    log_listener.start()
+    logging.info(f"完整日志写入 {path}")
+    return path
 
 # 全局变量
 DEST_URL = ""
 config_manager = ConfigManager()
-oplist_api = OpenListAPI("")
-tui_app: tui.FileSelectorApp
+journal = Journal()
+request_metrics = RequestMetrics()  # 本次运行所有请求的耗时统计，结束时导出为 metrics.json
+log_listener = None  # 日志文件的后台写入线程，见 setup_log_file()
+rename_rules: RenameRules = None
+oplist_api: "OpenListAPI" = None  # prepare_api() 中创建
+mirrors = []  # 镜像目标（配置项 destinations），见 prepare_mirrors()
+remote_index: "RemoteIndex" = None  # 远程目录树与媒体库文件的本地索引，见 open_index()
+index_tasks = []  # 后台刷新索引的任务
+library_refresh = None  # 其中刷新媒体库（dst_dir）文件索引的任务，复制前由 refresh_library 等待
+step_limit: asyncio.Semaphore = None  # 所有执行计划共用的步骤并发上限（配置项 batch.step_concurrency）
+PRIMARY = "主目标"  # 同时复制到镜像目标时主目标（dest + dst_dir）在日志与结果中的名称
+tui_app: "tui.FileSelectorApp"
+HEADLESS = False  # 批量模式下没有界面，任何交互输入都视为错误
+DRY_RUN = False  # 预演模式：只编译并列出执行计划，不修改云端（命令行 --dry-run）
+TRANSFER = ""  # 传输方式 copy / auto（命令行 --transfer），为空时使用配置项 transfer
+transfer_stats = {op: {"files": 0, "bytes": 0} for op in ("copy", "move", "skip")}  # 本次运行各传输方式的文件数与字节数
+_pinyin = None  # pypinyin.lazy_pinyin，首次使用时才导入（词典较大）
+_pinyin_lock = threading.Lock()
 
 # 拼音转换
+def load_pinyin():
+    """导入 pypinyin 并加载词典，只加载一次；可在后台线程中提前调用"""
+    global _pinyin
+    with _pinyin_lock:
+        if _pinyin is None:
+            from pypinyin import lazy_pinyin
+            lazy_pinyin("预热")  # 触发词组词典加载
+            _pinyin = lazy_pinyin
+    return _pinyin
+
+def preload_pinyin():
+    """在后台线程加载 pypinyin，不阻塞界面"""
+    threading.Thread(target=load_pinyin, name="pinyin-preload", daemon=True).start()
+
+def import_network():
+    """导入 httpx 及连接相关模块（约 50ms），在线程中调用以免阻塞界面"""
+    from oplist_api import OpenListAPI
+    from request_policy import RequestPolicy
+    return OpenListAPI, RequestPolicy
+
+HANZI_RUN = re.compile(r"[\u4e00-\u9fff]+|[^\u4e00-\u9fff]+")
+
+@lru_cache(maxsize=1024)
+def title_to_pinyin(title):
+    """
+    整个标题一次转换为拼音，保留 pypinyin 的词组多音字处理（如 重庆 -> Chongqing）。
+    汉字拼音首字母大写，英文/数字/符号原样保留。
+    """
+    items = load_pinyin()(title)
+    runs = HANZI_RUN.findall(title)
+    # 汉字每个字对应一项，其余字符每段对应一项
+    if len(items) != sum(len(run) if '\u4e00' <= run[0] <= '\u9fff' else 1 for run in runs):
+        # 结果无法与原文对齐时退回逐字转换
+        return ''.join(load_pinyin()(ch)[0].capitalize() if '\u4e00' <= ch <= '\u9fff' else ch
+                       for ch in title)
+    pinyin_list = []
+    pos = 0
+    for run in runs:
+        if '\u4e00' <= run[0] <= '\u9fff':  # 汉字
+            pinyin_list.extend(py.capitalize() for py in items[pos:pos + len(run)])
+            pos += len(run)
+        else:
+            pinyin_list.append(run)
+            pos += 1
+    return ''.join(pinyin_list)
+
 def hanzi_to_pinyin_until_symbol(text):
     """
     将字符串开头的 “汉字、英文、数字、合法符号” 提取出来，
@@ -52,22 +161,13 @@ def hanzi_to_pinyin_until_symbol(text):
         return "", ""
 
     original_str = match.group()
-
-    # 把汉字转成拼音（首字母大写），其他字符保留
-    pinyin_list = []
-    for ch in original_str:
-        if '\u4e00' <= ch <= '\u9fff':  # 汉字
-            py = lazy_pinyin(ch, style=Style.NORMAL)[0]
-            pinyin_list.append(py.capitalize())
-        else:
-            pinyin_list.append(ch)
-
-    pinyin_str = ''.join(pinyin_list)
-    return pinyin_str, original_str
+    return title_to_pinyin(original_str), original_str
 
 # 异步输入函数
 async def tui_input(prompt: str, default_value="", placeholder="输入后按回车确认", ):
     global tui_app
+    if HEADLESS:
+        raise RuntimeError(f"无界面模式下无法交互输入（{prompt.rstrip(':：')}），请先在配置文件中设置")
     future = asyncio.Future()
 
     async def callback(value):
@@ -152,41 +252,77 @@ async def reset_dest_url():
     logging.info(f"目标URL已更新为: {DEST_URL}")
     return
 
-async def authenticate(auth_info):
-    global config_manager, oplist_api
-    token = config_manager.get("token", "")
-    if token != "":
-        if oplist_api.verify_token(token):
+def save_token(token):
+    """把新 Token 写回配置文件（登录或自动续期后调用）"""
+    global config_manager
+    config_manager.set('token', token)
+    config_manager.save()
+    logging.info("Token 已写入配置文件")
+
+async def reuse_token(api, token):
+    """沿用已保存的 Token，可用时返回 True，需要重新登录时返回 False"""
+    if api.tokens.fresh(token):
+        # 本地即可判断 JWT 未过期，省去一次 /api/me；服务器若已吊销，请求时会自动重新登录
+        expires = time.strftime("%Y-%m-%d %H:%M", time.localtime(jwt_expiry(token)))
+        logging.info(f"Token 有效期至 {expires}，跳过在线验证")
+        api.tokens.use(token)
+        return True
+    if token != "" and jwt_expiry(token) is None:
+        # 读不出过期时间的 Token 只能在线验证
+        if await api.verify_token(token):
             logging.info("Token 验证成功")
-            return
+            return True
         else:
             logging.warning("Token 验证失败，尝试重新获取 Token")
+    elif token != "":
+        logging.info("Token 已过期或即将过期，尝试获取新的 Token")
     else:
         logging.info("Token 为空，尝试获取新的 Token")
-    status_code, token = oplist_api.get_token(auth_info)
+    return False
+
+async def authenticate(auth_info):
+    """
+    沿用或获取 Token；失败时在界面中重新设置账号密码或 URL 后重试
+
+    :raises RuntimeError: 无界面模式下登录失败（无法交互修改配置）
+    """
+    global config_manager, oplist_api
+    tokens = oplist_api.tokens
+    tokens.credentials = auth_info
+    tokens.on_token = save_token
+    if await reuse_token(oplist_api, config_manager.get("token", "")):
+        return
+    status_code, token = await oplist_api.get_token(auth_info)
     if status_code == 200:
-        logging.info("Token 获取成功，重新验证...")
-        if oplist_api.verify_token(token):
-            logging.info("Token 正在写入文件")
-            config_manager.set('token', token)
-            config_manager.save()
-            return
+        # 刚登录得到的 Token 无需再次验证
+        tokens.use(token)
+        save_token(token)
+        return
+    if status_code == 500:
+        reason = "网络连接失败或服务器错误"
     elif status_code == 401:
-        logging.error("账号密码错误，请重新设置")
-        await reset_auth_info()
-        auth_info = await get_auth_config()
-        await authenticate(auth_info)
-    elif status_code == 500:
-        logging.error("网络连接失败或服务器错误，请检查网络设置")
+        reason = "账号密码错误"
+    else:
+        reason = f"登录失败（状态码 {status_code}）"
+    if HEADLESS:
+        raise RuntimeError(f"{reason}，请检查配置文件中的 dest、username 与 password")
+    if status_code == 500:
+        logging.error(f"{reason}，请检查网络设置")
         await reset_dest_url()
         oplist_api.prefix_url = DEST_URL
-        await authenticate(auth_info)
+    else:
+        logging.error(f"{reason}，请重新设置账号密码")
+        await reset_auth_info()
+        auth_info = await get_auth_config()
+    await authenticate(auth_info)
 
 async def choose_path(mode="base"):
     global config_manager, oplist_api
+    import tui
     while True:
         path = config_manager.get(f'{mode}_dir')
-        dir_info = oplist_api.get_cloud_dir_info(path=path)
+        # 与文件浏览器的分页大小一致，浏览器打开时直接复用这一页
+        dir_info = await oplist_api.get_cloud_dir_info(path=path, per_page=tui.FileBrowser.PAGE_SIZE)
         if not dir_info:
             promot = "源" if mode == "base" else "媒体库"
             logging.error(f"获取云端目录信息失败，请重新设置 {promot} 路径")
@@ -203,114 +339,856 @@ async def show_file_browser(content_dict):
     async def callback(value):
         if not future.done():
             future.set_result(value)
-    await tui_app.show_file_browser(oplist_api, content_dict, callback)
+    await tui_app.show_file_browser(oplist_api, content_dict, callback, index=remote_index)
     result = await future
     await tui_app.show_welcome()
     return result
 
-def rename_video_file(filename, prefix, season=1, digits=2):
+def get_rename_rules():
+    """本次运行使用的命名规则，首次使用时按配置编译一次"""
+    global rename_rules, config_manager
+    if rename_rules is None:
+        rename_rules = RenameRules.from_config(config_manager.get("rename_rules", {}))
+    return rename_rules
+
+async def aiter_files(files):
+    """统一遍历文件列表或异步迭代器（如 OpenListAPI.iter_dir）"""
+    if hasattr(files, "__aiter__"):
+        async for file in files:
+            yield file
+    else:
+        for file in files:
+            yield file
+
+async def form_rename_file_list(file_list, name_prefix="", season=1):
+    """处理文件列表（列表或分页流），生成重命名后的文件列表"""
+    # 位数取决于最大集数，边接收分页边收集文件名，收齐后一次批量生成新名称
+    file_names = [file["name"] async for file in aiter_files(file_list)]
+    file_rename_list = get_rename_rules().plan(file_names, name_prefix, season)
+    for item in file_rename_list:
+        logging.info(f"重命名: {item['src_name']} -> {item['new_name']}", extra=DETAIL)
+    logging.info(f"共 {len(file_names)} 个文件，计划重命名 {len(file_rename_list)} 个")
+    return file_rename_list
+
+async def journaled_rename(path, file_rename_list, run=None, planned=False, regex_rules=None):
     """
-    根据视频文件名提取结尾数字并重命名为指定格式。
+    执行重命名，并把计划与每块的结果写入操作日志
 
-    :param filename: 原始文件名（包含扩展名）
-    :param prefix: 前缀，比如 "TV show"
-    :param season: 季数，默认 1
-    :param digits: 集数占用的位数，默认 2
-    :return: 新文件名，如果不是视频文件返回原始文件名
+    :param planned: 重命名计划已在编译执行计划时写入操作日志
+    :param regex_rules: 与计划等价的正则规则，给出时优先用正则重命名提交
     """
-    # 常见视频扩展
-    video_exts = {'.mp4', '.mkv', '.avi', '.mov', '.flv'}
+    global oplist_api
+    on_chunk = None
+    if run is not None:
+        if not planned:
+            run.record("rename_planned", rename_list=file_rename_list)
 
-    # 分离文件名和扩展名
-    name, ext = os.path.splitext(filename)
-    ext_lower = ext.lower()
+        def on_chunk(ok, chunk, tasks):
+            run.record("rename_chunk", ok=ok, names=[item["src_name"] for item in chunk])
+    return await oplist_api.rename_file(path, file_rename_list, on_chunk=on_chunk, regex_rules=regex_rules)
 
-    # 不是视频文件就直接返回原文件名
-    if ext_lower not in video_exts:
-        return filename
+async def rename_files(path, file_rename_list, run=None, regex_rules=None):
+    """重命名步骤：全部成功时返回 True（计划已由 compile_show 写入操作日志）"""
+    return bool(await journaled_rename(path, file_rename_list, run, planned=True, regex_rules=regex_rules))
 
-    # 从末尾提取数字（最后一段连续数字）
-    match = re.search(r'(\d+)\D*$', name)
-    if not match:
-        # 找不到数字，保留原文件名
-        return filename
+def season_dir(library, show_name, season):
+    """主目标中一季的目录：媒体库/剧名/Season NN"""
+    return str(Path(library) / show_name / f"Season {season:02d}")
 
-    episode_num = int(match.group(1))
+async def discover_seasons(source, default_season=1):
+    """
+    遍历源目录树，按季分组
 
-    # 格式化新文件名：TV show S01E01.mp4
-    new_filename = f"{prefix} S{season:02d}E{episode_num:0{digits}d}{ext_lower}"
-    return new_filename
+    含视频的子目录按自身或最近的上级目录名推断季数（S2、Season 02、第二季，特典/SP 为第 0 季），
+    源目录本身的视频使用 default_season，推断不出季数的其他子目录跳过。
 
-async def form_rename_file_list(file_list, name_prefix="", season=1):
-    """处理文件列表，生成重命名后的文件列表"""
-    file_rename_list = []
-    file_count = len(file_list)
-    for file in file_list:
-        file_name = file["name"]
-        new_file_name = rename_video_file(file_name, name_prefix, season, digits=int(math.log10(file_count))+1)
-        if new_file_name != file_name:
-            logging.info(f"重命名: {file_name} -> {new_file_name}")
-            file_rename_list.append({
-                "src_name": file_name,
-                "new_name": new_file_name,
-            })
-    return file_rename_list
+    :return: [{"season": 季数, "path": 目录, "files": [文件条目]}]，按季数排序；
+             没有季子目录时只有源目录一组，files 为源目录下的全部条目（与单季处理相同）
+    :raises ListingError: 源目录树中有目录列出失败
+    """
+    global oplist_api
+    rules = get_rename_rules()
+    root = norm_path(source)
+    tree = await oplist_api.walk(root, refresh=True)
+    groups, skipped = [], []
+    for dir_path, entries in tree.items():
+        if dir_path == root:
+            continue
+        files = [entry for entry in entries if not entry.get("is_dir")]
+        if not any(rules.is_video(entry["name"]) for entry in files):
+            continue
+        season = None
+        for part in reversed(PurePosixPath(dir_path).relative_to(root).parts):
+            season = rules.season_of(part)
+            if season is not None:
+                break
+        if season is None:
+            skipped.append(dir_path)
+            continue
+        groups.append({"season": season, "path": dir_path, "files": files})
+    if not groups:
+        return [{"season": default_season, "path": source, "files": tree.get(root, [])}]
 
-async def auto_rename(path, default_name="TV show", season=1):
-    """自动重命名文件"""
-    global oplist_api, tui_app
-    file_list = oplist_api.get_all_files_from_dir(path)
-    name_prefix = await tui_input(f"请输入剧集名称:", placeholder="TV show", default_value=default_name)
-    logging.info("正在处理文件列表...")
-    file_rename_list = await form_rename_file_list(file_list, name_prefix, season)
-    logging.info("文件列表处理完成，准备重命名...")
-    oplist_api.rename_file(path, file_rename_list)
-    return file_rename_list
+    root_files = [entry for entry in tree.get(root, []) if not entry.get("is_dir")]
+    if any(rules.is_video(entry["name"]) for entry in root_files):
+        groups.append({"season": default_season, "path": root, "files": root_files})
+    groups.sort(key=lambda g: (g["season"], g["path"]))
+    for path in skipped:
+        logging.warning(f"无法从目录名推断季数，已跳过: {path}")
+    seasons = [g["season"] for g in groups]
+    if len(set(seasons)) < len(seasons):
+        logging.warning("有多个目录推断为同一季，它们会复制到同一个 Season 目录，请确认集数不重复")
+    for g in groups:
+        logging.info(f"第 {g['season']} 季: {g['path']}（{len(g['files'])} 个文件）")
+    return groups
 
-async def auto_fs_structure(path, default_name="TV show"):
-    """自动创建文件夹结构"""
-    global oplist_api, tui_app
-    show_name = await tui_input("请输入剧集名称:", placeholder="一起去看流星雨", default_value=default_name)
-    season = await tui_input("请输入季数:", placeholder="01", default_value="01")
-    logging.info("正在创建文件夹结构...")
-    new_dir_path = str(Path(path) / show_name / f"Season {season.zfill(2)}")
-    oplist_api.mkdir(new_dir_path)
-    logging.info(f"创建完成！路径为: {new_dir_path}")
-    return new_dir_path
+def single_season(groups, source):
+    """discover_seasons 的结果是否为单季（没有季子目录）"""
+    return len(groups) == 1 and groups[0]["path"] == source
+
+async def plan_seasons(groups, prefix):
+    """
+    为每季生成重命名计划（本地计算，不修改云端），返回带 rename_list 与 regex_rules 的各季信息
+
+    命名规整（只有集数不同）时同时生成等价的正则规则，请求数不多于按块提交时才采用（配置项 batch.regex_rename）
+    """
+    global config_manager
+    batch_conf = config_manager.get("batch", {})
+    use_regex = batch_conf.get("regex_rename", True)
+    seasons = []
+    for group in groups:
+        rename_list = await form_rename_file_list(group["files"], prefix, group["season"])
+        regex_rules = None
+        if use_regex and rename_list:
+            chunks = math.ceil(len(rename_list) / batch_conf.get("chunk_size", 100))
+            regex_rules = get_rename_rules().regex_plan([file["name"] for file in group["files"]], prefix,
+                                                        group["season"], max_rules=min(MAX_REGEX_RULES, chunks))
+        if regex_rules:
+            logging.info(f"{group['path']} 的文件命名规整，使用 {len(regex_rules)} 条正则完成 {len(rename_list)} 项重命名")
+        seasons.append(dict(group, rename_list=rename_list, regex_rules=regex_rules))
+    return seasons
+
+def compile_show(seasons, library, show_name, sync=True, multi=False, runs=None, title=""):
+    """
+    把一个剧集编译为执行计划：每季一个重命名步骤，每季每个目标 建目录 → 复制 → 校验
+
+    重命名与建目录互不依赖，同时进行；复制依赖同一季的重命名与该目标的建目录。
+
+    :param seasons: plan_seasons 的结果
+    :param multi: 多季源目录（步骤与日志带季数，只复制各季目录中的文件）
+    :param runs: {源目录: 操作日志中的运行}，预演时为 None（不写操作日志）
+    :return: (计划, [(季信息, 标签, 主目标目录, 重命名步骤名称或 None, plan_destinations 的结果)])
+    """
+    global oplist_api
+    plan = Plan(title)
+    compiled, labels = [], set()
+    for s in seasons:
+        path, label = s["path"], f"S{s['season']:02d}" if multi else ""
+        if label in labels:
+            # 多个目录推断为同一季时用目录名区分
+            label = f"{label}（{PurePosixPath(path).name}）"
+        labels.add(label)
+        run = runs.get(path) if runs else None
+        after = []
+        if s["rename_list"]:
+            target = f"{path}（{len(s['regex_rules'])} 条正则）" if s["regex_rules"] else path
+            after.append(plan.add(f"重命名 {label}".strip(), "rename", target,
+                                  partial(rename_files, path, s["rename_list"], run, s["regex_rules"]),
+                                  outputs=[remote_path(oplist_api, path, item["new_name"])
+                                           for item in s["rename_list"]]))
+        renamed = {item["src_name"]: item["new_name"] for item in s["rename_list"]}
+        names = [renamed.get(file["name"], file["name"]) for file in s["files"]
+                 if not (multi and file.get("is_dir"))]
+        video_path = season_dir(library, show_name, s["season"])
+        planned = plan_destinations(plan, path, video_path, sync, run, after=after, label=label, files_only=multi,
+                                    names=names)
+        if run is not None and s["rename_list"]:
+            # 编译时就写入，步骤开始前中断也能在继续时补上重命名
+            run.record("rename_planned", rename_list=s["rename_list"])
+        compiled.append((s, label, video_path, after[0] if after else None, planned))
+    return plan, compiled
+
+def season_results(plan, compiled, runs=None):
+    """
+    执行完成后每季的结果，全部成功的季结束其操作日志中的运行（失败的保留，下次可继续）
+
+    :return: [{"season", "source", "target", "renamed", "status", "error", "destinations"}]
+    """
+    results = []
+    for s, label, video_path, rename_step, planned in compiled:
+        destinations = destination_results(plan, planned)
+        report_destinations(destinations, label)
+        result = {"season": s["season"], "source": s["path"], "target": video_path,
+                  "renamed": len(s["rename_list"]), "status": "ok", "destinations": destinations}
+        failed = [d["name"] for d in destinations if d["ok"] is False]
+        if rename_step is not None and plan.steps[rename_step].status != "done":
+            result.update(status="failed", renamed=0, error="重命名失败")
+        elif failed:
+            result.update(status="failed", error=f"复制失败或目标目录校验未通过（{'、'.join(failed)}）")
+        elif runs:
+            runs[s["path"]].finish()
+        results.append(result)
+    return results
+
+async def execute_show(seasons, library, show_name, sync=True, multi=False, params=None, title=""):
+    """
+    编译并执行一个剧集的计划：先检查计划并在日志中列出全部步骤，预演模式下到此为止
+
+    :param params: 写入操作日志的附加参数
+    :return: 每季的结果，见 season_results；预演时 status 为 "planned"
+    """
+    global journal, step_limit, tui_app
+    plan, compiled = compile_show(seasons, library, show_name, sync, multi, title=title)
+    logging.info(plan.describe())
+    problems = plan.problems()
+    if problems or DRY_RUN:
+        for problem in problems:
+            logging.error(f"计划有误，未执行任何操作: {problem}")
+        return [{"season": s["season"], "source": s["path"], "target": video_path, "renamed": len(s["rename_list"]),
+                 "status": "failed" if problems else "planned", "error": "；".join(problems), "destinations": []}
+                for s, _, video_path, _, _ in compiled]
+
+    runs = {s["path"]: journal.start(s["path"], **({"season": s["season"], "files_only": True} if multi else {}),
+                                     **(params or {}))
+            for s in seasons}
+    plan, compiled = compile_show(seasons, library, show_name, sync, multi, runs, title)
+    if not HEADLESS:
+        # 先显示进度面板，各季、各目标共用
+        await tui_app.show_copy_progress()
+    await plan.execute(step_limit)
+    return season_results(plan, compiled, runs)
+
+async def resume_season(run):
+    """从检查点继续操作日志中未完成的运行，返回值同 execute_show 中每季的结果"""
+    ok = await resume_run(run)
+    st = run.state()
+    result = {"season": st["params"].get("season", 1), "source": st["source"], "target": st["video_path"],
+              "renamed": len(st["renamed"]), "status": "ok" if ok else "failed", "destinations": [], "resumed": True}
+    if not ok:
+        result["error"] = "继续上次未完成的任务失败"
+    return result
 
 async def form_copy_file_list(file_list):
-    """处理文件列表，生成复制的文件列表"""
+    """处理文件列表（列表或分页流），生成复制的文件列表"""
     file_copy_list = []
-    for file in file_list:
+    async for file in aiter_files(file_list):
         file_name = file["name"]
         file_copy_list.append(file_name)
     return file_copy_list
 
-async def auto_copy_file(path, dst_path):
-    """自动复制文件"""
+def transfer_mode():
+    """本次运行的传输方式：copy 总是复制；auto 同一存储内改为服务器端移动，目标中已有相同文件时跳过"""
+    global config_manager
+    mode = TRANSFER or config_manager.get("transfer", "copy")
+    return mode if mode in ("copy", "auto") else "copy"
+
+def count_transfer(op, files):
+    transfer_stats[op]["files"] += len(files)
+    transfer_stats[op]["bytes"] += sum(file.get("size") or 0 for file in files)
+
+def report_transfers():
+    """在日志中输出本次运行各传输方式的文件数、字节数与节省的传输量"""
+    if not any(stat["files"] for stat in transfer_stats.values()):
+        return
+    copy, move, skip = (transfer_stats[op] for op in ("copy", "move", "skip"))
+    logging.info(f"传输统计（{transfer_mode()}）：复制 {copy['files']} 个（{format_bytes(copy['bytes'])}），"
+                 f"服务器端移动 {move['files']} 个（{format_bytes(move['bytes'])}），"
+                 f"跳过已存在的 {skip['files']} 个（{format_bytes(skip['bytes'])}），"
+                 f"共节省传输 {format_bytes(move['bytes'] + skip['bytes'])}")
+
+async def can_move(api, path, dst_path, label=""):
+    """
+    传输方式为 auto 时，主目标能否用服务器端移动代替复制
+
+    源与目标必须位于同一存储（按存储挂载点判断，需要管理员账号才能获取），
+    且同一服务器上没有镜像目标还需要从源目录复制。
+    """
+    global mirrors
+    if transfer_mode() != "auto":
+        return False
+    if any(not m["remote"] for m in mirrors):
+        logging.info(f"{label}同一服务器上的镜像目标也要从源目录复制，使用复制")
+        return False
+    src_mount, dst_mount = await asyncio.gather(api.mount_of(path), api.mount_of(dst_path))
+    if src_mount is None or dst_mount is None:
+        logging.info(f"{label}无法确定源与目标所在的存储，使用复制")
+        return False
+    if src_mount != dst_mount:
+        logging.info(f"{label}源与目标位于不同存储（{src_mount} -> {dst_mount}），使用复制")
+        return False
+    logging.info(f"{label}源与目标位于同一存储 {src_mount}，使用服务器端移动")
+    return True
+
+def dedupe_mode():
+    """复制前按内容哈希在媒体库中查重的方式（配置项 dedupe）：warn 只警告（默认）、skip 不复制、off 不检查"""
+    global config_manager
+    mode = config_manager.get("dedupe", "warn")
+    return mode if mode in ("warn", "skip", "off") else "warn"
+
+def library_duplicates(source_files, dst_path, label=""):
+    """
+    按大小与哈希在媒体库索引（dst_dir）中查找与源文件内容相同的已有文件
+
+    同一季从不同分享以不同文件名转存时，按文件名的增量同步发现不了，这里按内容发现。
+    dedupe 为 skip 时返回去掉重复文件后的列表，否则只在日志中警告并原样返回。
+    """
+    global remote_index
+    mode = dedupe_mode()
+    if mode == "off" or remote_index is None:
+        return source_files
+    duplicates = {}
+    for file in source_files:
+        if file.get("is_dir"):
+            continue
+        existing = remote_index.find_duplicate(file, exclude=str(PurePosixPath(norm_path(dst_path)) / file["name"]))
+        if existing is not None:
+            duplicates[file["name"]] = existing
+    if not duplicates:
+        return source_files
+    for name, existing in duplicates.items():
+        logging.warning(f"{label}媒体库中已有相同内容的文件: {name} == {existing}", extra=DETAIL)
+    size = format_bytes(sum(file.get("size") or 0 for file in source_files if file["name"] in duplicates))
+    if mode != "skip":
+        logging.warning(f"{label}{len(duplicates)} 个文件（{size}）与媒体库中已有的文件内容相同，仍会复制"
+                        f"（配置项 dedupe 设为 skip 时跳过）")
+        return source_files
+    logging.warning(f"{label}跳过 {len(duplicates)} 个与媒体库中已有文件内容相同的文件（{size}）")
+    count_transfer("skip", [file for file in source_files if file["name"] in duplicates])
+    return [file for file in source_files if file["name"] not in duplicates]
+
+async def sync_file_list(source_files, dst_path, api=None, name=""):
+    """
+    增量同步：列出目标目录，只保留目标中缺失或大小/哈希不同的文件
+
+    :raises ListingError: 目标目录列出失败，不能当作空目录全部重新复制
+    """
     global oplist_api
-    file_list = oplist_api.get_all_files_from_dir(path)
-    if not file_list:
-        logging.warning("源目录没有文件，无法进行复制")
+    api = api or oplist_api
+    dst_files = [file async for file in api.iter_dir(dst_path, refresh=True)]
+    diff = diff_listings(source_files, dst_files)
+    label = f"[{name}] " if name else ""
+    logging.info(f"{label}增量同步：新增 {len(diff['new'])} 个，变更 {len(diff['changed'])} 个，"
+                 f"跳过 {len(diff['skipped'])} 个（目标中已存在且一致）")
+    for file in diff["changed"]:
+        logging.info(f"{label}目标文件不一致，将重新复制: {file['name']}", extra=DETAIL)
+    return diff["new"] + diff["changed"]
+
+async def submit_copy(path, dst_path, track=True, sync=True, run=None, api=None, name="", refresh=False,
+                      files_only=False, primary=False):
+    """
+    提交复制（计划中的复制步骤），需要跟踪时由 verify_copy 等待任务结束并校验
+
+    传输方式为 auto 时（见 transfer_mode），目标中已有的相同文件跳过，
+    主目标与源目录位于同一存储时改为服务器端移动（移动后源目录中不再有这些文件）。
+
+    :param track: 是否跟踪复制任务直到结束并校验目标目录
+    :param sync: 增量同步，只复制目标目录中缺失或不一致的文件
+    :param api: 目标所在服务器的 OpenListAPI，默认主服务器
+    :param name: 目标名称，同时复制到多个目标时用于区分日志与进度
+    :param refresh: 强制刷新源目录列表（重命名发生在其他服务器上时）
+    :param files_only: 只复制文件不复制子目录（多季源目录中子目录单独处理）
+    :param primary: 是否为主目标，只有主目标可以移动
+    :return: 已提交且需要跟踪时返回 CopyTracker；提交失败返回 False，目标已是最新返回 True，源目录为空时返回 None
+    """
+    global oplist_api, tui_app
+    api = api or oplist_api
+    label = f"[{name}] " if name else ""
+    try:
+        # 重命名后缓存已同步更新，这里通常直接命中缓存
+        source_files = [file async for file in api.iter_dir(path, refresh=refresh)
+                        if not (files_only and file.get("is_dir"))]
+        if source_files and (sync or transfer_mode() == "auto"):
+            pending = await sync_file_list(source_files, dst_path, api, name)
+    except ListingError as e:
+        logging.error(f"{label}{e}，无法提交复制")
+        return False
+    if not source_files:
+        logging.warning(f"{label}源目录没有文件，无法进行复制")
         return
+    if sync or transfer_mode() == "auto":
+        pending_names = {file["name"] for file in pending}
+        count_transfer("skip", [file for file in source_files if file["name"] not in pending_names])
+        source_files = pending
+        if not source_files:
+            logging.info(f"{label}目标目录已是最新，无需复制")
+            return True
+    if primary:
+        # 媒体库索引只覆盖主服务器的 dst_dir
+        source_files = library_duplicates(source_files, dst_path, label)
+        if not source_files:
+            logging.info(f"{label}所有文件在媒体库中都已存在，无需复制")
+            return True
+    copy_file_list = await form_copy_file_list(source_files)
+    move = primary and await can_move(api, path, dst_path, label)
 
-    logging.info(f"正在复制 {len(file_list)} 个文件到目标目录 {dst_path}...")
-    copy_file_list = await form_copy_file_list(file_list)
-    oplist_api.copy_file(path, dst_path, copy_file_list)
+    on_progress = None
+    if track and not HEADLESS:
+        await tui_app.show_copy_progress()
+        on_progress = tui_app.update_copy_progress
+    tracker = CopyTracker(api, path, dst_path, source_files, on_progress=on_progress, name=name)
+    if track and not move:
+        await tracker.baseline()
 
-# 异步主逻辑
-async def main_logic():
-    global oplist_api, tui_app, config_manager, DEST_URL
+    on_chunk = None
+    if run is not None:
+        def on_chunk(ok, chunk, tasks):
+            run.record("copy_chunk", ok=ok, names=chunk, tasks=tasks or [], op="move" if move else "copy")
+
+    by_name = {file["name"]: file for file in source_files}
+    if move:
+        logging.info(f"{label}正在移动 {len(copy_file_list)} 个文件到目标目录 {dst_path}...")
+        result = await api.move_file(path, dst_path, copy_file_list, on_chunk=on_chunk)
+        moved = [by_name[n] for n in result.succeeded]
+        count_transfer("move", moved)
+        if moved:
+            logging.info(f"{label}服务器端移动 {len(moved)} 个文件，节省传输 "
+                         f"{format_bytes(sum(file.get('size') or 0 for file in moved))}")
+    else:
+        logging.info(f"{label}正在复制 {len(copy_file_list)} 个文件到目标目录 {dst_path}...")
+        result = await api.copy_file(path, dst_path, copy_file_list, on_chunk=on_chunk)
+        count_transfer("copy", [by_name[n] for n in result.succeeded])
+    if not result.succeeded:
+        return False
+    if primary and remote_index is not None:
+        remote_index.add_files(dst_path, [by_name[n] for n in result.succeeded])
+    if not track:
+        return bool(result)
+    if move:
+        # 同一存储内的移动在请求返回时已经完成，不产生任务
+        tracker.mark_done(result.succeeded)
+    tracker.add_tasks(result.tasks)
+    tracker.mark_failed(result.failed, "复制任务提交失败")
+    return tracker
+
+async def verify_copy(submitted, run=None):
+    """
+    校验步骤：等待复制任务结束并校验目标目录
+
+    :param submitted: submit_copy 的返回值，不是 CopyTracker（没有需要跟踪的任务）时原样返回
+    :return: 全部到达且大小一致返回 True，否则返回 False
+    """
+    if not isinstance(submitted, CopyTracker):
+        return submitted
+    await submitted.wait()
+    problems = await submitted.verify()
+    if run is not None:
+        run.record("copy_verified", ok=not problems)
+    return not problems
+
+async def make_dir(api, path, run=None):
+    """建目录步骤：创建目录并记录到操作日志"""
+    if not await api.mkdir(path):
+        return False
+    if run is not None:
+        run.record("mkdir_done", path=path)
+    return True
+
+def mirror_source(mirror, source):
+    """源目录在镜像服务器上的路径：镜像配置了 base_dir 时替换主服务器 base_dir 前缀"""
+    global config_manager
+    base_dir = config_manager.get("base_dir", "")
+    if not mirror["base_dir"] or not base_dir:
+        return source
+    try:
+        rel = PurePosixPath(norm_path(source)).relative_to(norm_path(base_dir))
+    except ValueError:
+        return source
+    return str(PurePosixPath(norm_path(mirror["base_dir"])) / rel)
+
+def mirror_target(mirror, video_path):
+    """主目标的 剧名/Season XX 目录在镜像媒体库中的对应位置"""
+    video_path = Path(video_path)
+    return str(Path(mirror["library"]) / video_path.parent.name / video_path.name)
+
+def remote_path(api, path, name=""):
+    """带服务器地址的路径，计划检查写入冲突时区分不同服务器上的同名路径"""
+    path = norm_path(path)
+    return f"{api.prefix_url.rstrip('/')}{path}/{name}" if name else f"{api.prefix_url.rstrip('/')}{path}"
+
+def plan_destinations(plan, source, video_path, sync=True, run=None, after=(), skip=(), label="",
+                      files_only=False, names=(), mkdir_primary=True):
+    """
+    向计划添加主目标与每个镜像目标的 建目录 → 复制 → 校验 步骤，各目标之间互不依赖
+
+    :param video_path: 主目标的 剧名/Season XX 目录
+    :param after: 复制前必须完成的步骤（例如同一源目录的重命名）
+    :param skip: 已完成校验、本次不再复制的目标名称
+    :param label: 步骤、日志与进度中目标名称的前缀，例如多季同时复制时的 "S02"
+    :param names: 复制后目标目录中的文件名，用于检查多个来源写入同一文件
+    :param mkdir_primary: 是否创建主目标目录（继续上次的运行时可能已创建）
+    :return: [(目标名称, 目标目录, 校验步骤名称)]
+    """
+    global oplist_api, mirrors
+    dests = []
+    if PRIMARY not in skip:
+        dests.append((PRIMARY, "/".join(part for part in (label, PRIMARY if mirrors else "") if part),
+                      oplist_api, source, video_path, run, False, mkdir_primary))
+    for mirror in mirrors:
+        if mirror["name"] not in skip:
+            dests.append((mirror["name"], f"{label}/{mirror['name']}" if label else mirror["name"], mirror["api"],
+                          mirror_source(mirror, source), mirror_target(mirror, video_path),
+                          run.scoped(mirror["name"]) if run is not None else None, mirror["remote"], True))
+
+    async def verify(copy_step, dest_run):
+        return await verify_copy(plan.result(copy_step), dest_run)
+
+    planned = []
+    for dest, name, api, dest_source, target, dest_run, refresh, mkdir in dests:
+        key = name or label or PRIMARY
+        deps = list(after)
+        if mkdir:
+            if dest_run is not None:
+                dest_run.record("target_planned", video_path=target)
+            deps.append(plan.add(f"建目录 {key}", "mkdir", target, partial(make_dir, api, target, dest_run)))
+        copy_step = plan.add(f"复制 {key}", "copy", f"{dest_source} -> {target}",
+                             partial(submit_copy, dest_source, target, sync=sync, run=dest_run, api=api, name=name,
+                                     refresh=refresh, files_only=files_only, primary=dest == PRIMARY),
+                             deps=deps, outputs=[remote_path(api, target, n) for n in names])
+        verify_step = plan.add(f"校验 {key}", "verify", target, partial(verify, copy_step, dest_run),
+                               deps=[copy_step])
+        planned.append((dest, target, verify_step))
+    return planned
+
+def destination_results(plan, planned):
+    """各目标的结果 [{"name", "target", "ok"}]，ok 同 verify_copy 的返回值，步骤未成功时为 False"""
+    results = []
+    for dest, target, verify_step in planned:
+        step = plan.steps[verify_step]
+        results.append({"name": dest, "target": target, "ok": step.result if step.status == "done" else False})
+    return results
+
+def report_destinations(results, label=""):
+    """配置了镜像目标时分别报告各目标的结果"""
+    global mirrors
+    if not mirrors:
+        return
+    prefix = f"{label}/" if label else ""
+    for r in results:
+        if r["ok"] is False:
+            logging.error(f"[{prefix}{r['name']}] 复制未全部完成: {r['target']}")
+        else:
+            logging.info(f"[{prefix}{r['name']}] 复制完成: {r['target']}")
+
+async def copy_to_destinations(source, video_path, sync=True, run=None, skip=(), label="", files_only=False):
+    """
+    复制到主目标与全部镜像目标（继续上次的运行时使用）：各目标的建目录、提交与跟踪同时进行，结果分别报告
+
+    :param video_path: 主目标的 剧名/Season XX 目录（已创建）
+    :return: [{"name", "target", "ok"}]
+    """
+    global step_limit, tui_app
+    plan = Plan(source)
+    planned = plan_destinations(plan, source, video_path, sync, run, skip=skip, label=label, files_only=files_only,
+                                mkdir_primary=False)
+    if planned and not HEADLESS:
+        # 先显示进度面板，各目标共用
+        await tui_app.show_copy_progress()
+    await plan.execute(step_limit)
+    results = destination_results(plan, planned)
+    report_destinations(results, label)
+    return results
+
+async def offer_resume():
+    """启动时检查操作日志，询问是否继续最近一次未完成的运行"""
+    global journal
+    runs = journal.unfinished_runs()
+    if not runs:
+        return None
+    run = runs[0]
+    st = run.state()
+    answer = await tui_input(f"检测到未完成的任务: {st['source']}（上次进行到: {st['step']}），是否继续？(y/n)",
+                             default_value="y", placeholder="y 继续，n 放弃")
+    if answer.strip().lower() in ("y", "yes", "是"):
+        return run
+    run.finish("abandoned")
+    logging.info("已放弃未完成的任务")
+    return None
+
+async def resume_run(run):
+    """从操作日志的检查点继续一次运行，跳过已完成的云端操作"""
+    global oplist_api, tui_app, config_manager
+    st = run.state()
+    source = st["source"]
+    logging.info(f"继续未完成的任务: {source}（上次进行到: {st['step']}）")
+
+    # 重命名：只提交日志中未确认完成的部分，已生效但未记录的由 rename_file 核对后跳过
+    if st["rename_plan"]:
+        pending = [item for item in st["rename_plan"] if item["src_name"] not in st["renamed"]]
+        if pending:
+            logging.info(f"继续重命名剩余的 {len(pending)} 个文件")
+            await journaled_rename(source, pending, run)
+
+    video_path = st["video_path"]
+    if not video_path:
+        logging.error("上次运行尚未确定目标目录，无法继续，请重新开始")
+        run.finish("abandoned")
+        return False
+    if not st["mkdir_done"]:
+        if not await oplist_api.mkdir(video_path):
+            return False
+        run.record("mkdir_done", path=video_path)
+
+    # 多季源目录中的一季：日志与进度带上季数，只复制文件
+    params = st.get("params", {})
+    label = f"S{params['season']:02d}" if "season" in params else ""
+    files_only = params.get("files_only", False)
+
+    # 已校验通过的目标不再复制；先等待上次已提交的复制任务结束，避免重复传输
+    skip = {name for name, m in st["mirrors"].items() if m["copy_verified"]}
+    waits = []
+    if st["copy_verified"]:
+        skip.add(PRIMARY)
+    elif st["copy_names"]:
+        waits.append(wait_submitted(oplist_api, source, video_path, st["copy_names"], st["copy_tasks"],
+                                    "/".join(part for part in (label, PRIMARY if mirrors else "") if part)))
+    for mirror in mirrors:
+        m = st["mirrors"].get(mirror["name"])
+        if m and m["copy_names"] and not m["copy_verified"]:
+            waits.append(wait_submitted(mirror["api"], mirror_source(mirror, source), m["video_path"],
+                                        m["copy_names"], m["copy_tasks"],
+                                        f"{label}/{mirror['name']}" if label else mirror["name"]))
+    await asyncio.gather(*waits)
+    # 增量同步补齐仍缺失的文件并校验
+    results = await copy_to_destinations(source, video_path, sync=True, run=run, skip=skip, label=label,
+                                         files_only=files_only)
+    ok = all(r["ok"] is not False for r in results)
+    run.finish("done" if ok else "failed")
+    return ok
+
+async def wait_submitted(api, source, video_path, names, tasks, name=""):
+    """等待上次运行中已提交的复制任务结束"""
+    global tui_app
+    submitted = set(names)
+    try:
+        files = [file async for file in api.iter_dir(source) if file["name"] in submitted]
+    except ListingError as e:
+        # 只是缺少文件大小，进度按文件数估计
+        logging.warning(f"{e}，按文件名跟踪上次提交的复制任务")
+        files = [{"name": name} for name in names]
+    on_progress = None
+    if not HEADLESS:
+        await tui_app.show_copy_progress()
+        on_progress = tui_app.update_copy_progress
+    tracker = CopyTracker(api, source, video_path, files, on_progress=on_progress, name=name)
+    tracker.add_tasks(tasks)
+    await tracker.wait()
+
+async def prepare_api():
+    """读取配置、创建 OpenlistAPI 并完成认证"""
+    global oplist_api, config_manager, step_limit, DEST_URL
 
     await get_config()
+    log_file = setup_log_file()
+    if log_file and not HEADLESS:
+        tui_app.log_file = log_file
     await check_info()
     auth_info = await get_auth_config()
 
-    oplist_api = OpenListAPI(DEST_URL)
+    # 网络模块导入与连接池创建都在线程中进行，界面在此期间完成首帧绘制
+    OpenListAPI, RequestPolicy = await asyncio.to_thread(import_network)
+    batch_conf = config_manager.get("batch", {})
+
+    def make_api(url):
+        return OpenListAPI(url, policy=RequestPolicy.from_config(config_manager.get("network", {})),
+                           chunk_size=batch_conf.get("chunk_size", 100),
+                           chunk_concurrency=batch_conf.get("chunk_concurrency", 3),
+                           metrics=request_metrics)
+
+    oplist_api = make_api(DEST_URL)
+    await oplist_api.open()
+    step_limit = asyncio.Semaphore(batch_conf.get("step_concurrency", 8))
 
     await authenticate(auth_info)
+    await prepare_mirrors(make_api)
     logging.info("正在配置 OpenlistAPI")
 
+async def login_mirror(api, conf):
+    """镜像服务器的非交互登录，账号密码未单独配置时沿用主服务器的"""
+    global config_manager
+    api.tokens.credentials = {
+        "username": (conf.get("username") or config_manager.get("username", "")).strip(),
+        "password": (conf.get("password") or config_manager.get("password", "")).strip(),
+    }
+
+    def save_mirror_token(token):
+        conf["token"] = token
+        config_manager.save()
+
+    api.tokens.on_token = save_mirror_token
+    if await reuse_token(api, conf.get("token", "")):
+        return True
+    return await api.tokens.login()
+
+async def prepare_mirrors(make_api):
+    """
+    按配置 destinations 准备镜像目标，每个目标：
+      name     名称，用于日志与结果
+      dst_dir  镜像媒体库目录（必填）
+      dest     OpenList 地址，默认与主服务器相同（共用连接与 Token）
+      username/password/token  该服务器的账号密码与 Token，默认沿用主服务器的账号密码
+      base_dir 源目录在该服务器上的挂载位置，与主服务器的 base_dir 不同时填写
+    """
+    global mirrors, oplist_api, config_manager, DEST_URL
+    mirrors = []
+    apis = {DEST_URL.rstrip("/"): oplist_api}
+    for i, conf in enumerate(config_manager.get("destinations", []), 1):
+        name = conf.get("name") or f"镜像{i}"
+        library = conf.get("dst_dir", "").strip()
+        if not library:
+            logging.error(f"镜像目标 {name} 未配置 dst_dir，已跳过")
+            continue
+        url = (conf.get("dest") or DEST_URL).strip().rstrip("/")
+        api = apis.get(url)
+        if api is None:
+            logging.info(f"正在连接镜像目标 {name}: {url}")
+            api = make_api(url)
+            await api.open()
+            if not await login_mirror(api, conf):
+                logging.error(f"镜像目标 {name} 登录失败，已跳过")
+                await api.close()
+                continue
+            apis[url] = api
+        mirrors.append({"name": name, "api": api, "library": library,
+                        "base_dir": conf.get("base_dir", "").strip(), "remote": api is not oplist_api})
+    if mirrors:
+        logging.info(f"已配置 {len(mirrors)} 个镜像目标: {'、'.join(m['name'] for m in mirrors)}")
+
+def open_index():
+    """
+    打开本地目录索引（配置项 index），未启用或无法打开时返回 False
+
+      enabled      是否启用，默认 true
+      file         索引文件，默认 index.db（位于配置文件同目录）
+      max_depth    最多索引的层数，默认 8
+      concurrency  同时列出的目录数，默认 2
+      stale_after  超过该秒数未列出的目录即使修改时间未变也重新列出，默认 86400
+    """
+    global remote_index, config_manager
+    if remote_index is not None:
+        return True
+    conf = config_manager.get("index", {}) or {}
+    if not conf.get("enabled", True):
+        return False
+    import sqlite3
+    from remote_index import RemoteIndex
+    try:
+        remote_index = RemoteIndex(conf.get("file", "index.db"))
+    except sqlite3.Error as e:
+        logging.error(f"无法打开目录索引: {e}")
+        return False
+    return True
+
+def refresh_index(root, files=False):
+    """增量刷新 root 下的索引，files=True 时同时记录文件的大小与哈希（媒体库查重）"""
+    global remote_index, config_manager, oplist_api
+    conf = config_manager.get("index", {}) or {}
+    return remote_index.refresh(oplist_api, root, max_depth=conf.get("max_depth", 8),
+                                concurrency=conf.get("concurrency", 2), stale_after=conf.get("stale_after", 86400),
+                                files=files)
+
+def start_indexing():
+    """打开本地目录索引，并在后台增量刷新 base_dir 与 dst_dir（连同其中的文件）下的目录树"""
+    global index_tasks, library_refresh, config_manager
+    if not open_index():
+        return
+    base_dir, dst_dir = config_manager.get("base_dir", ""), config_manager.get("dst_dir", "")
+    if dst_dir:
+        task = asyncio.create_task(refresh_index(dst_dir, files=dedupe_mode() != "off"))
+        index_tasks.append(task)
+        if dedupe_mode() != "off":
+            library_refresh = task
+    if base_dir and base_dir != dst_dir:
+        index_tasks.append(asyncio.create_task(refresh_index(base_dir)))
+
+async def refresh_library():
+    """
+    复制前等待媒体库（dst_dir）索引增量刷新完成，查重才能看到整个媒体库
+
+    界面模式下等待 start_indexing 已在后台开始的刷新，无界面模式下每次调用都刷新一次。
+    """
+    global config_manager, remote_index, library_refresh
+    dst_dir = config_manager.get("dst_dir", "")
+    if dedupe_mode() == "off" or not dst_dir or not open_index():
+        return
+    task, library_refresh = library_refresh, None
+    try:
+        if task is None:
+            await refresh_index(dst_dir, files=True)
+        else:
+            if not task.done():
+                logging.info("等待媒体库索引刷新完成，用于复制前查重")
+            await asyncio.shield(task)
+    except Exception as e:
+        logging.error(f"媒体库索引刷新失败，本次查重可能不完整: {e}")
+        return
+    unlisted = remote_index.unlisted.get(norm_path(dst_dir))
+    if unlisted:
+        # 这些目录保留上次索引的内容，其后新增到其中的文件本次查不到
+        logging.warning(f"媒体库中 {len(unlisted)} 个目录列出失败，本次查重不完整: {'、'.join(unlisted[:5])}"
+                        f"{' 等' if len(unlisted) > 5 else ''}")
+
+async def close_apis():
+    """停止后台索引，关闭主服务器与各镜像服务器的连接池"""
+    global oplist_api, mirrors, remote_index, index_tasks
+    for task in index_tasks:
+        task.cancel()
+    await asyncio.gather(*index_tasks, return_exceptions=True)
+    index_tasks = []
+    if remote_index is not None:
+        remote_index.close()
+        remote_index = None
+    remotes = {id(m["api"]): m["api"] for m in mirrors if m["remote"]}
+    if oplist_api is not None:
+        remotes[id(oplist_api)] = oplist_api
+    await asyncio.gather(*(api.close() for api in remotes.values()))
+
+def export_metrics(filename="metrics.json"):
+    """在日志中输出传输统计与各接口的耗时统计，并把后者导出为 JSON"""
+    global request_metrics
+    report_transfers()
+    logging.info("请求统计:\n" + request_metrics.format_table())
+    path = resource_path(filename)
+    try:
+        request_metrics.export(path)
+        logging.info(f"请求统计已导出到 {path}")
+    except OSError as e:
+        logging.error(f"导出请求统计失败: {e}")
+
+async def profiled(logic, filename):
+    """在 cProfile 下运行 logic()，结束后把结果写入 filename（python -m pstats 查看）"""
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return await logic()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(filename)
+        logging.info(f"性能分析结果已写入 {filename}")
+
+# 异步主逻辑
+async def main_logic():
+    global oplist_api, tui_app, config_manager, DEST_URL
+
+    # pypinyin 词典加载是纯 Python 计算，会与界面争抢 GIL，等首帧绘制完成后再加载
+    tui_app.call_after_refresh(preload_pinyin)
+    await prepare_api()
+    start_indexing()
+
+    # 上次运行中断时，从操作日志的检查点继续（预演模式不继续，以免修改云端）
+    journal.compact()
+    resumed = None if DRY_RUN else await offer_resume()
+    if resumed is not None:
+        await refresh_library()
+        if await resume_run(resumed):
+            logging.info("完成！")
+        else:
+            logging.error("未能完成上次的任务，请检查上方日志")
+        export_metrics()
+        await close_apis()
+        tui_app.exit()
+        return
+
     # 选择源地址
     base_content_data = await choose_path(mode="base")
     logging.info("获得源地址路径")
@@ -320,9 +1198,18 @@ async def main_logic():
     # 获取拼音和原始名称
     py_name, hz_name = hanzi_to_pinyin_until_symbol(Path(select_base_path).name)
 
-    # 重命名部分
-    file_rename_list = await auto_rename(select_base_path, py_name)
-    hz_name = hz_name + f"（{len(file_rename_list)}集）"
+    # 在等待用户输入重命名前缀的同时遍历源目录树，识别 S1、S2 等季子目录
+    walk_task = asyncio.create_task(discover_seasons(select_base_path))
+    name_prefix = await tui_input("请输入剧集名称:", placeholder="TV show", default_value=py_name)
+    try:
+        groups = await walk_task
+    except ListingError as e:
+        logging.error(f"无法读取源目录: {e}")
+        export_metrics()
+        await close_apis()
+        tui_app.exit()
+        return
+    multi = not single_season(groups, select_base_path)
 
     # 选择目标地址
     dst_content_data = await choose_path(mode="dst")
@@ -330,26 +1217,373 @@ async def main_logic():
     select_dst_path = await show_file_browser(dst_content_data)
     logging.info(f"已选定目标地址目录\"{select_dst_path}\"")
 
-    # 创建结构文件夹
-    select_video_path = await auto_fs_structure(select_dst_path, hz_name)
+    if multi:
+        show_name = await tui_input("请输入剧集名称:", placeholder="一起去看流星雨",
+                                    default_value=hz_name or name_prefix)
+    else:
+        # 集数只用于默认的剧集名称，确定季数后再生成重命名计划
+        episodes = len(get_rename_rules().plan([file["name"] for file in groups[0]["files"]], name_prefix))
+        show_name = await tui_input("请输入剧集名称:", placeholder="一起去看流星雨",
+                                    default_value=f"{hz_name}（{episodes}集）")
+        season = await tui_input("请输入季数:", placeholder="01", default_value="01")
+        if not season.strip().isdigit():
+            logging.warning(f"季数 \"{season}\" 不是数字，使用第 1 季")
+        groups[0]["season"] = int(season) if season.strip().isdigit() else 1
 
-    # 进行文件复制
-    logging.info(f"开始复制文件到目标目录\"{select_video_path}\"")
-    await auto_copy_file(select_base_path, select_video_path)
-    logging.info("完成！")
+    # 编译执行计划后，重命名与各目标的建目录同时进行，复制在两者完成后开始
+    if not DRY_RUN:
+        await refresh_library()
+    seasons = await plan_seasons(groups, name_prefix)
+    results = await execute_show(seasons, select_dst_path, show_name, sync=config_manager.get("sync", True),
+                                 multi=multi, title=select_base_path)
+    if multi:
+        for r in results:
+            if r["status"] == "ok":
+                logging.info(f"第 {r['season']} 季完成: {r['source']} -> {r['target']}")
+            elif r["status"] == "failed":
+                logging.error(f"第 {r['season']} 季失败: {r['source']}，{r.get('error')}")
+    if DRY_RUN:
+        if all(r["status"] == "planned" for r in results):
+            logging.info("预演完成：以上为执行计划，没有修改任何文件")
+        await tui_input("预演结束，按回车退出", placeholder="回车退出")
+    elif all(r["status"] == "ok" for r in results):
+        logging.info("完成！")
+    else:
+        logging.error("未全部完成，请检查上方日志，下次启动可继续")
 
-    # 关闭命令
+    # 导出请求统计，关闭连接池与命令
+    export_metrics()
+    await close_apis()
     tui_app.exit()
 
+# ----------- 批量模式 -------------
+def load_manifest(manifest_path):
+    """
+    读取批量清单（JSON 或 YAML），返回 (剧集列表, 并发数)
+
+    清单可以是剧集列表，也可以是 {"workers": 3, "shows": [...]}。每个剧集：
+      source   源目录（必填）
+      name     媒体库中的剧集目录名，默认取源目录名的中文部分 +（N集）
+      season   季数，默认 1（源目录下有季子目录时只用于源目录本身的视频）
+      library  媒体库目录，默认使用配置中的 dst_dir
+      prefix   重命名前缀，默认取源目录名的拼音
+      sync     是否只复制目标中缺失或不一致的文件，默认使用配置中的 sync
+
+    :raises ValueError: 清单格式错误，或某个剧集不是包含 source 的对象
+    """
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        if Path(manifest_path).suffix.lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("读取 YAML 清单需要安装 PyYAML，或改用 JSON 清单")
+            try:
+                manifest = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"YAML 解析失败: {e}")
+        else:
+            manifest = json.load(f)
+    if isinstance(manifest, list):
+        shows, workers = manifest, None
+    elif isinstance(manifest, dict):
+        shows, workers = manifest.get("shows", []), manifest.get("workers")
+    else:
+        raise ValueError("清单应为剧集列表，或 {\"workers\": 3, \"shows\": [...]}")
+    if not isinstance(shows, list):
+        raise ValueError("shows 应为剧集列表")
+    # 在开始处理前检查全部剧集，以免某个剧集的错误中断整个批次
+    for index, show in enumerate(shows, 1):
+        if not isinstance(show, dict) or not show.get("source"):
+            raise ValueError(f"第 {index} 个剧集缺少 source（源目录）: {show!r}")
+    return shows, workers
+
+def season_copied(r):
+    """execute_show / resume_season 的一季结果中主目标是否已复制完成（从检查点继续的以整体状态为准）"""
+    if r.get("resumed"):
+        return r["status"] == "ok"
+    return bool(r["destinations"] and r["destinations"][0]["ok"])
+
+async def ingest_show(show, unfinished=None):
+    """
+    无交互地处理一个剧集：编译执行计划（重命名、建目录、复制、校验）并执行，返回结果摘要
+
+    源目录下有 S1、S2 等季子目录时各季同时处理，摘要中 seasons 为每季的结果。
+    预演模式下只编译并列出计划，status 为 "planned"。
+
+    :param unfinished: 操作日志中未完成的运行 {源目录: 运行}，该剧集（或其中某季）的目录在其中时从检查点继续
+    """
+    global oplist_api, config_manager
+    start = time.perf_counter()
+    source = show["source"]
+    unfinished = unfinished or {}
+    result = {"source": source, "status": "failed", "renamed": 0, "copied": False, "target": ""}
+    if source in unfinished:
+        r = await resume_season(unfinished[source])
+        result.update(status=r["status"], copied=r["status"] == "ok", target=r["target"], renamed=r["renamed"],
+                      resumed=True, mirrors=[
+                          {"name": m["name"], "target": mirror_target(m, r["target"])} for m in mirrors
+                      ] if r["target"] else [])
+        if "error" in r:
+            result["error"] = r["error"]
+        result["elapsed"] = time.perf_counter() - start
+        return result
+    try:
+        py_name, hz_name = hanzi_to_pinyin_until_symbol(Path(source).name)
+        prefix = show.get("prefix") or py_name or "TV show"
+        season = int(show.get("season", 1))
+        library = show.get("library") or config_manager.get("dst_dir", "")
+        sync = show.get("sync", config_manager.get("sync", True))
+
+        groups = await discover_seasons(source, season)
+        multi = not single_season(groups, source)
+        if not multi and not groups[0]["files"]:
+            raise RuntimeError("源目录为空或无法读取")
+        # 上次中断的季从检查点继续，其余各季编译为一个计划
+        resumed = [g for g in groups if g["path"] in unfinished]
+        seasons = await plan_seasons([g for g in groups if g["path"] not in unfinished], prefix)
+        if multi:
+            show_name = show.get("name") or hz_name or prefix
+        else:
+            show_name = show.get("name") or f"{hz_name or prefix}（{len(seasons[0]['rename_list'])}集）"
+        result["name"] = show_name
+        jobs = [resume_season(unfinished[g["path"]]) for g in resumed]
+        if seasons:
+            jobs.insert(0, execute_show(seasons, library, show_name, sync, multi, {"show": show}, source))
+        outcomes = await asyncio.gather(*jobs)
+        season_results = (outcomes[0] if seasons else []) + list(outcomes[1 if seasons else 0:])
+        planned = all(r["status"] == "planned" for r in season_results)
+        failed = [r for r in season_results if r["status"] == "failed"]
+
+        if multi:
+            result.update(seasons=season_results, renamed=sum(r["renamed"] for r in season_results),
+                          target=str(Path(library) / show_name))
+            if failed:
+                names = "、".join(f"第 {r['season']} 季" for r in failed)
+                raise RuntimeError(f"{names}处理失败")
+            result["copied"] = bool(season_results) and all(season_copied(r) for r in season_results)
+        else:
+            r = season_results[0]
+            result.update(renamed=r["renamed"], target=r["target"],
+                          mirrors=[d for d in r["destinations"] if d["name"] != PRIMARY])
+            if planned:
+                result["mirrors"] = [{"name": m["name"], "target": mirror_target(m, r["target"])} for m in mirrors]
+            if failed:
+                raise RuntimeError(r.get("error") or "处理失败")
+            result["copied"] = season_copied(r)
+        result["status"] = "planned" if planned else "ok"
+    except Exception as e:
+        result["error"] = str(e)
+        logging.error(f"剧集 {source} 处理失败: {e}")
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
+def log_result(r):
+    """输出 ingest_show 的结果摘要"""
+    if r["status"] == "ok":
+        resumed = "（从上次中断处继续）" if r.get("resumed") else ""
+        logging.info(f"[成功] {r['source']} -> {r['target']}，重命名 {r['renamed']} 个，"
+                     f"耗时 {r['elapsed']:.1f}s{resumed}")
+        for s in r.get("seasons", []):
+            logging.info(f"    第 {s['season']} 季 {s['source']} -> {s['target']}，重命名 {s['renamed']} 个")
+        for m in r.get("mirrors", []):
+            logging.info(f"    镜像 {m['name']} -> {m['target']}")
+    elif r["status"] == "planned":
+        logging.info(f"[预演] {r['source']} -> {r['target']}，计划重命名 {r['renamed']} 个")
+        for s in r.get("seasons", []):
+            logging.info(f"    第 {s['season']} 季 {s['source']} -> {s['target']}，计划重命名 {s['renamed']} 个")
+        for m in r.get("mirrors", []):
+            logging.info(f"    镜像 {m['name']} -> {m['target']}")
+    else:
+        logging.error(f"[失败] {r['source']}：{r.get('error')}，耗时 {r['elapsed']:.1f}s")
+
+def unfinished_by_source():
+    """操作日志中未完成的运行 {源目录: 运行}（同一源目录最近的一次优先）；预演模式不继续，以免修改云端"""
+    journal.compact()
+    unfinished = {}
+    for run in journal.unfinished_runs() if not DRY_RUN else []:
+        unfinished.setdefault(run.state()["source"], run)
+    return unfinished
+
+async def prepare_headless():
+    """无界面模式的读取配置与登录，配置缺失或无法登录时记录错误并返回 False（不会提示输入）"""
+    try:
+        await prepare_api()
+    except RuntimeError as e:
+        logging.error(f"无法连接 OpenList: {e}")
+        await close_apis()
+        return False
+    return True
+
+async def batch_logic(manifest_path, workers=None):
+    """按清单并发处理多个剧集，并输出每个剧集的摘要；清单无法读取或无法登录时返回 None"""
+    global oplist_api
+    try:
+        shows, manifest_workers = load_manifest(manifest_path)
+    except (OSError, ValueError, RuntimeError) as e:
+        logging.error(f"无法读取批量清单 {manifest_path}: {e}")
+        return None
+    workers = workers or manifest_workers or 3
+    if not await prepare_headless():
+        return None
+    logging.info(f"批量模式：共 {len(shows)} 个剧集，并发数 {workers}")
+
+    # 同一源目录上次中断的运行自动继续
+    unfinished = unfinished_by_source()
+    if not DRY_RUN:
+        await refresh_library()
+
+    semaphore = asyncio.Semaphore(workers)
+
+    async def worker(show):
+        async with semaphore:
+            return await ingest_show(show, unfinished)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(worker(show) for show in shows))
+    export_metrics()
+    await close_apis()
+
+    logging.info("========== 批量处理结果 ==========")
+    for r in results:
+        log_result(r)
+    if DRY_RUN:
+        ok_count = sum(r["status"] == "planned" for r in results)
+        logging.info(f"预演完成：{ok_count}/{len(results)} 个剧集的计划无误，没有修改任何文件")
+        return results
+    ok_count = sum(r["status"] == "ok" for r in results)
+    logging.info(f"完成 {ok_count}/{len(results)} 个剧集，总耗时 {time.perf_counter() - start:.1f}s")
+    return results
+
+async def watch_logic(interval=None):
+    """
+    监视模式：定期检查 base_dir，新出现或内容增加的分享目录按默认设置自动整理（配置项 watch）
+
+      interval      两次检查的间隔秒数，默认 300（命令行 --watch 秒数 优先）
+      settle        目录内容保持不变多少秒后才处理，默认 300
+      workers       同时处理的剧集数，默认 2
+      max_depth     分享目录下最多列出的层数，默认 3
+      rescan_after  超过该秒数未列出的目录即使修改时间未变也重新列出，默认 86400
+      state         监视状态文件，默认 watch.json（位于配置文件同目录）
+
+    检查时不要求上游刷新（refresh=False），只列出 base_dir 与修改时间有变化的目录，
+    每轮的请求数取决于变化了多少，而不是分享目录的总量。
+    """
+    global oplist_api, config_manager
+    from watcher import ShareWatcher
+    conf = config_manager.get("watch", {}) or {}
+    base_dir = config_manager.get("base_dir", "")
+    if not base_dir or not config_manager.get("dst_dir", ""):
+        logging.error("监视模式需要先在配置中设置 base_dir 和 dst_dir")
+        return False
+    interval = interval or conf.get("interval", 300)
+    if not await prepare_headless():
+        return False
+    watcher = ShareWatcher(base_dir, conf.get("state", "watch.json"), settle=conf.get("settle", 300),
+                           max_depth=conf.get("max_depth", 3), rescan_after=conf.get("rescan_after", 86400),
+                           persist=not DRY_RUN)
+    semaphore = asyncio.Semaphore(conf.get("workers", 2))
+    logging.info(f"监视模式：每 {interval}s 检查一次 {base_dir}，内容稳定 {watcher.settle}s 后自动整理")
+
+    async def worker(path, unfinished):
+        async with semaphore:
+            show = {"source": path}
+            if watcher.name(path):
+                # 内容增加后再次处理：沿用上次的剧集目录，只复制新增的文件
+                show.update(name=watcher.name(path), sync=True)
+            return await ingest_show(show, unfinished)
+
+    try:
+        while True:
+            start = time.perf_counter()
+            listed = await watcher.poll(oplist_api)
+            ready = watcher.ready()
+            if listed is not None:
+                logging.info(f"检查完成：列出 {listed} 个目录，耗时 {time.perf_counter() - start:.1f}s，"
+                             f"{len(ready)} 个待处理，{watcher.waiting() - len(ready)} 个等待内容稳定")
+            if ready:
+                unfinished = unfinished_by_source()
+                if not DRY_RUN:
+                    await refresh_library()
+                results = await asyncio.gather(*(worker(path, unfinished) for path in ready))
+                for path, r in zip(ready, results):
+                    log_result(r)
+                    watcher.finish(path, r["status"] in ("ok", "planned"), r.get("name", ""))
+            await asyncio.sleep(interval)
+    finally:
+        export_metrics()
+        await close_apis()
+
+def headless():
+    """无界面模式的公共设置：日志输出到终端，任何交互输入都视为错误"""
+    global HEADLESS
+    from colorama import init
+    init(autoreset=True)
+    HEADLESS = True
+    preload_pinyin()
+    handler = logging.StreamHandler()
+    handler.setFormatter(formatter)
+    logging.getLogger().addHandler(handler)
+    logging.getLogger().setLevel(logging.INFO)
+
+def batch(manifest_path, workers=None, profile=None):
+    """无界面批量入口，日志输出到终端"""
+    headless()
+    if profile:
+        results = asyncio.run(profiled(lambda: batch_logic(manifest_path, workers), profile))
+    else:
+        results = asyncio.run(batch_logic(manifest_path, workers))
+    if log_listener is not None:
+        log_listener.stop()
+    if results is None:
+        return False
+    return all(r["status"] == ("planned" if DRY_RUN else "ok") for r in results)
+
+def watch(interval=None, profile=None):
+    """无界面监视入口，Ctrl+C 停止"""
+    headless()
+    try:
+        if profile:
+            ok = asyncio.run(profiled(lambda: watch_logic(interval), profile))
+        else:
+            ok = asyncio.run(watch_logic(interval))
+    except KeyboardInterrupt:
+        logging.info("监视已停止")
+        ok = True
+    if log_listener is not None:
+        log_listener.stop()
+    return ok is not False
+
 # UI 启动
-def ui():
+def ui(profile=None):
     global tui_app
-    tui_app = tui.FileSelectorApp(main_logic)  # 直接传 async 的 main_logic
+    import tui
+    logic = main_logic if not profile else lambda: profiled(main_logic, profile)
+    tui_app = tui.FileSelectorApp(logic, metrics=request_metrics)  # 直接传 async 的 main_logic
     tui_handler = TUILogHandler(tui_app)
     tui_handler.setFormatter(formatter)
     logging.getLogger().addHandler(tui_handler)
     logging.getLogger().setLevel(logging.INFO)
     tui_app.run()
+    if log_listener is not None:
+        log_listener.stop()
 
 if __name__ == '__main__':
-    ui()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="OpenList 剧集整理工具")
+    parser.add_argument("--manifest", help="批量模式：按剧集清单（JSON/YAML）无界面处理")
+    parser.add_argument("--workers", type=int, default=None, help="批量模式下同时处理的剧集数")
+    parser.add_argument("--watch", nargs="?", type=float, const=0, default=None, metavar="秒",
+                        help="监视模式：定期检查 base_dir，自动整理新出现或内容增加的分享目录（可指定检查间隔）")
+    parser.add_argument("--profile", nargs="?", const="profile.prof", default=None,
+                        help="用 cProfile 分析整个运行过程并写入文件（默认 profile.prof）")
+    parser.add_argument("--transfer", choices=("copy", "auto"), default="",
+                        help="传输方式：copy 总是复制；auto 同一存储内改为服务器端移动，目标中已有相同文件时跳过（默认使用配置项 transfer）")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="预演：只列出每个剧集的执行计划（重命名、建目录、复制、校验步骤），不修改云端文件")
+    args = parser.parse_args()
+    DRY_RUN = args.dry_run
+    TRANSFER = args.transfer
+    if args.manifest:
+        raise SystemExit(0 if batch(args.manifest, args.workers, args.profile) else 1)
+    if args.watch is not None:
+        raise SystemExit(0 if watch(args.watch or None, args.profile) else 1)
+    ui(args.profile)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import json
+import time
+import unicodedata
+from collections import deque
+
+from copy_tracker import format_bytes
+
+
+def percentile(sorted_values, pct):
+    """最近秩百分位数，sorted_values 需已排序"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _cell(text, width, left=False):
+    """按显示宽度（中文占两列）补齐空格"""
+    text = str(text)
+    pad = width - sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+    return text + " " * pad if left else " " * pad + text
+
+
+class RequestMetrics:
+    """
+    记录每一次 OpenList 请求（包括重试）的接口、路径、请求/响应大小、状态与耗时，
+    并按接口汇总次数、错误数与耗时分布（p50/p95/max）。
+    """
+    def __init__(self, max_samples=5000, max_events=10000):
+        """
+        :param max_samples: 每个接口保留用于计算分位数的最近耗时样本数
+        :param max_events: 保留用于导出的最近请求记录数
+        """
+        self.max_samples = max_samples
+        self.started_at = time.time()
+        self.endpoints = {}  # 接口 -> 汇总
+        self.events = deque(maxlen=max_events)
+
+    def record(self, endpoint, path="", request_bytes=0, response_bytes=0, status="", latency=0.0, ok=True):
+        """
+        记录一次请求
+
+        :param endpoint: 接口，例如 "GET /api/fs/list"
+        :param status: HTTP 状态码与业务 code（如 "200/500"），或异常类型名
+        :param latency: 耗时（秒）
+        """
+        stat = self.endpoints.get(endpoint)
+        if stat is None:
+            stat = self.endpoints[endpoint] = {
+                "count": 0, "errors": 0, "max": 0.0, "total": 0.0,
+                "request_bytes": 0, "response_bytes": 0, "samples": deque(maxlen=self.max_samples),
+            }
+        stat["count"] += 1
+        stat["errors"] += 0 if ok else 1
+        stat["max"] = max(stat["max"], latency)
+        stat["total"] += latency
+        stat["request_bytes"] += request_bytes
+        stat["response_bytes"] += response_bytes
+        stat["samples"].append(latency)
+        self.events.append({
+            "time": time.time(), "endpoint": endpoint, "path": path, "request_bytes": request_bytes,
+            "response_bytes": response_bytes, "status": status, "latency": round(latency, 6), "ok": ok,
+        })
+
+    def summary(self):
+        """按接口汇总，耗时单位为毫秒，按总耗时从高到低排列"""
+        result = {}
+        for endpoint, stat in sorted(self.endpoints.items(), key=lambda item: -item[1]["total"]):
+            samples = sorted(stat["samples"])
+            result[endpoint] = {
+                "count": stat["count"],
+                "errors": stat["errors"],
+                "p50_ms": round(percentile(samples, 50) * 1000, 1),
+                "p95_ms": round(percentile(samples, 95) * 1000, 1),
+                "max_ms": round(stat["max"] * 1000, 1),
+                "total_ms": round(stat["total"] * 1000, 1),
+                "request_bytes": stat["request_bytes"],
+                "response_bytes": stat["response_bytes"],
+            }
+        return result
+
+    def format_table(self):
+        """汇总表的文本形式，供界面面板与日志使用"""
+        summary = self.summary()
+        if not summary:
+            return "暂无请求"
+        widths = (32, 7, 6, 9, 9, 9, 11, 11)
+        rows = [("接口", "次数", "错误", "p50", "p95", "max", "上行", "下行")]
+        for endpoint, s in summary.items():
+            rows.append((endpoint, s["count"], s["errors"], f"{s['p50_ms']:.0f}ms", f"{s['p95_ms']:.0f}ms",
+                         f"{s['max_ms']:.0f}ms", format_bytes(s["request_bytes"]), format_bytes(s["response_bytes"])))
+        return "\n".join("".join(_cell(value, width, left=i == 0) for i, (value, width) in enumerate(zip(row, widths)))
+                         for row in rows)
+
+    def export(self, filename):
+        """把汇总与最近的请求记录写入 JSON 文件"""
+        data = {
+            "started_at": self.started_at,
+            "finished_at": time.time(),
+            "endpoints": self.summary(),
+            "events": list(self.events),
+        }
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
@@ -1,28 +1,154 @@
-import requests
+import asyncio
+import httpx
 import logging
+import math
+import re
+import time
+
+from pathlib import PurePosixPath
+
+from copy_tracker import copy_task_paths
+from dir_cache import DirCache, ListingError, norm_path
+from metrics import RequestMetrics
+from request_policy import RequestPolicy
+from token_manager import TokenManager
+
+# 响应体开头的业务 code，统计时无需解析整个 JSON
+BODY_CODE = re.compile(rb'"code"\s*:\s*(\d+)')
+# 这些接口自己处理认证失败，不自动重新登录
+AUTH_ENDPOINTS = ("/api/auth/login", "/api/me")
+# 文件传输操作：接口与日志中的名称
+TRANSFER_OPS = {"copy": ("/api/fs/copy", "复制"), "move": ("/api/fs/move", "移动")}
+
+
+def body_code(response):
+    """响应体中的业务 code，没有时返回 None"""
+    match = BODY_CODE.search(response.content[:64])
+    return int(match.group(1)) if match else None
+
+class ChunkedResult:
+    """分块提交的结果：成功/失败的条目、每块的状态以及服务器返回的任务"""
+    def __init__(self):
+        self.succeeded = []
+        self.failed = []
+        self.chunks = []
+        self.tasks = []
+
+    def __bool__(self):
+        return not self.failed
 
 class OpenListAPI:
-    def __init__(self, prefix_url):
+    def __init__(self, prefix_url, policy: RequestPolicy = None, max_connections=10,
+                 cache_ttl=60.0, cache_size=256, chunk_size=100, chunk_concurrency=3, metrics: RequestMetrics = None):
         self.token = ""
         self.token_status = True
 
         self.prefix_url = prefix_url
         self.headers = {'Content-Type': 'application/json'}
 
+        # 超时、重试与熔断策略
+        self.policy = policy or RequestPolicy()
+        # 连接池：同一实例的所有请求复用 keep-alive 连接
+        self.timeout = self.policy.timeout
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections)
+        self._client = None
+
+        # 目录列表缓存与进行中的列目录请求（相同请求合并为一次）
+        self.dir_cache = DirCache(cache_ttl, cache_size)
+        self._inflight = {}
+
+        # 批量重命名/复制的分块大小与并发块数
+        self.chunk_size = chunk_size
+        self.chunk_concurrency = chunk_concurrency
+
+        # 存储挂载点（首次需要时获取一次）
+        self._mounts = None
+
+        # 每次请求（包括重试）的耗时与大小统计
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+
+        # Token 过期时间、提前续期与认证失败后的重新登录
+        self.tokens = TokenManager(self)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """懒创建连接池，保证在事件循环内初始化"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def open(self):
+        """提前创建连接池：构建 SSL 上下文较慢（约 100ms），放到线程中进行，不阻塞事件循环"""
+        if self._client is None or self._client.is_closed:
+            self._client = await asyncio.to_thread(httpx.AsyncClient, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def close(self):
+        """关闭连接池，停止 Token 续期"""
+        self.tokens.stop()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _timeout(self, timeout):
+        """单次调用的超时，未指定时使用实例默认值"""
+        return self.timeout if timeout is None else timeout
+
+    async def _send(self, method, endpoint, idempotent=True, timeout=None, **kwargs):
+        """经过重试与熔断策略发送请求，返回 httpx.Response"""
+        url = f"{self.prefix_url}{endpoint}"
+        name = f"{method} {endpoint}"
+        body = kwargs.get("json") or {}
+        path = str((kwargs.get("params") or {}).get("path") or body.get("path") or body.get("src_dir") or "")
+
+        async def call():
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, timeout=self._timeout(timeout), **kwargs)
+            except httpx.HTTPError as e:
+                self.metrics.record(name, path, status=type(e).__name__, latency=time.perf_counter() - start, ok=False)
+                raise
+            code = body_code(response)
+            self.metrics.record(
+                name, path,
+                request_bytes=int(response.request.headers.get("content-length") or 0),
+                response_bytes=len(response.content),
+                status=f"{response.status_code}/{code}" if code is not None else str(response.status_code),
+                latency=time.perf_counter() - start,
+                ok=response.status_code < 400 and (code is None or code == 200),
+            )
+            return response
+
+        response = await self.policy.send(call, name, idempotent=idempotent)
+        headers = kwargs.get("headers") or {}
+        if endpoint not in AUTH_ENDPOINTS and "Authorization" in headers and self._auth_failed(response):
+            # 认证失败的请求不会被执行，重新登录后可以安全地重放（包括非幂等请求）
+            stale = headers["Authorization"]
+            if await self.tokens.refresh(stale):
+                logging.info(f"已重新登录，重放请求 {name}")
+                kwargs["headers"] = {**headers, "Authorization": self.token}
+                response = await self.policy.send(call, name, idempotent=idempotent)
+        return response
+
+    @staticmethod
+    def _auth_failed(response):
+        return response.status_code == 401 or body_code(response) == 401
+
     def validation_info(self, info_list):
         if not all(info_list):
             logging.error("认证信息不完整")
             return False
         return True
 
-    def get_token(self, auth_info):
+    async def get_token(self, auth_info, timeout=None):
         logging.info("正在获取token")
         self.token_status = False
         try:
-            resp = requests.post(f"{self.prefix_url}/api/auth/login", json={
+            resp = await self._send("POST", "/api/auth/login", json={
                 'username': auth_info["username"],
                 'password': auth_info["password"],
-            }, headers=self.headers)
+            }, headers=self.headers, timeout=timeout)
             resp.raise_for_status()
             status_code = resp.json()["code"]
             if status_code == 200:
@@ -36,21 +162,21 @@ class OpenListAPI:
             else:
                 logging.error(f"Token 验证失败：服务器返回状态码 {resp.status_code}")
                 return 400, ""
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logging.error(f"请求异常: {e}")
             return 500, ""
         except ValueError:
             logging.error("响应解析失败，非JSON格式")
             return 500, ""
 
-    def verify_token(self, token: str):
+    async def verify_token(self, token: str, timeout=5):
         """验证指定 token 并返回状态字符串: success / auth_error / network_error"""
         logging.info("正在验证 Token...")
         try:
-            resp = requests.get(f"{self.prefix_url}/api/me", headers={'Authorization': token}, timeout=5)
+            resp = await self._send("GET", "/api/me", headers={'Authorization': token}, timeout=timeout)
             data = resp.json()
-            if resp.json()["code"] == 200:
-                username = resp.json()["data"]["username"]
+            if data["code"] == 200:
+                username = data["data"]["username"]
                 logging.info(f"Token 验证成功，用户名: {username}")
                 self.token = token
                 self.token_status = True
@@ -58,17 +184,52 @@ class OpenListAPI:
             else:
                 logging.error("网络连接正常，但 Token 验证失败")
                 return False
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             # 网络错误，可能是连接超时、DNS失败等
             logging.error(f"网络连接错误: {e}")
             return False
+        except ValueError:
+            logging.error("响应解析失败，非JSON格式")
+            return False
+
+    async def get_cloud_dir_info(self, path, password="", page=1, per_page=5, refresh=False, timeout=None):
+        """
+        获取云盘目录信息
 
-    def get_cloud_dir_info(self, path, password="", page=1, per_page=5, refresh=True):
+        refresh=False 时优先使用本地缓存，并与同时进行的相同请求共享结果；
+        refresh=True 时跳过缓存，并要求 OpenList 刷新上游网盘的目录。
+        """
         if not self.validation_info([self.token]):
             logging.error("请先认证获取Token")
             return None
+        key = DirCache.make_key(path, password, page, per_page)
+        if not refresh:
+            cached = self.dir_cache.get(key)
+            if cached is not None:
+                logging.debug(f"命中目录缓存: {key[0]}")
+                cached["path"] = path
+                return cached
+
+        inflight_key = (key, refresh)
+        task = self._inflight.get(inflight_key)
+        if task is None and not refresh:
+            # 正在进行的强制刷新结果同样可以直接使用
+            task = self._inflight.get((key, True))
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_dir_info(path, password, page, per_page, refresh, timeout))
+            self._inflight[inflight_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(inflight_key, None))
+        else:
+            logging.debug(f"合并相同的列目录请求: {key[0]}")
+        info_dict = await asyncio.shield(task)
+        if info_dict is None:
+            return None
+        return {**info_dict, "content": list(info_dict.get("content") or []), "path": path}
+
+    async def _fetch_dir_info(self, path, password, page, per_page, refresh, timeout):
+        """请求 /api/fs/list 并写入缓存"""
         params = {
-            "path": path,
+            "path": str(path),
             "password": password,
             "page": page,
             "per_page": per_page,
@@ -79,33 +240,177 @@ class OpenListAPI:
             "Content-Type": "application/json"
         }
         try:
-            response = requests.get(f"{self.prefix_url}/api/fs/list", params=params, headers=headers)
+            response = await self._send("GET", "/api/fs/list", params=params, headers=headers, timeout=timeout)
             response.raise_for_status()
             data = response.json()
             if data.get("code") == 200:
-                logging.info("云盘目录信息获取成功")
+                logging.info("云盘目录信息获取成功", extra={"detail": True})
                 info_dict = data.get("data")
                 info_dict["path"] = path  # 添加当前路径信息
+                self.dir_cache.put(DirCache.make_key(path, password, page, per_page), info_dict)
                 return info_dict
             else:
-                logging.error(f"获取云盘目录信息失败: {data.get('msg')}")
+                logging.error(f"获取云盘目录信息失败: {data.get('message') or data.get('msg')}")
                 return None
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logging.error(f"请求异常: {e}")
             return None
         except ValueError:
             logging.error("响应解析失败，非JSON格式")
             return None
 
-    def get_all_files_from_dir(self, path, password=""):
-        """获取指定目录下的所有文件"""
+    async def iter_dir(self, path, password="", per_page=200, refresh=False, concurrency=4):
+        """
+        分页遍历目录，逐条产出文件信息
+
+        先请求第一页拿到 total，再以最多 concurrency 个并发请求其余页，
+        哪一页先返回就先产出哪一页的条目（顺序不保证）。
+        任何一页获取失败都抛出 ListingError，调用方不会把不完整的列表当成完整的目录。
+
+        :param path: 目录路径
+        :param per_page: 每页条目数
+        :param refresh: 是否要求 OpenList 刷新上游目录（只对第一页生效）
+        :param concurrency: 并发请求的页数上限
+        :raises ListingError: 任何一页获取失败
+        """
+        if refresh:
+            self.dir_cache.invalidate(path)
+        first = await self.get_cloud_dir_info(path, password, 1, per_page, refresh=refresh)
+        if first is None:
+            raise ListingError(f"{path} 列表获取失败")
+        for entry in first["content"]:
+            yield entry
+
+        total = first.get("total")
+        if not isinstance(total, int):
+            # 服务器未返回 total 时逐页读取，直到某页不足 per_page
+            page, count = 1, len(first["content"])
+            while count >= per_page:
+                page += 1
+                info = await self.get_cloud_dir_info(path, password, page, per_page)
+                if info is None:
+                    raise ListingError(f"{path} 第 {page} 页获取失败，文件列表不完整")
+                for entry in info["content"]:
+                    yield entry
+                count = len(info["content"])
+            return
+
+        pages = math.ceil(total / per_page)
+        if pages <= 1:
+            return
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(page_no):
+            async with semaphore:
+                return page_no, await self.get_cloud_dir_info(path, password, page_no, per_page)
+
+        tasks = [asyncio.ensure_future(fetch(page_no)) for page_no in range(2, pages + 1)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                page_no, info = await next_done
+                if info is None:
+                    raise ListingError(f"{path} 第 {page_no} 页获取失败，文件列表不完整")
+                for entry in info["content"]:
+                    yield entry
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def get_all_files_from_dir(self, path, password="", refresh=False):
+        """获取指定目录下的所有文件，获取失败或不完整时返回 None"""
         logging.info("正在获取文件列表")
-        files_info = self.get_cloud_dir_info(path, password, 1, 9999, refresh=True)
-        logging.info("获取文件列表成功")
-        return files_info["content"]
+        try:
+            files = [entry async for entry in self.iter_dir(path, password, refresh=refresh)]
+        except ListingError as e:
+            logging.error(str(e))
+            return None
+        logging.info(f"获取文件列表完成，共 {len(files)} 项")
+        return files
+
+    async def _current_names(self, path):
+        """刷新并列出目录中的名称，用于失败后核对实际状态；列出失败时返回 None"""
+        try:
+            return {entry["name"] async for entry in self.iter_dir(path, refresh=True)}
+        except ListingError as e:
+            logging.warning(f"无法核对目录的实际状态: {e}")
+            return None
+
+    async def walk(self, path, max_depth=3, concurrency=8, refresh=False):
+        """
+        并发遍历整个目录树（广度优先）
+
+        同时最多列出 concurrency 个目录，每个目录列完立即开始列它的子目录，
+        不必等同一层的其他目录。
+
+        :param max_depth: 最多向下遍历的层数，0 表示只列出 path 本身
+        :param refresh: 是否要求 OpenList 刷新上游目录
+        :return: {目录路径: [该目录下的条目]}，目录路径已规范化
+        :raises ListingError: 任何一个目录列出失败
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def list_dir(dir_path, depth):
+            async with semaphore:
+                return dir_path, depth, [entry async for entry in self.iter_dir(dir_path, refresh=refresh)]
+
+        tree = {}
+        pending = {asyncio.ensure_future(list_dir(norm_path(path), 0))}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    dir_path, depth, entries = task.result()
+                    tree[dir_path] = entries
+                    if depth >= max_depth:
+                        continue
+                    for entry in entries:
+                        if entry.get("is_dir"):
+                            child = str(PurePosixPath(dir_path) / entry["name"])
+                            pending.add(asyncio.ensure_future(list_dir(child, depth + 1)))
+        finally:
+            for task in pending:
+                task.cancel()
+        logging.info(f"目录树遍历完成: {path}，共 {len(tree)} 个目录，"
+                     f"{sum(not e.get('is_dir') for entries in tree.values() for e in entries)} 个文件")
+        return tree
+
+    async def _run_chunks(self, items, submit, chunk_size=None, concurrency=None, label="提交", on_chunk=None):
+        """
+        把 items 分块后以有限并发提交
+
+        :param submit: 协程函数，参数为一个分块，返回 (是否成功, 错误信息, 任务列表)
+        :param on_chunk: 每块结束后调用 on_chunk(是否成功, 分块, 任务列表)，用于记录进度
+        :return: ChunkedResult
+        """
+        chunk_size = chunk_size or self.chunk_size
+        semaphore = asyncio.Semaphore(concurrency or self.chunk_concurrency)
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        result = ChunkedResult()
+
+        async def run(index, chunk):
+            async with semaphore:
+                ok, error, tasks = await submit(chunk)
+            result.chunks.append({"index": index, "size": len(chunk), "ok": ok, "error": error})
+            if on_chunk is not None:
+                on_chunk(ok, chunk, tasks)
+            if ok:
+                result.succeeded.extend(chunk)
+                result.tasks.extend(tasks or [])
+            else:
+                result.failed.extend(chunk)
+                logging.error(f"{label}第 {index + 1}/{len(chunks)} 块失败（{len(chunk)} 项）: {error}，"
+                              f"失败项: {', '.join(self._item_name(item) for item in chunk)}")
+
+        await asyncio.gather(*(run(index, chunk) for index, chunk in enumerate(chunks)))
+        result.chunks.sort(key=lambda c: c["index"])
+        return result
 
-    def rename_file(self, path, rename_list):
-        """重命名文件"""
+    @staticmethod
+    def _item_name(item):
+        return item["src_name"] if isinstance(item, dict) else str(item)
+
+    async def _rename_chunk(self, path, rename_list, timeout=None):
+        """提交一块重命名，返回 (是否成功, 错误信息, None)"""
         headers = {
             "Authorization": self.token,
             "Content-Type": "application/json"
@@ -115,29 +420,140 @@ class OpenListAPI:
             "rename_objects": rename_list
         }
         try:
-            response = requests.post(f"{self.prefix_url}/api/fs/batch_rename", json=payload, headers=headers)
+            response = await self._send("POST", "/api/fs/batch_rename", idempotent=False,
+                                        json=payload, headers=headers, timeout=timeout)
             response.raise_for_status()
             data = response.json()
             if data.get("code") == 200:
-                logging.info("文件重命名成功")
-                return True
+                return True, "", None
             else:
-                logging.error(f"文件重命名失败: {data.get('content')['msg']}")
-                return False
-        except requests.RequestException as e:
-            logging.error(f"请求异常: {e}")
-            return False
+                self.dir_cache.invalidate(path)
+                return False, data.get("message") or data.get("msg"), None
+        except httpx.HTTPError as e:
+            self.dir_cache.invalidate(path)
+            return False, f"请求异常: {e}", None
+        except ValueError:
+            self.dir_cache.invalidate(path)
+            return False, "响应解析失败，非JSON格式", None
 
-    def copy_file(self, src_dir, dst_dir, file_list):
+    async def _regex_rename(self, path, src_regex, new_regex, timeout=None):
+        """提交一条正则重命名（/api/fs/regex_rename），返回 (是否成功, 错误信息, None)"""
+        headers = {
+            "Authorization": self.token,
+            "Content-Type": "application/json"
+        }
+        payload = {
+            "src_dir": path,
+            "src_name_regex": src_regex,
+            "new_name_regex": new_regex
+        }
+        try:
+            response = await self._send("POST", "/api/fs/regex_rename", idempotent=False,
+                                        json=payload, headers=headers, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+            if data.get("code") == 200:
+                return True, "", None
+            return False, data.get("message") or data.get("msg"), None
+        except httpx.HTTPError as e:
+            return False, f"请求异常: {e}", None
+        except ValueError:
+            return False, "响应解析失败，非JSON格式", None
+
+    async def _rename_by_regex(self, path, rename_list, regex_rules, timeout=None, on_chunk=None):
         """
-        调用 Alist API 创建文件复制任务
+        依次提交正则重命名规则，任何一条失败时重新列目录，找出仍需逐个文件提交的条目
 
-        :param token: 身份认证 token（Authorization header）
-        :param src_dir: 源文件夹路径，字符串
-        :param dst_dir: 目标文件夹路径，字符串
-        :param file_list: 要复制的文件名列表，例如 ["a.mp4", "b.mp4"]
-        :return: True 表示启动任务成功，False 失败
+        服务器逐个改名、遇错即停，失败的规则可能已部分生效，以目录中的实际名称为准。
+
+        :return: (已完成的条目, 仍需提交的条目)
         """
+        done = []
+        for index, rule in enumerate(regex_rules):
+            ok, error, _ = await self._regex_rename(path, rule["src"], rule["new"], timeout)
+            if not ok:
+                logging.warning(f"正则重命名第 {index + 1}/{len(regex_rules)} 条失败: {error}，剩余文件改为逐个提交")
+                break
+            done.extend(rule["items"])
+            if on_chunk is not None:
+                on_chunk(True, rule["items"], None)
+        else:
+            logging.info(f"正则重命名完成：{len(regex_rules)} 个请求，共 {len(done)} 项")
+            return done, []
+        reported = {item["src_name"] for item in done}
+        names = await self._current_names(path)
+        if names is None:
+            # 无法核对时剩余条目全部按块提交，已改名的条目会提交失败并在重试前再次核对
+            return done, [item for item in rename_list if item["src_name"] not in reported]
+        already = [item for item in rename_list if item["src_name"] not in reported
+                   and item["new_name"] in names and item["src_name"] not in names]
+        if already and on_chunk is not None:
+            on_chunk(True, already, None)
+        reported.update(item["src_name"] for item in already)
+        return done + already, [item for item in rename_list if item["src_name"] not in reported]
+
+    async def rename_file(self, path, rename_list, chunk_size=None, concurrency=None, retries=1, timeout=None,
+                          on_chunk=None, regex_rules=None):
+        """
+        批量重命名文件，按块并发提交
+
+        失败的块可能已部分生效，重试前会重新列目录核对：已是新名称的视为成功，
+        仍是原名称的才重新提交。
+
+        :param rename_list: [{"src_name": ..., "new_name": ...}, ...]
+        :param chunk_size: 每块条目数，默认使用实例设置
+        :param concurrency: 同时提交的块数，默认使用实例设置
+        :param retries: 失败条目的重试轮数
+        :param on_chunk: 每块结束后的回调，见 _run_chunks
+        :param regex_rules: 与 rename_list 等价的正则规则（RenameRules.regex_plan），给出时优先用
+                            /api/fs/regex_rename 提交，请求大小与文件数无关；失败的部分改为按块提交
+        :return: ChunkedResult，全部成功时为真值
+        """
+        done = []
+        if regex_rules:
+            done, rename_list = await self._rename_by_regex(path, rename_list, regex_rules, timeout, on_chunk)
+        result = await self._run_chunks(
+            rename_list, lambda chunk: self._rename_chunk(path, chunk, timeout),
+            chunk_size, concurrency, label="重命名", on_chunk=on_chunk,
+        )
+        result.succeeded = done + result.succeeded
+        # 全部一次成功时，所有块结束后一次性更新缓存（逐块更新时每块都要遍历整个目录的缓存）
+        clean = not result.failed
+        for attempt in range(1, retries + 1):
+            if not result.failed:
+                break
+            names = await self._current_names(path)
+            if names is None:
+                logging.error(f"无法核对重命名失败的 {len(result.failed)} 项，不再重试")
+                break
+            already = [item for item in result.failed
+                       if item["new_name"] in names and item["src_name"] not in names]
+            pending = [item for item in result.failed if item["src_name"] in names]
+            missing = [item for item in result.failed if item not in already and item not in pending]
+            logging.warning(f"重命名失败 {len(result.failed)} 项，其中 {len(already)} 项实际已完成，"
+                            f"第 {attempt} 次重试剩余 {len(pending)} 项")
+            if already and on_chunk is not None:
+                on_chunk(True, already, None)
+            retry_result = await self._run_chunks(
+                pending, lambda chunk: self._rename_chunk(path, chunk, timeout),
+                chunk_size, concurrency, label="重命名重试", on_chunk=on_chunk,
+            )
+            result.succeeded.extend(already + retry_result.succeeded)
+            result.failed = missing + retry_result.failed
+            result.chunks.extend(retry_result.chunks)
+
+        if clean:
+            self.dir_cache.apply_renames(path, result.succeeded)
+        else:
+            self.dir_cache.invalidate(path)
+        if result.failed:
+            logging.error(f"文件重命名部分失败：成功 {len(result.succeeded)} 项，失败 {len(result.failed)} 项")
+        else:
+            logging.info(f"文件重命名成功，共 {len(result.succeeded)} 项")
+        return result
+
+    async def _transfer_chunk(self, op, src_dir, dst_dir, file_list, timeout=None):
+        """提交一块复制或移动，返回 (是否成功, 错误信息, 任务列表)"""
         headers = {
             "Authorization": self.token,
             "Content-Type": "application/json"
@@ -150,25 +566,244 @@ class OpenListAPI:
         }
 
         try:
-            logging.info(f"正在创建复制任务:{src_dir} -> {dst_dir}")
-            response = requests.post(f"{self.prefix_url}/api/fs/copy", json=payload, headers=headers)
+            response = await self._send("POST", TRANSFER_OPS[op][0], idempotent=False,
+                                        json=payload, headers=headers, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+            if data.get("code") == 200:
+                return True, "", (data.get("data") or {}).get("tasks") or []
+            else:
+                return False, data.get("message") or data.get("msg"), None
+        except httpx.HTTPError as e:
+            return False, f"请求异常: {e}", None
+        except ValueError:
+            return False, "响应解析失败，非JSON格式", None
+
+    async def _transfer(self, op, src_dir, dst_dir, file_list, chunk_size=None, concurrency=None, retries=1,
+                        timeout=None, on_chunk=None):
+        """按块并发提交复制或移动，只重试失败的块（重试前核对已实际完成或已提交的文件），见 copy_file"""
+        label = TRANSFER_OPS[op][1]
+
+        async def submit(chunk):
+            return await self._transfer_chunk(op, src_dir, dst_dir, chunk, timeout)
+
+        result = await self._run_chunks(file_list, submit, chunk_size, concurrency, label=label, on_chunk=on_chunk)
+        for attempt in range(1, retries + 1):
+            if not result.failed:
+                break
+            if op == "move":
+                # 移动不是幂等操作：请求超时时可能已经完成，已离开源目录并出现在目标目录的不再重试
+                src_names = await self._current_names(src_dir)
+                dst_names = await self._current_names(dst_dir)
+                if src_names is None or dst_names is None:
+                    logging.error(f"无法核对移动失败的 {len(result.failed)} 个文件，不再重试")
+                    break
+                moved = [name for name in result.failed if name not in src_names and name in dst_names]
+                result.succeeded.extend(moved)
+                result.failed = [name for name in result.failed if name not in moved]
+                if not result.failed:
+                    break
+            else:
+                # 客户端超时的块可能已在服务器上创建了复制任务，直接重新提交会重复传输
+                reconciled = await self._submitted_copies(src_dir, dst_dir, result.failed)
+                if reconciled is None:
+                    logging.error(f"无法核对复制失败的 {len(result.failed)} 个文件，不再重试")
+                    break
+                submitted, tasks = reconciled
+                already = [name for name in result.failed if name in submitted]
+                if already:
+                    logging.info(f"复制失败的文件中 {len(already)} 个实际已提交，不再重复提交")
+                    if on_chunk is not None:
+                        on_chunk(True, already, tasks)
+                result.succeeded.extend(already)
+                result.tasks.extend(tasks)
+                result.failed = [name for name in result.failed if name not in submitted]
+                if not result.failed:
+                    break
+            logging.warning(f"第 {attempt} 次重试提交失败的 {len(result.failed)} 个文件")
+            retry_result = await self._run_chunks(result.failed, submit, chunk_size, concurrency,
+                                                  label=f"{label}重试", on_chunk=on_chunk)
+            result.succeeded.extend(retry_result.succeeded)
+            result.tasks.extend(retry_result.tasks)
+            result.failed = retry_result.failed
+            result.chunks.extend(retry_result.chunks)
+
+        if result.succeeded:
+            self.dir_cache.invalidate(dst_dir)
+            if op == "move":
+                self.dir_cache.invalidate(src_dir)
+        if result.failed:
+            logging.error(f"{label}部分失败：成功 {len(result.succeeded)} 项，失败 {len(result.failed)} 项")
+        return result
+
+    async def _submitted_copies(self, src_dir, dst_dir, names):
+        """
+        names 中实际已提交的复制：目标目录中已有（同存储复制直接完成），或有未完成的复制任务
+
+        目标中原有的旧版本同样视为已提交，大小不一致由复制后的校验发现。
+
+        :return: (已提交的文件名集合, 对应的复制任务列表)；无法列出目标目录或获取任务列表时返回 None
+        """
+        dst_names = await self._current_names(dst_dir)
+        tasks = await self.get_copy_tasks("undone")
+        if dst_names is None or tasks is None:
+            return None
+        wanted, src_key, dst_key = set(names), norm_path(src_dir), norm_path(dst_dir)
+        submitted = wanted & dst_names
+        running = []
+        for task in tasks:
+            paths = copy_task_paths(task.get("name", ""))
+            if paths is None or paths[1] != dst_key:
+                continue
+            parent, _, name = paths[0].rpartition("/")
+            if (parent or "/") == src_key and name in wanted:
+                submitted.add(name)
+                running.append(task)
+        return submitted, running
+
+    async def copy_file(self, src_dir, dst_dir, file_list, chunk_size=None, concurrency=None, retries=1,
+                        timeout=None, on_chunk=None):
+        """
+        调用 Alist API 创建文件复制任务，按块并发提交，只重试失败的块
+
+        :param src_dir: 源文件夹路径，字符串
+        :param dst_dir: 目标文件夹路径，字符串
+        :param file_list: 要复制的文件名列表，例如 ["a.mp4", "b.mp4"]
+        :param chunk_size: 每块文件数，默认使用实例设置
+        :param concurrency: 同时提交的块数，默认使用实例设置
+        :param retries: 失败块的重试轮数
+        :param timeout: 本次调用的超时（秒），默认使用实例设置
+        :param on_chunk: 每块结束后的回调，见 _run_chunks
+        :return: ChunkedResult，tasks 为服务器返回的任务（同存储复制或旧版本服务器可能为空）
+        """
+        logging.info(f"正在创建复制任务:{src_dir} -> {dst_dir}")
+        result = await self._transfer("copy", src_dir, dst_dir, file_list, chunk_size, concurrency, retries,
+                                      timeout, on_chunk)
+        if not result.failed:
+            logging.info("创建复制任务成功")
+        return result
+
+    async def move_file(self, src_dir, dst_dir, file_list, chunk_size=None, concurrency=None, retries=1,
+                        timeout=None, on_chunk=None):
+        """
+        移动文件（/api/fs/move），参数与返回值同 copy_file
+
+        源与目标位于同一存储时由存储在服务器端完成（通常只是改变路径），不下载也不上传文件内容。
+        """
+        logging.info(f"正在移动:{src_dir} -> {dst_dir}")
+        result = await self._transfer("move", src_dir, dst_dir, file_list, chunk_size, concurrency, retries,
+                                      timeout, on_chunk)
+        if not result.failed:
+            logging.info(f"移动成功，共 {len(result.succeeded)} 项")
+        return result
+
+    async def storage_mounts(self, timeout=None):
+        """
+        启用中的存储挂载路径（/api/admin/storage/list，需要管理员账号），每个实例只获取一次
+
+        :return: 挂载路径列表，按长度从长到短；没有权限或请求失败时返回 None
+        """
+        if self._mounts is None:
+            self._mounts = asyncio.ensure_future(self._fetch_mounts(timeout))
+        return await asyncio.shield(self._mounts)
+
+    async def _fetch_mounts(self, timeout=None):
+        headers = {
+            "Authorization": self.token,
+            "Content-Type": "application/json"
+        }
+        try:
+            response = await self._send("GET", "/api/admin/storage/list", params={"page": 1, "per_page": 0},
+                                        headers=headers, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+            if data.get("code") == 200:
+                storages = (data.get("data") or {}).get("content") or []
+                mounts = [norm_path(s["mount_path"]) for s in storages if s.get("mount_path") and not s.get("disabled")]
+                logging.info(f"已获取 {len(mounts)} 个存储挂载点", extra={"detail": True})
+                return sorted(mounts, key=len, reverse=True)
+            logging.warning(f"无法获取存储列表: {data.get('message') or data.get('msg')}")
+            return None
+        except httpx.HTTPError as e:
+            logging.warning(f"无法获取存储列表: {e}")
+            return None
+        except ValueError:
+            logging.error("响应解析失败，非JSON格式")
+            return None
+
+    async def mount_of(self, path):
+        """path 所在存储的挂载路径（最长的匹配前缀），无法确定时返回 None"""
+        mounts = await self.storage_mounts()
+        if mounts is None:
+            return None
+        path = norm_path(path)
+        for mount in mounts:
+            if mount == "/" or path == mount or path.startswith(mount + "/"):
+                return mount
+        return None
+
+    async def get_copy_tasks(self, state="undone", timeout=None):
+        """
+        获取复制任务列表
+
+        :param state: "undone" 未完成的任务，"done" 已结束的任务
+        :return: 任务列表，每项包含 id/name/state/progress/error 等字段；失败返回 None
+        """
+        headers = {
+            "Authorization": self.token,
+            "Content-Type": "application/json"
+        }
+        try:
+            response = await self._send("GET", f"/api/task/copy/{state}", headers=headers, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+            if data.get("code") == 200:
+                return data.get("data") or []
+            else:
+                logging.error(f"获取复制任务失败: {data.get('message')}")
+                return None
+        except httpx.HTTPError as e:
+            logging.error(f"请求异常: {e}")
+            return None
+        except ValueError:
+            logging.error("响应解析失败，非JSON格式")
+            return None
+
+    async def copy_task_action(self, action, tid, timeout=None):
+        """
+        对复制任务执行操作
+
+        :param action: "retry" 重试失败的任务，"cancel" 取消任务
+        :param tid: 任务 id
+        :return: True 表示成功，False 表示失败
+        """
+        headers = {
+            "Authorization": self.token,
+            "Content-Type": "application/json"
+        }
+        try:
+            response = await self._send("POST", f"/api/task/copy/{action}", idempotent=False,
+                                        params={"tid": tid}, headers=headers, timeout=timeout)
             response.raise_for_status()
             data = response.json()
             if data.get("code") == 200:
-                logging.info("创建复制任务成功")
                 return True
             else:
-                logging.error(f"创建复制任务失败: {data.get('msg')}")
+                logging.error(f"复制任务 {action} 失败: {data.get('message')}")
                 return False
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logging.error(f"请求异常: {e}")
             return False
+        except ValueError:
+            logging.error("响应解析失败，非JSON格式")
+            return False
 
-    def mkdir(self, path):
+    async def mkdir(self, path, timeout=None):
         """
         创建新文件夹
 
         :param path: 新目录路径，例如 "/tt" 或 "/Video/NewSeason"
+        :param timeout: 本次调用的超时（秒），默认使用实例设置
         :return: True 表示成功创建，False 表示失败
         """
         headers = {
@@ -181,19 +816,25 @@ class OpenListAPI:
         }
 
         try:
-            response = requests.post(f"{self.prefix_url}/api/fs/mkdir", json=payload, headers=headers)
             logging.info(f"正在创建目录: {path}")
+            response = await self._send("POST", "/api/fs/mkdir", json=payload, headers=headers, timeout=timeout)
             response.raise_for_status()
             data = response.json()
             if data.get("code") == 200:
                 logging.info(f"目录创建成功: {path}")
+                # 可能同时创建了多级目录，上级目录缓存全部失效
+                for parent in PurePosixPath(norm_path(path)).parents:
+                    self.dir_cache.invalidate(parent)
                 return True
             else:
                 logging.error(f"目录创建失败: {data.get('message')}")
                 return False
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logging.error(f"请求异常: {e}")
             return False
+        except ValueError:
+            logging.error("响应解析失败，非JSON格式")
+            return False
 
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    pass
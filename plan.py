@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+
+# 步骤类型，describe() 中按此顺序显示
+KINDS = {"rename": "重命名", "mkdir": "建目录", "copy": "复制", "verify": "校验"}
+
+
+class Step:
+    """计划中的一个步骤：action 为无参数的协程函数，返回 False 或抛出异常视为失败"""
+    def __init__(self, name, kind, target, action, deps=(), outputs=()):
+        self.name = name
+        self.kind = kind
+        self.target = target
+        self.action = action
+        self.deps = list(deps)
+        self.outputs = list(outputs)
+        self.status = "pending"  # pending / scheduled / running / done / failed / skipped
+        self.result = None
+        self.error = ""
+        self.elapsed = 0.0
+
+
+class Plan:
+    """
+    一次整理任务的执行计划：由 重命名 / 建目录 / 复制 / 校验 步骤组成的有向无环图
+
+    先完整编译计划，检查依赖与目标冲突（problems()）、打印预演（describe()），
+    再由 execute() 在全局并发上限内同时执行所有依赖已满足的步骤；
+    某个步骤失败时，依赖它的步骤全部跳过，其余分支继续执行。
+    """
+    def __init__(self, title=""):
+        """:param title: 计划名称（例如源目录），用于区分同时执行的多个计划的日志"""
+        self.title = title
+        self._log_prefix = f"[{title}] " if title else ""
+        self.steps = {}  # 按添加顺序
+
+    def __len__(self):
+        return len(self.steps)
+
+    def result(self, name):
+        """已完成步骤的返回值"""
+        return self.steps[name].result
+
+    def add(self, name, kind, target, action, deps=(), outputs=()):
+        """
+        添加一个步骤
+
+        :param name: 步骤名称（计划内唯一），也用于依赖引用
+        :param target: 步骤操作的路径，仅用于显示
+        :param deps: 必须先成功完成的步骤名称
+        :param outputs: 步骤会在云端产生的路径，用于检查不同步骤写入同一路径
+        :return: 步骤名称
+        """
+        if name in self.steps:
+            raise ValueError(f"计划中已有同名步骤: {name}")
+        self.steps[name] = Step(name, kind, target, action, deps, outputs)
+        return name
+
+    def waves(self):
+        """按依赖分层：同一层的步骤互不依赖，可以同时执行。存在环时环上的步骤不出现在结果中"""
+        depth, remaining = {}, dict(self.steps)
+        while remaining:
+            ready = [name for name, step in remaining.items()
+                     if all(dep in depth for dep in step.deps if dep in self.steps)]
+            if not ready:
+                break
+            for name in ready:
+                depth[name] = max((depth[dep] + 1 for dep in remaining[name].deps if dep in depth), default=0)
+                del remaining[name]
+        layers = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for name in self.steps:
+            if name in depth:
+                layers[depth[name]].append(self.steps[name])
+        return layers
+
+    def problems(self):
+        """编译期检查：未知依赖、循环依赖、多个步骤写入同一路径。返回问题描述列表，空列表表示可以执行"""
+        problems = []
+        for step in self.steps.values():
+            for dep in step.deps:
+                if dep not in self.steps:
+                    problems.append(f"步骤「{step.name}」依赖不存在的步骤「{dep}」")
+        scheduled = {step.name for layer in self.waves() for step in layer}
+        cyclic = [name for name in self.steps if name not in scheduled]
+        if cyclic:
+            problems.append(f"步骤之间存在循环依赖: {'、'.join(cyclic)}")
+        writers = {}
+        for step in self.steps.values():
+            for path in step.outputs:
+                writers.setdefault(path, []).append(step.name)
+        for path, names in writers.items():
+            if len(names) > 1:
+                problems.append(f"{path} 会被写入 {len(names)} 次（{'、'.join(dict.fromkeys(names))}）")
+        return problems
+
+    def describe(self):
+        """预演：按可同时执行的批次列出全部步骤"""
+        lines = [f"{self._log_prefix}执行计划：共 {len(self.steps)} 个步骤"]
+        for index, layer in enumerate(self.waves(), 1):
+            lines.append(f"第 {index} 批（{len(layer)} 个步骤可同时执行）:")
+            for step in sorted(layer, key=lambda s: list(KINDS).index(s.kind) if s.kind in KINDS else len(KINDS)):
+                deps = f"  ← {'、'.join(step.deps)}" if step.deps else ""
+                lines.append(f"  [{KINDS.get(step.kind, step.kind)}] {step.name}: {step.target}{deps}")
+        return "\n".join(lines)
+
+    def _skip_dependents(self, failed):
+        """把依赖 failed 的步骤（递归）标记为跳过"""
+        stack = [failed]
+        while stack:
+            name = stack.pop()
+            for step in self.steps.values():
+                if name in step.deps and step.status == "pending":
+                    step.status = "skipped"
+                    step.error = f"依赖的步骤「{name}」未成功"
+                    logging.warning(f"{self._log_prefix}跳过步骤「{step.name}」：{step.error}")
+                    stack.append(step.name)
+
+    async def _run_step(self, step, semaphore):
+        async with semaphore:
+            step.status = "running"
+            start = time.perf_counter()
+            try:
+                step.result = await step.action()
+            except Exception as e:
+                step.result = False
+                step.error = str(e)
+                logging.error(f"{self._log_prefix}步骤「{step.name}」出错: {e}")
+            step.elapsed = time.perf_counter() - start
+        step.status = "failed" if step.result is False else "done"
+        return step
+
+    async def execute(self, semaphore=None, concurrency=8):
+        """
+        执行计划：依赖全部成功的步骤立即启动，同时运行的步骤数受 semaphore 限制
+
+        :param semaphore: 多个计划共用的并发上限（批量模式下各剧集共用），默认按 concurrency 新建
+        :return: 全部步骤成功时返回 True
+        """
+        problems = self.problems()
+        if problems:
+            for problem in problems:
+                logging.error(f"{self._log_prefix}计划有误: {problem}")
+            return False
+        semaphore = semaphore or asyncio.Semaphore(concurrency)
+        running = set()
+        try:
+            while True:
+                for step in self.steps.values():
+                    if step.status == "pending" and all(self.steps[dep].status == "done" for dep in step.deps):
+                        step.status = "scheduled"
+                        running.add(asyncio.ensure_future(self._run_step(step, semaphore)))
+                if not running:
+                    break
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step = task.result()
+                    if step.status == "failed":
+                        self._skip_dependents(step.name)
+        finally:
+            for task in running:
+                task.cancel()
+        return all(step.status == "done" for step in self.steps.values())
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from pathlib import PurePosixPath
+
+from create_conf import resource_path
+from dir_cache import ListingError, norm_path
+from sync_diff import parse_hash_info
+
+
+def fuzzy_score(query, text):
+    """
+    模糊匹配打分：query 的字符按顺序出现在 text 中即为匹配
+
+    :return: (断开次数, 起始位置, 长度)，越小越好；不匹配时返回 None
+    """
+    query, text = query.lower(), text.lower()
+    if query in text:
+        return 0, text.index(query), len(text)
+    pos, gaps, start, last = 0, 0, None, -1
+    for ch in query:
+        i = text.find(ch, pos)
+        if i < 0:
+            return None
+        if start is None:
+            start = i
+        elif i > last + 1:
+            gaps += 1
+        last = i
+        pos = i + 1
+    return gaps, start, len(text)
+
+
+def like_pattern(query):
+    """把 query 转成按顺序包含每个字符的 LIKE 模式，例如 ab -> %a%b%"""
+    chars = [ch for ch in query if not ch.isspace()]
+    escaped = ("\\" + ch if ch in "%_\\" else ch for ch in chars)
+    return "%" + "%".join(escaped) + "%"
+
+
+def like_prefix(path):
+    """匹配 path 下全部路径的 LIKE 模式"""
+    return path.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "/%"
+
+
+class RemoteIndex:
+    """
+    远程目录树的本地索引（SQLite，位于配置文件同目录）
+
+    记录目录的路径、名称与修改时间；刷新时 files=True 的目录树（媒体库）还记录每个文件的大小与哈希，
+    用于复制前按内容查找媒体库中已有的相同文件。后台增量刷新时只重新列出修改时间变化、
+    从未列出或超过 stale_after 秒未列出的目录；搜索与查重完全在本地进行，不产生网络请求。
+    """
+    CANDIDATES = 2000  # 搜索时交给打分排序的最多候选数
+
+    def __init__(self, filename="index.db"):
+        self.filename = filename if filename == ":memory:" else resource_path(filename)
+        self.unlisted = {}  # refresh 的根目录 -> 上次刷新中列出失败的目录（它们原有的记录保持不变）
+        self.conn = sqlite3.connect(self.filename)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                parent TEXT NOT NULL,
+                modified TEXT,         -- 目录的修改时间（来自上级目录的列表）
+                listed_modified TEXT,  -- 上次列出其内容时的修改时间
+                listed_at REAL,        -- 上次列出其内容的时间，NULL 表示从未列出
+                files_listed INTEGER NOT NULL DEFAULT 0  -- 是否已记录其中的文件
+            );
+            CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                parent TEXT NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_parent ON files(parent);
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path TEXT NOT NULL,
+                parent TEXT NOT NULL,
+                algo TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (path, algo)
+            );
+            CREATE INDEX IF NOT EXISTS file_hashes_value ON file_hashes(algo, value);
+            CREATE INDEX IF NOT EXISTS file_hashes_parent ON file_hashes(parent);
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(dirs)")}
+        if "files_listed" not in columns:
+            # 旧版本的索引只记录目录
+            self.conn.execute("ALTER TABLE dirs ADD COLUMN files_listed INTEGER NOT NULL DEFAULT 0")
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+
+    def _needs_listing(self, path, modified, stale_before, files=False):
+        row = self.conn.execute("SELECT listed_modified, listed_at, files_listed FROM dirs WHERE path = ?",
+                                (path,)).fetchone()
+        return row is None or row[1] is None or row[1] < stale_before or (modified and row[0] != modified) or \
+            (files and not row[2])
+
+    def _put_files(self, path, entries):
+        """写入 path 下的文件条目（大小与哈希），已有的同名记录被覆盖"""
+        files = [(str(PurePosixPath(path) / e["name"]), e) for e in entries if not e.get("is_dir")]
+        self.conn.executemany("INSERT OR REPLACE INTO files (path, parent, size) VALUES (?, ?, ?)",
+                              [(file_path, path, e.get("size") or 0) for file_path, e in files])
+        self.conn.executemany("DELETE FROM file_hashes WHERE path = ?", [(file_path,) for file_path, _ in files])
+        self.conn.executemany("INSERT INTO file_hashes (path, parent, algo, value) VALUES (?, ?, ?, ?)",
+                              [(file_path, path, algo, value) for file_path, e in files
+                               for algo, value in parse_hash_info(e).items()])
+
+    def update_dir(self, path, entries, files=False):
+        """
+        记录一次目录列表：更新子目录，删除已不存在的子目录（连同其下的全部目录与文件）
+
+        :param entries: 该目录的全部条目（OpenList /api/fs/list 的 content）
+        :param files: 同时记录其中的文件（替换该目录之前的文件记录）
+        :return: [(子目录路径, 修改时间)]
+        """
+        path = norm_path(path)
+        children = [(str(PurePosixPath(path) / e["name"]), e["name"], e.get("modified") or "")
+                    for e in entries if e.get("is_dir")]
+        names = {name for _, name, _ in children}
+        parent = "" if path == "/" else str(PurePosixPath(path).parent)
+        with self.conn:
+            existing = self.conn.execute("SELECT path, name FROM dirs WHERE parent = ?", (path,)).fetchall()
+            for child_path, name in existing:
+                if name not in names:
+                    prefix = like_prefix(child_path)
+                    self.conn.execute("DELETE FROM dirs WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                                      (child_path, prefix))
+                    for table in ("files", "file_hashes"):
+                        self.conn.execute(f"DELETE FROM {table} WHERE parent = ? OR parent LIKE ? ESCAPE '\\'",
+                                          (child_path, prefix))
+            self.conn.executemany(
+                "INSERT INTO dirs (path, name, parent, modified) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET modified = excluded.modified",
+                [(child_path, name, path, modified) for child_path, name, modified in children])
+            if files:
+                self.conn.execute("DELETE FROM files WHERE parent = ?", (path,))
+                self.conn.execute("DELETE FROM file_hashes WHERE parent = ?", (path,))
+                self._put_files(path, entries)
+            self.conn.execute(
+                "INSERT INTO dirs (path, name, parent, listed_at, files_listed) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET listed_modified = modified, listed_at = excluded.listed_at, "
+                "files_listed = max(files_listed, excluded.files_listed)",
+                (path, PurePosixPath(path).name or "/", parent, time.time(), int(files)))
+        return [(child_path, modified) for child_path, _, modified in children]
+
+    async def refresh(self, api, root, max_depth=8, concurrency=2, stale_after=86400.0, files=False):
+        """
+        增量刷新 root 下的目录树（root 本身每次都列出）
+
+        :param api: OpenListAPI 实例，使用其缓存与请求策略，不要求上游刷新
+        :param concurrency: 同时列出的目录数，保持较低以免影响前台操作
+        :param stale_after: 超过该秒数未列出的目录即使修改时间未变也重新列出
+        :param files: 同时记录文件的大小与哈希（媒体库），之前只记录了目录的也会重新列出一次
+        :return: 本次列出的目录数；列出失败的目录记录在 unlisted[root] 中
+        """
+        root = norm_path(root)
+        stale_before = time.time() - stale_after
+        semaphore = asyncio.Semaphore(concurrency)
+        unlisted = self.unlisted[root] = []
+
+        async def list_dir(path, depth):
+            async with semaphore:
+                try:
+                    return path, depth, [entry async for entry in api.iter_dir(path)]
+                except ListingError as e:
+                    logging.warning(f"索引刷新时{e}，保留该目录原有的记录")
+                    return path, depth, None
+
+        listed = 0
+        pending = {asyncio.ensure_future(list_dir(root, 0))}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    path, depth, entries = task.result()
+                    if entries is None:
+                        # 不能当作空目录处理，否则其下的子目录与文件记录会被全部删除；下次刷新时重新列出
+                        unlisted.append(path)
+                        with self.conn:
+                            self.conn.execute("UPDATE dirs SET listed_at = NULL WHERE path = ?", (path,))
+                        continue
+                    listed += 1
+                    children = self.update_dir(path, entries, files)
+                    if depth >= max_depth:
+                        continue
+                    for child_path, modified in children:
+                        if self._needs_listing(child_path, modified, stale_before, files):
+                            pending.add(asyncio.ensure_future(list_dir(child_path, depth + 1)))
+        finally:
+            for task in pending:
+                task.cancel()
+        logging.info(f"目录索引已更新: {root}，本次列出 {listed} 个目录，索引共 {len(self)} 个目录")
+        if unlisted:
+            logging.warning(f"{root} 下有 {len(unlisted)} 个目录列出失败，索引中仍是它们上次的内容")
+        return listed
+
+    def add_files(self, path, entries):
+        """记录刚复制到 path 的文件，同一次运行中后面的剧集也能查到它们"""
+        with self.conn:
+            self._put_files(norm_path(path), entries)
+
+    def find_duplicate(self, entry, exclude=""):
+        """
+        按大小与哈希查找索引中与 entry 内容相同的文件（没有哈希的条目不查找）
+
+        :param exclude: 不算作重复的路径（例如复制的目标路径本身）
+        :return: 相同文件的路径，没有时返回 None
+        """
+        for algo, value in parse_hash_info(entry).items():
+            row = self.conn.execute(
+                "SELECT f.path FROM file_hashes h JOIN files f ON f.path = h.path "
+                "WHERE h.algo = ? AND h.value = ? AND f.size = ? AND f.path != ? LIMIT 1",
+                (algo, value, entry.get("size") or 0, exclude)).fetchone()
+            if row is not None:
+                return row[0]
+        return None
+
+    def search(self, query, limit=50):
+        """
+        按目录名模糊搜索整个索引
+
+        :return: 目录路径列表，连续匹配、匹配位置靠前、名称较短的排在前面
+        """
+        if not query.strip():
+            return []
+        rows = self.conn.execute(
+            "SELECT path, name FROM dirs WHERE name LIKE ? ESCAPE '\\' LIMIT ?",
+            (like_pattern(query), self.CANDIDATES)).fetchall()
+        needle = "".join(query.split())
+        scored = []
+        for path, name in rows:
+            score = fuzzy_score(needle, name)
+            if score is not None:
+                scored.append((score, path))
+        scored.sort()
+        return [path for _, path in scored[:limit]]
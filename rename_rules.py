@@ -0,0 +1,247 @@
+import os
+import re
+
+# 常见视频扩展
+DEFAULT_VIDEO_EXTS = ('.mp4', '.mkv', '.avi', '.mov', '.flv', '.ts', '.rmvb', '.wmv', '.m4v', '.webm')
+
+# 内置的集数规则，按顺序尝试，第一个匹配的生效。
+# 每条规则必须包含命名分组 ep，可选 ep_end（连集的结束集数）
+BUILTIN_PATTERNS = {
+    # S01E01 / s1e01 / S01E01-E02 / S01E01E02
+    "sxxeyy": r"[Ss](?P<season>\d{1,2})[ ._-]?[Ee](?P<ep>\d{1,5})(?:[-~]?[Ee](?P<ep_end>\d{1,5}))?",
+    # E01-E02 / EP01~EP03 / E01-02
+    "range": r"(?<![A-Za-z])[Ee][Pp]?(?P<ep>\d{1,5})\s*[-~]\s*(?:[Ee][Pp]?)?(?P<ep_end>\d{1,5})(?!\d)",
+    # 第12集 / 第12话 / 第12話 / 第 12 回
+    "chinese": r"第\s*(?P<ep>\d{1,5})\s*[集话話回期]",
+    # EP12 / Ep.12 / E12
+    "ep": r"(?<![A-Za-z])[Ee][Pp]?\.?\s*(?P<ep>\d{1,5})(?!\d)",
+    # 兜底：文件名中最后一段连续数字（原有规则）
+    "last_number": r"(?P<ep>\d+)\D*$",
+}
+DEFAULT_PATTERNS = ("sxxeyy", "range", "chinese", "ep", "last_number")
+
+# 匹配前从文件名中去掉的标签，避免 1080p、x265 之类的数字被当成集数
+DEFAULT_IGNORE = (
+    r"\d{3,4}[PpIi]",
+    r"[248][Kk]",
+    r"[XxHh]\.?26[45]",
+    r"(?i:hevc|avc|aac|flac|dts|hdr10\+?|hdr|dovi|web-?dl|webrip|bluray|remux)",
+    r"\d{1,2}[Bb][Ii][Tt]",
+    r"(?i:ddp?|aac)\d\.\d",
+)
+
+# 季目录名：S2 / S02 / Season 2 / 第2季 / 第二季
+SEASON_PATTERNS = (
+    r"(?i)(?<![a-z])(?:season|s)[ ._-]*(?P<season>\d{1,2})(?!\d)",
+    r"第\s*(?P<season>[0-9零一二三四五六七八九十]+)\s*季",
+)
+# 特典、花絮等目录放入第 0 季（Jellyfin 的 Specials）
+SPECIALS_PATTERN = r"(?i)(?<![a-z])(?:specials?|sp|extras?|ova|oad)(?![a-z])|特典|花絮|番外|特别篇"
+
+CHINESE_DIGITS = "零一二三四五六七八九"
+DIGIT_RUN = re.compile(r"([0-9]+)")
+# 一个目录最多用几条正则完成重命名，超过时逐个文件提交
+MAX_REGEX_RULES = 4
+
+
+def go_replacement(text):
+    """转义为 Go regexp 替换串中的字面量（$ 写作 $$）"""
+    return text.replace("$", "$$")
+
+
+def apply_go_replacement(regex, replacement, name):
+    """在本地模拟 OpenList 服务器（Go regexp.ReplaceAllString）对一个名称的替换，替换串只支持 ${n} 与 $$"""
+    def expand(match):
+        return re.sub(r"\$\{(\d+)\}|\$\$", lambda m: match.group(int(m.group(1))) if m.group(1) else "$",
+                      replacement)
+    return regex.sub(expand, name)
+
+
+def chinese_number(text):
+    """阿拉伯数字或不超过两位的中文数字转为整数，例如 "十二" -> 12，无法识别时返回 None"""
+    if text.isdigit():
+        return int(text)
+    tens, sep, ones = text.partition("十")
+    try:
+        if not sep:
+            return CHINESE_DIGITS.index(text) if len(text) == 1 else None
+        return (CHINESE_DIGITS.index(tens) if tens else 1) * 10 + (CHINESE_DIGITS.index(ones) if ones else 0)
+    except ValueError:
+        return None
+
+
+class RenameRules:
+    """
+    编译好的剧集命名规则：一次运行只编译一次，对整个文件列表批量生成新文件名。
+
+    patterns 为有序规则列表，元素可以是内置规则名（见 BUILTIN_PATTERNS）
+    或包含命名分组 ep 的正则；ignore 为匹配前去掉的标签正则。
+    """
+    def __init__(self, patterns=DEFAULT_PATTERNS, ignore=DEFAULT_IGNORE, video_exts=DEFAULT_VIDEO_EXTS):
+        self.video_exts = frozenset(ext.lower() if ext.startswith(".") else f".{ext.lower()}"
+                                    for ext in video_exts)
+        self.patterns = []
+        for pattern in patterns:
+            regex = re.compile(BUILTIN_PATTERNS.get(pattern, pattern))
+            if "ep" not in regex.groupindex:
+                raise ValueError(f"命名规则缺少命名分组 ep: {pattern}")
+            self.patterns.append(regex)
+        tags = "|".join(f"(?:{tag})" for tag in ignore)
+        # 标签两侧不能紧挨英文字母或数字，中文字符不影响
+        self.ignore = re.compile(rf"(?<![A-Za-z0-9])(?:{tags})(?![A-Za-z0-9])") if tags else None
+        self.season_patterns = [re.compile(pattern) for pattern in SEASON_PATTERNS]
+        self.specials = re.compile(SPECIALS_PATTERN)
+
+    @classmethod
+    def from_config(cls, conf):
+        """从 conf.json 的 rename_rules 配置段构建，缺省项使用默认值"""
+        conf = conf or {}
+        return cls(
+            patterns=conf.get("patterns") or DEFAULT_PATTERNS,
+            ignore=conf.get("ignore", DEFAULT_IGNORE),
+            video_exts=conf.get("video_exts") or DEFAULT_VIDEO_EXTS,
+        )
+
+    def is_video(self, filename):
+        return os.path.splitext(filename)[1].lower() in self.video_exts
+
+    def season_of(self, dirname):
+        """从目录名推断季数，特典等目录为 0，推断不出时返回 None"""
+        for regex in self.season_patterns:
+            match = regex.search(dirname)
+            if match:
+                season = chinese_number(match.group("season"))
+                if season is not None:
+                    return season
+        if self.specials.search(dirname):
+            return 0
+        return None
+
+    def parse(self, filename):
+        """
+        解析文件名
+
+        :return: (集数, 结束集数或 None, 小写扩展名)；不是视频文件或找不到集数时返回 None
+        """
+        name, ext = os.path.splitext(filename)
+        ext_lower = ext.lower()
+        if ext_lower not in self.video_exts:
+            return None
+        if self.ignore is not None:
+            name = self.ignore.sub(" ", name)
+        for regex in self.patterns:
+            match = regex.search(name)
+            if match:
+                ep_end = match.groupdict().get("ep_end")
+                ep = int(match.group("ep"))
+                ep_end = int(ep_end) if ep_end and int(ep_end) > ep else None
+                return ep, ep_end, ext_lower
+        return None
+
+    @staticmethod
+    def format(prefix, season, ep, ep_end, ext, digits=2):
+        """格式化新文件名：TV show S01E01.mp4 / TV show S01E01-E02.mp4"""
+        new_filename = f"{prefix} S{season:02d}E{ep:0{digits}d}"
+        if ep_end is not None:
+            new_filename += f"-E{ep_end:0{digits}d}"
+        return new_filename + ext
+
+    @staticmethod
+    def _digits(parsed, min_digits=2):
+        """集数位数：由最大集数决定，至少 min_digits 位"""
+        max_ep = max((max(p[0], p[1] or 0) for _, p in parsed if p), default=0)
+        return max(min_digits, len(str(max_ep)))
+
+    def plan(self, filenames, prefix, season=1, min_digits=2):
+        """
+        对整个文件列表批量生成重命名计划
+
+        集数位数由最大集数决定（至少 min_digits 位），不再依赖文件总数。
+
+        :return: [{"src_name": 原文件名, "new_name": 新文件名}, ...]，只包含需要改名的文件
+        """
+        parsed = [(filename, self.parse(filename)) for filename in filenames]
+        digits = self._digits(parsed, min_digits)
+        rename_list = []
+        for filename, p in parsed:
+            if p is None:
+                continue
+            new_name = self.format(prefix, season, p[0], p[1], p[2], digits)
+            if new_name != filename:
+                rename_list.append({"src_name": filename, "new_name": new_name})
+        return rename_list
+
+    def regex_plan(self, filenames, prefix, season=1, min_digits=2, max_rules=MAX_REGEX_RULES):
+        """
+        尝试把 plan() 的结果表示为少量正则替换（OpenList /api/fs/regex_rename），请求大小与文件数无关
+
+        文件名除数字外完全相同（只是集数不同）的一组文件用一条正则：集数所在的数字段作为分组，
+        不足位数的在替换串中补 0，每组数字宽度各用一条。生成后在本地按服务器的执行方式
+        依次模拟全部规则，目录中每个条目的结果都与 plan() 一致才采用。
+
+        :param filenames: 目录中全部条目的名称（不需要改名的也要给出，用于确认不会被误匹配）
+        :param max_rules: 最多使用的规则数（例如不超过逐个文件提交时的请求数）
+        :return: [{"src": 原名称正则, "new": 替换串（Go 语法）, "items": 该规则完成的重命名}]；
+                 命名不规则、规则数超过 max_rules 或不少于需要改名的文件数时返回 None
+        """
+        parsed = [(filename, self.parse(filename)) for filename in filenames]
+        digits = self._digits(parsed, min_digits)
+        rename_list = self.plan(filenames, prefix, season, min_digits)
+        renamed = {item["src_name"] for item in rename_list}
+        # 按 (数字以外的部分, 集数所在数字段的宽度) 分组
+        groups = {}
+        for filename, p in parsed:
+            if filename not in renamed:
+                continue
+            ep, ep_end, ext = p
+            if ep_end is not None:
+                return None
+            parts = DIGIT_RUN.split(filename)
+            numbers = parts[1::2]
+            positions = [k for k, number in enumerate(numbers) if int(number) == ep]
+            if not positions:
+                return None
+            groups.setdefault((tuple(parts[0::2]), ext), []).append((filename, ep, numbers, positions))
+        rules = []
+        for (literals, ext), members in groups.items():
+            shared = set(members[0][3]).intersection(*(set(m[3]) for m in members))
+            if not shared:
+                return None
+            k = min(shared)
+            by_width = {}
+            for filename, ep, numbers, _ in members:
+                by_width.setdefault(len(numbers[k]), []).append((filename, ep, numbers))
+            for width, items in sorted(by_width.items()):
+                if width > digits:
+                    return None
+                pattern = []
+                for i, literal in enumerate(literals):
+                    pattern.append(re.escape(literal))
+                    if i == len(literals) - 1:
+                        break
+                    values = {numbers[i] for _, _, numbers in items}
+                    if i == k:
+                        pattern.append(f"([0-9]{{{width}}})")
+                    else:
+                        pattern.append(re.escape(values.pop()) if len(values) == 1 else "[0-9]+")
+                # 新名称以 集数 + 扩展名 结尾，集数之前的部分对整组相同
+                head = self.format(prefix, season, 0, None, ext, digits)[:-(digits + len(ext))]
+                rules.append({"src": f"^{''.join(pattern)}$",
+                              "new": go_replacement(head) + "0" * (digits - width) + "${1}" + go_replacement(ext),
+                              "items": [{"src_name": filename,
+                                         "new_name": self.format(prefix, season, ep, None, ext, digits)}
+                                        for filename, ep, _ in items]})
+        if not rules or len(rules) > max_rules or len(rules) >= len(rename_list):
+            return None
+        # 本地模拟服务器依次执行每条规则，结果必须与逐个文件的计划完全一致
+        expected = {filename: filename for filename in filenames}
+        expected.update({item["src_name"]: item["new_name"] for item in rename_list})
+        current = {filename: filename for filename in filenames}
+        for rule in rules:
+            regex = re.compile(rule["src"])
+            for filename, name in current.items():
+                if regex.search(name):
+                    current[filename] = apply_go_replacement(regex, rule["new"], name)
+        if current != expected:
+            return None
+        return rules
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """熔断器处于打开状态，请求被直接拒绝"""
+
+
+class CircuitBreaker:
+    """
+    简单熔断器：连续失败达到阈值后打开，冷却期内所有请求快速失败；
+    冷却结束后只放行一个试探请求（半开），试探结果出来之前其他请求仍然快速失败，
+    试探成功则关闭，失败则重新打开。
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False  # 半开状态下是否已有试探请求在进行
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        """
+        请求前检查，熔断中时抛出 CircuitOpenError
+
+        :return: 本次请求是否为半开状态下的试探请求（没有结果就结束时需调用 release_probe）
+        """
+        state = self.state
+        if state == "open":
+            remain = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(f"服务器连续失败，熔断中（{remain:.0f}s 后重试）")
+        if state == "half_open":
+            if self.probing:
+                raise CircuitOpenError("服务器连续失败，熔断中（等待试探请求的结果）")
+            self.probing = True
+            return True
+        return False
+
+    def release_probe(self):
+        """试探请求被取消或因意外错误结束、没有结果时，允许下一个请求重新试探"""
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        # 半开状态下试探失败，或连续失败达到阈值，都（重新）打开熔断器
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logging.error(f"连续失败 {self.failures} 次，熔断器打开 {self.reset_timeout:.0f}s")
+            self.opened_at = time.monotonic()
+
+
+class RequestPolicy:
+    """
+    OpenList 请求的统一策略：连接/读取超时、带抖动的指数退避重试与熔断。
+
+    幂等请求（列目录、登录、mkdir 等）在网络错误、限流和 5xx 时重试；
+    非幂等请求（重命名、复制）只在连接未建立时重试，避免重复提交。
+    """
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    # OpenList 常以 code=500 返回业务错误，这些信息说明重试无意义
+    PERMANENT_HINTS = ("not found", "not exist", "password", "permission", "already exists")
+
+    def __init__(self, connect_timeout=5.0, read_timeout=30.0, max_attempts=4,
+                 base_delay=0.5, max_delay=8.0, failure_threshold=5, reset_timeout=30.0):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    @classmethod
+    def from_config(cls, conf):
+        """从 conf.json 的 network 配置段构建，缺省项使用默认值"""
+        conf = conf or {}
+        keys = ("connect_timeout", "read_timeout", "max_attempts", "base_delay",
+                "max_delay", "failure_threshold", "reset_timeout")
+        return cls(**{k: conf[k] for k in keys if k in conf})
+
+    @property
+    def timeout(self):
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def backoff(self, attempt):
+        """第 attempt 次重试前的等待时间（full jitter）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _transient_reason(self, response):
+        """判断响应是否为可重试的临时错误，返回原因或 None"""
+        if response.status_code in self.RETRY_STATUS:
+            return f"HTTP {response.status_code}"
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+        code = data.get("code") if isinstance(data, dict) else None
+        if isinstance(code, int) and (code == 429 or code >= 500):
+            message = str(data.get("message") or data.get("msg") or "")
+            if any(hint in message.lower() for hint in self.PERMANENT_HINTS):
+                return None
+            return f"code {code}: {message}"
+        return None
+
+    async def send(self, call, name, idempotent=True):
+        """
+        按策略执行一次请求
+
+        :param call: 无参协程函数，每次调用发出一次请求并返回 httpx.Response
+        :param name: 日志中显示的请求名称
+        :param idempotent: 是否允许在请求已发出后重试
+        :return: 最后一次的 httpx.Response；重试耗尽的网络错误会继续抛出
+        """
+        start = time.perf_counter()
+        attempt = 1
+        while True:
+            probe = self.breaker.before_call()
+            try:
+                response = await call()
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # 连接未建立，请求没有到达服务器，任何请求都可以安全重试
+                error, reason = e, f"{type(e).__name__}: {e}"
+            except httpx.TransportError as e:
+                if not idempotent:
+                    self.breaker.record_failure()
+                    raise
+                error, reason = e, f"{type(e).__name__}: {e}"
+            except BaseException:
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            else:
+                reason = self._transient_reason(response)
+                if reason is None:
+                    self.breaker.record_success()
+                    self._log_done(name, attempt, start)
+                    return response
+                error = None
+                if not idempotent:
+                    self.breaker.record_failure()
+                    self._log_done(name, attempt, start)
+                    return response
+
+            self.breaker.record_failure()
+            if attempt >= self.max_attempts or self.breaker.state == "open":
+                logging.error(f"请求 {name} 失败（{reason}），已重试 {attempt - 1} 次，"
+                              f"耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+                if error is not None:
+                    raise error
+                return response
+            delay = self.backoff(attempt)
+            logging.warning(f"请求 {name} 失败（{reason}），{delay:.1f}s 后第 {attempt} 次重试")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _log_done(name, attempt, start):
+        elapsed = (time.perf_counter() - start) * 1000
+        if attempt > 1:
+            logging.info(f"请求 {name} 经 {attempt - 1} 次重试后完成，耗时 {elapsed:.0f}ms")
+        else:
+            logging.debug(f"请求 {name} 完成，耗时 {elapsed:.0f}ms")
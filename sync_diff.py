@@ -0,0 +1,50 @@
+import json
+
+
+def parse_hash_info(entry):
+    """
+    读取列表条目中的哈希信息，返回 {算法: 值}
+
+    OpenList 的 hash_info 可能是字典、JSON 字符串或 null，不同存储提供的算法也不同。
+    """
+    info = entry.get("hash_info")
+    if info is None:
+        info = entry.get("hashinfo")
+    if isinstance(info, str):
+        try:
+            info = json.loads(info)
+        except ValueError:
+            return {}
+    if not isinstance(info, dict):
+        return {}
+    return {algo.lower(): str(value).lower() for algo, value in info.items() if value}
+
+
+def same_file(src, dst):
+    """按大小与（双方都提供时的）哈希判断两个条目是否为同一文件"""
+    if src.get("is_dir") or dst.get("is_dir"):
+        return bool(src.get("is_dir")) == bool(dst.get("is_dir"))
+    if src.get("size") != dst.get("size"):
+        return False
+    src_hash, dst_hash = parse_hash_info(src), parse_hash_info(dst)
+    common = src_hash.keys() & dst_hash.keys()
+    return all(src_hash[algo] == dst_hash[algo] for algo in common)
+
+
+def diff_listings(src_entries, dst_entries):
+    """
+    比较源目录与目标目录，返回需要复制与可以跳过的条目
+
+    :return: {"new": [...], "changed": [...], "skipped": [...]}，元素为源条目
+    """
+    dst_by_name = {entry["name"]: entry for entry in dst_entries}
+    diff = {"new": [], "changed": [], "skipped": []}
+    for entry in src_entries:
+        existing = dst_by_name.get(entry["name"])
+        if existing is None:
+            diff["new"].append(entry)
+        elif same_file(entry, existing):
+            diff["skipped"].append(entry)
+        else:
+            diff["changed"].append(entry)
+    return diff
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 项目是平铺的模块，没有安装为包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
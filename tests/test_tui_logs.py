@@ -0,0 +1,41 @@
+import logging
+
+import tui
+
+
+class FakeLog:
+    def __init__(self):
+        self.lines = []
+
+    def write(self, text):
+        self.lines.extend(text.split("\n"))
+
+
+def flush(records):
+    app = tui.FileSelectorApp(None)
+    log = FakeLog()
+    app.query_one = lambda *args: log
+    for text, level, detail in records:
+        app.queue_log(text, level, detail)
+    app.flush_logs()
+    return log.lines
+
+
+def test_detail_errors_are_never_collapsed():
+    count = tui.FileSelectorApp.LOG_DETAIL_LINES + 5
+    lines = flush([(f"校验失败: 第{i}集", logging.ERROR, True) for i in range(count)] +
+                  [(f"复制失败: 第{i}集", logging.WARNING, True) for i in range(count)])
+    assert sum("校验失败" in line for line in lines) == count
+    assert sum("复制失败" in line for line in lines) == count
+    assert not any("明细未显示" in line for line in lines)
+
+
+def test_info_details_and_lines_are_collapsed():
+    app = tui.FileSelectorApp
+    lines = flush([(f"重命名: {i}", logging.INFO, True) for i in range(app.LOG_DETAIL_LINES + 3)] +
+                  [(f"普通 {i}", logging.INFO, False) for i in range(app.LOG_FLUSH_LINES)] +
+                  [("最后的错误", logging.ERROR, False)])
+    assert sum("重命名" in line for line in lines) == app.LOG_DETAIL_LINES
+    assert any("另有 3 条明细未显示" in line for line in lines)
+    assert any("日志过多" in line for line in lines)
+    assert any("最后的错误" in line for line in lines)
@@ -0,0 +1,114 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+
+
+def jwt_expiry(token):
+    """读取 JWT 中的过期时间（exp，Unix 时间戳），不是 JWT 或没有 exp 时返回 None"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+    except (IndexError, ValueError, AttributeError):
+        return None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+class TokenManager:
+    """
+    Token 生命周期管理
+
+    - 本地读取 JWT 的过期时间，未过期时无需请求 /api/me 验证；
+    - 到期前 refresh_margin 秒在后台重新登录换取新 Token；
+    - 请求遇到认证错误时重新登录，同一时刻的多个失败请求只触发一次登录。
+    """
+    def __init__(self, api, credentials=None, on_token=None, refresh_margin=600.0, retry_delay=60.0):
+        """
+        :param api: OpenListAPI 实例
+        :param credentials: {"username": ..., "password": ...}，没有时无法自动重新登录
+        :param on_token: 获得新 Token 后的回调 on_token(token)，用于写回配置
+        :param refresh_margin: 距离过期不足该秒数时视为需要续期
+        :param retry_delay: 后台续期失败后的重试间隔（秒）
+        """
+        self.api = api
+        self.credentials = credentials
+        self.on_token = on_token
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        self._lock = asyncio.Lock()
+        self._refresh_task = None
+
+    @property
+    def can_login(self):
+        return bool(self.credentials and self.credentials.get("username") and self.credentials.get("password"))
+
+    def fresh(self, token):
+        """Token 是 JWT 且距离过期超过 refresh_margin 秒"""
+        exp = jwt_expiry(token) if token else None
+        return exp is not None and exp - time.time() > self.refresh_margin
+
+    def use(self, token):
+        """采用一个有效的 Token，并安排到期前的后台续期"""
+        self.api.token = token
+        self.api.token_status = True
+        self.schedule_refresh()
+
+    async def login(self):
+        """用保存的账号密码重新登录，成功时采用并回调新 Token"""
+        if not self.can_login:
+            return False
+        status_code, token = await self.api.get_token(self.credentials)
+        if status_code != 200 or not token:
+            return False
+        self.use(token)
+        if self.on_token is not None:
+            self.on_token(token)
+        return True
+
+    async def refresh(self, stale_token=None):
+        """
+        重新登录；如果在等待期间 Token 已被其他请求换过，直接视为成功
+
+        :param stale_token: 失败请求使用的旧 Token
+        :return: 当前是否持有新的 Token
+        """
+        async with self._lock:
+            if stale_token is not None and self.api.token and self.api.token != stale_token:
+                return True
+            logging.info("Token 已失效或即将过期，正在重新登录")
+            return await self.login()
+
+    def schedule_refresh(self):
+        """按当前 Token 的过期时间安排后台续期（替换已有的安排）"""
+        if self._refresh_task is not None and self._refresh_task is not asyncio.current_task():
+            self._refresh_task.cancel()
+        self._refresh_task = None
+        if jwt_expiry(self.api.token) is None or not self.can_login:
+            return
+        try:
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+        except RuntimeError:
+            # 不在事件循环中（例如同步代码里设置 Token），等下次续期时再安排
+            pass
+
+    async def _refresh_loop(self):
+        while True:
+            token = self.api.token
+            exp = jwt_expiry(token)
+            if exp is None:
+                return
+            await asyncio.sleep(max(0.0, exp - self.refresh_margin - time.time()))
+            if self.api.token != token:
+                continue  # 等待期间已被换过
+            if await self.refresh(token):
+                logging.info("Token 已在过期前自动续期")
+                return  # use() 已为新 Token 安排了下一次续期
+            logging.warning(f"Token 自动续期失败，{self.retry_delay:.0f}s 后重试")
+            await asyncio.sleep(self.retry_delay)
+
+    def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
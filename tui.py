@@ -2,18 +2,19 @@ from textual import events
 from textual.app import App, ComposeResult
 from textual.containers import Vertical
 from textual.reactive import reactive
-from textual.widgets import Input, RichLog, Static, ListView, ListItem, Label
-from textual.message import Message
+from textual.widgets import Input, RichLog, Static, OptionList, Label
+from textual.widgets.option_list import Option
+from rich.markup import escape
+from collections import deque
 from pathlib import Path
 import logging
 import asyncio
-import oplist_api
+import time
+from typing import TYPE_CHECKING
+from copy_tracker import format_bytes, format_eta
 
-class LogMessage(Message):
-    def __init__(self, text: str, level=logging.INFO):
-        super().__init__()
-        self.text = text
-        self.level = level
+if TYPE_CHECKING:
+    import oplist_api  # 仅用于类型标注，避免启动时导入 httpx
 
 class WelcomeScreen(Static):
     """启动时显示的欢迎界面"""
@@ -52,30 +53,42 @@ class InputDialog(Static):
         await self.remove()
 
 class FileBrowser(Static):
-    """交互式文件管理器"""
+    """交互式文件管理器（按需分页加载，只渲染可见行）"""
     CURSOR_STYLE = "reverse"  # 高亮选中行
+    PAGE_SIZE = 100           # 每次向服务器请求的条目数
+    LOAD_MORE_THRESHOLD = 20  # 光标距已加载末尾不足该行数时加载下一页
+    PREFETCH_DELAY = 0.5      # 在文件夹上停留多久（秒）后预取其内容
+    SEARCH_LIMIT = 50         # 搜索结果最多显示的条数
 
-    def __init__(self, opapi:oplist_api.OpenListAPI, content_dict, callback, **kwargs):
+    def __init__(self, opapi: "oplist_api.OpenListAPI", content_dict, callback, index=None, **kwargs):
         super().__init__(**kwargs)
         self.cur_path = None
         self.vertical = None
         self.list_view = None
         self.cur_path: Label
         self.vertical: Vertical
-        self.list_view: ListView
+        self.list_view: OptionList
         self.callback = callback      # 用户最终选择的回调
-        self.items = content_dict["content"]
         self.opapi = opapi  # OpenList API 实例
+        self.index = index  # RemoteIndex 实例，为 None 时不提供搜索
+        self.search_input: Input
+        self._search_results = None  # 搜索模式下的结果路径列表，None 表示未在搜索
         self.current_path: Path = Path(content_dict["path"])  # 当前路径
+        self._set_content(content_dict)
+        self._loading_more = False
+        self._prefetch_timer = None
 
     def compose(self):
-        self.list_view = ListView(*[
-            ListItem()
-        ], initial_index=0)
+        # OptionList 按行绘制，只渲染可见区域，条目再多也不会创建大量组件
+        self.list_view = OptionList(id="file_list")
 
         self.cur_path = Label(f"当前路径: {self.current_path}", id="current_path")
+        self.search_input = Input(placeholder="输入目录名模糊搜索，↑ ↓ 选择，回车跳转，Esc 取消", id="browser_search")
+        self.search_input.display = False
+        hint = "使用 ↑ ↓ 键选择，→ 进入文件夹，← 返回上级，r 刷新，回车选择"
         self.vertical = Vertical(
-            Label("使用 ↑ ↓ 键选择，→ 进入文件夹，← 返回上级，回车选择"),
+            Label(hint + ("，/ 搜索" if self.index is not None else "")),
+            self.search_input,
             self.list_view,
             self.cur_path
         )
@@ -90,64 +103,284 @@ class FileBrowser(Static):
         icon = "📁" if item["is_dir"] else "📄"
         return f"{icon} {item['name']}"
 
+    def _set_content(self, content_dict):
+        """记录第一页内容与分页状态"""
+        self.items = list(content_dict["content"] or [])
+        total = content_dict.get("total")
+        self.total = total if isinstance(total, int) else len(self.items)
+        self.next_page = 2
+
+    def _highlighted_item(self):
+        """当前目录中高亮的条目，搜索模式下（列表显示的是搜索结果）返回 None"""
+        index = self.list_view.highlighted
+        if self._search_results is not None or index is None or not (0 <= index < len(self.items)):
+            return None
+        return self.items[index]
+
     async def on_key(self, event: events.Key):
         key = event.key
-        if key == "up":
+        if self._search_results is not None:
+            # 搜索模式：输入框中的按键只处理选择与退出，回车由 on_input_submitted 处理
+            if key in ("up", "down"):
+                event.stop()
+                if key == "up":
+                    self.list_view.action_cursor_up()
+                else:
+                    self.list_view.action_cursor_down()
+            elif key == "escape":
+                event.stop()
+                self._close_search()
+            return
+        if key == "slash" and self.index is not None:
+            event.stop()
+            self._open_search()
+        elif key == "up":
             pass
         elif key == "down":
             pass
         elif key == "right":
             # 进入文件夹
-            cur_item = self.items[self.list_view.index]
-            if cur_item["is_dir"]:
-                self.current_path /=  cur_item["name"]
-                new_content = self._load_dir(self.current_path)
-                self.items = new_content["content"]
-                self._refresh_list()
+            cur_item = self._highlighted_item()
+            if cur_item and cur_item["is_dir"]:
+                await self._open_dir(self.current_path / cur_item["name"])
             else:
                 pass
         elif key == "left":
-            self.current_path = Path(self.current_path).parent
-            new_content = self._load_dir(self.current_path)
-            self.items = new_content["content"]
-            self._refresh_list()
+            child_name = self.current_path.name
+            await self._open_dir(Path(self.current_path).parent, focus_name=child_name)
+        elif key == "r":
+            # 跳过缓存，要求 OpenList 重新读取网盘目录
+            await self._open_dir(self.current_path, refresh=True)
         elif key == "enter":
             cur_item = str(self.current_path)
             # 返回选择的对象
             await self.callback(cur_item)
 
+    def _open_search(self):
+        """显示搜索框，列表改为显示搜索结果"""
+        self._search_results = []
+        self.search_input.value = ""
+        self.search_input.display = True
+        self.search_input.focus()
+        self._show_results("")
+
+    def _close_search(self):
+        """隐藏搜索框，恢复当前目录的列表"""
+        self._search_results = None
+        self.search_input.display = False
+        self._refresh_list()
+        self.list_view.focus()
+
+    def _show_results(self, query):
+        start = time.perf_counter()
+        self._search_results = self.index.search(query, self.SEARCH_LIMIT)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.list_view.clear_options()
+        if self._search_results:
+            self.list_view.add_options([f"📁 {escape(path)}" for path in self._search_results])
+            self.list_view.highlighted = 0
+            self.cur_path.update(f"找到 {len(self._search_results)} 个目录（{elapsed:.1f}ms）")
+        else:
+            text = "没有匹配的目录" if query.strip() else f"已索引 {len(self.index)} 个目录，输入名称开始搜索"
+            self.list_view.add_option(Option(text, disabled=True))
+            self.cur_path.update(f"当前路径: {str(self.current_path)}")
+
+    def on_input_changed(self, event: Input.Changed):
+        if event.input is self.search_input and self._search_results is not None:
+            event.stop()
+            self._show_results(event.value)
+
+    async def on_input_submitted(self, event: Input.Submitted):
+        if event.input is not self.search_input or self._search_results is None:
+            return
+        event.stop()
+        index = self.list_view.highlighted
+        if index is None or not (0 <= index < len(self._search_results)):
+            return
+        path = self._search_results[index]
+        self._search_results = None
+        self.search_input.display = False
+        self.list_view.focus()
+        # 直接跳到选中的目录，失败时留在原目录
+        if not await self._open_dir(Path(path)):
+            self._refresh_list()
+
+    async def _open_dir(self, path, refresh=False, focus_name=None):
+        """加载目录第一页并重绘列表，focus_name 为需要高亮的条目名，返回是否加载成功"""
+        new_content = await self._load_dir(path, refresh=refresh)
+        if new_content is None:
+            return False
+        self._set_content(new_content)
+        self._refresh_list()
+        if focus_name:
+            for index, item in enumerate(self.items):
+                if item["name"] == focus_name:
+                    self.list_view.highlighted = index
+                    break
+        return True
+
     def _refresh_list(self):
-        self.list_view.clear()
+        self.list_view.clear_options()
         logging.info(f"进入目录{self.current_path}")
         self.cur_path.update(f"当前路径: {str(self.current_path)}")
         if self.items:
-            for item in self.items:
-                self.list_view.append(ListItem(Label(self._format_name(item))))
-            self.list_view.index = 0
+            self.list_view.add_options([self._format_name(item) for item in self.items])
+            self.list_view.highlighted = 0
         else:
-            self.list_view.append(ListItem(Label("当前目录为空")))
+            self.list_view.add_option(Option("当前目录为空", disabled=True))
         return
 
-    def _load_dir(self, path):
-        """这里模拟获取文件夹内容，实际应请求接口"""
-        self.current_path = path
-        return self.opapi.get_cloud_dir_info(path, password="", page=1, per_page=8, refresh=True)
+    async def _load_dir(self, path, refresh=False, page=1):
+        """异步请求文件夹内容，等待期间不阻塞界面刷新；已访问过的目录直接取缓存"""
+        content = await self.opapi.get_cloud_dir_info(path, password="", page=page,
+                                                      per_page=self.PAGE_SIZE, refresh=refresh)
+        if content is not None and page == 1:
+            self.current_path = Path(path)
+        return content
+
+    def on_option_list_option_highlighted(self, event: OptionList.OptionHighlighted):
+        index = event.option_index
+        # 停留在文件夹上一段时间后预取其内容
+        if self._prefetch_timer is not None:
+            self._prefetch_timer.stop()
+        if self._search_results is not None:
+            # 搜索模式下列表中是搜索结果：预取高亮的结果目录，不加载当前目录的下一页
+            if 0 <= index < len(self._search_results):
+                self._schedule_prefetch(Path(self._search_results[index]))
+            return
+        # 接近已加载末尾时在后台加载下一页
+        if len(self.items) < self.total and index >= len(self.items) - self.LOAD_MORE_THRESHOLD:
+            self.run_worker(self._load_more(), group="load_more")
+        item = self._highlighted_item()
+        if item and item["is_dir"]:
+            self._schedule_prefetch(self.current_path / item["name"])
+
+    def _schedule_prefetch(self, path):
+        self._prefetch_timer = self.set_timer(
+            self.PREFETCH_DELAY,
+            lambda: self.run_worker(self._prefetch(path), group="prefetch", exclusive=True),
+        )
+
+    async def _load_more(self):
+        """加载下一页并追加到列表末尾"""
+        if self._loading_more:
+            return
+        self._loading_more = True
+        path, page = self.current_path, self.next_page
+        try:
+            content = await self._load_dir(path, page=page)
+        finally:
+            self._loading_more = False
+        # 加载期间用户可能已经切换目录
+        if content is None or path != self.current_path or page != self.next_page:
+            return
+        new_items = content["content"] or []
+        if not new_items:
+            self.total = len(self.items)
+            return
+        self.items.extend(new_items)
+        self.next_page += 1
+        self.list_view.add_options([self._format_name(item) for item in new_items])
+
+    async def _prefetch(self, path):
+        """后台预取子目录第一页，写入 API 缓存，进入时即可直接显示"""
+        await self.opapi.get_cloud_dir_info(path, password="", page=1, per_page=self.PAGE_SIZE)
+
+class CopyProgress(Static):
+    """复制任务进度面板，同时复制到多个目标时每个目标一行汇总"""
+    MAX_ROWS = 15  # 最多逐行显示的文件数，其余只计入汇总
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._snaps = {}  # 目标 -> 最近一次 CopyTracker.snapshot()
+
+    def compose(self) -> ComposeResult:
+        yield Static("正在等待复制任务...", id="copy_summary")
+        yield Static("", id="copy_rows")
+
+    @staticmethod
+    def _bar(percent, width=20):
+        filled = int(width * percent / 100)
+        return "█" * filled + "░" * (width - filled)
+
+    def update_progress(self, snap):
+        """根据 CopyTracker.snapshot() 刷新面板"""
+        self._snaps[(snap.get("name", ""), snap["dst_dir"])] = snap
+        summaries = []
+        for snap in self._snaps.values():
+            percent = snap["bytes_done"] / snap["bytes_total"] * 100 if snap["bytes_total"] else 0
+            label = f"[{snap['name']}] " if snap.get("name") else ""
+            summaries.append(escape(f"{label}复制到 {snap['dst_dir']}") + "\n"
+                             f"{self._bar(percent, 30)} {percent:5.1f}%  "
+                             f"完成 {snap['done']}/{snap['total']}  失败 {snap['failed']}  "
+                             f"{format_bytes(snap['rate'])}/s  剩余 {format_eta(snap['eta'])}")
+        self.query_one("#copy_summary", Static).update("\n".join(summaries))
+
+        # 优先显示进行中的，其次等待中的，已完成的排在最后；多个目标时标出所属目标
+        order = {"running": 0, "pending": 1, "failed": 2, "done": 3}
+        many = len(self._snaps) > 1
+        files = [(snap.get("name", ""), f) for snap in self._snaps.values() for f in snap["files"]]
+        total = len(files)
+        files = sorted(files, key=lambda item: order.get(item[1]["state"], 1))[:self.MAX_ROWS]
+        marks = {"running": "▶", "pending": "…", "failed": "✗", "done": "✓"}
+        rows = [f"{marks.get(f['state'], ' ')} {self._bar(f['progress'] if f['state'] != 'done' else 100)} "
+                f"{f['progress'] if f['state'] != 'done' else 100:5.1f}%  {escape((f'[{name}] ' if many else '') + f['name'])}"
+                for name, f in files]
+        if total > len(files):
+            rows.append(f"... 共 {total} 个文件")
+        self.query_one("#copy_rows", Static).update("\n".join(rows))
+
+class MetricsPanel(Static):
+    """请求统计面板：各接口的次数、错误数与耗时分布"""
+    REFRESH_INTERVAL = 1.0  # 显示时的刷新间隔（秒）
+
+    def __init__(self, metrics, **kwargs):
+        super().__init__("暂无请求", markup=False, **kwargs)
+        self.metrics = metrics
+
+    def on_mount(self):
+        self.set_interval(self.REFRESH_INTERVAL, self.refresh_table)
+
+    def refresh_table(self):
+        """只在面板可见时重新生成表格"""
+        if self.display and self.metrics is not None:
+            self.update(self.metrics.format_table())
 
 class FileSelectorApp(App):
     """主TUI应用"""
     CSS_PATH = "style.tcss"
-    BINDINGS = []
+    BINDINGS = [("f2", "toggle_metrics", "请求统计")]
     AUTO_FOCUS = ""
+    LOG_FLUSH_INTERVAL = 0.1  # 日志批量写入界面的间隔（秒）
+    LOG_MAX_LINES = 2000      # 日志区最多保留的行数，更早的行被丢弃
+    LOG_FLUSH_LINES = 200     # 每次最多写入的行数（警告与错误除外），超出部分合并为一行摘要
+    LOG_DETAIL_LINES = 10     # 每次最多显示的明细行（逐个文件的记录，警告与错误除外），其余合并为一行摘要
+    LOG_COLORS = {
+        logging.DEBUG: "cyan",
+        logging.INFO: "green",
+        logging.WARNING: "yellow",
+        logging.ERROR: "red",
+        logging.CRITICAL: "magenta bold",
+    }
 
-    def __init__(self, main_logic):
+    def __init__(self, main_logic, metrics=None):
+        """
+        :param main_logic: 挂载完成后启动的异步主逻辑
+        :param metrics: RequestMetrics 实例，按 F2 显示其统计面板
+        """
         super().__init__()
         self.main_logic = main_logic
+        self.metrics = metrics
+        self.log_file = None      # 完整日志文件路径，用于提示被合并的明细去哪里看
+        self._log_buffer = deque()  # (文本, 级别, 是否明细)，由 queue_log 写入、flush_logs 取出
 
     def compose(self) -> ComposeResult:
         yield Vertical(id="top_area")  # 动态区
-        yield RichLog(id="log_area", highlight=False, auto_scroll=True, markup=True)
+        yield MetricsPanel(self.metrics, id="metrics_panel")  # 请求统计，默认隐藏
+        yield RichLog(id="log_area", highlight=False, auto_scroll=True, markup=True, max_lines=self.LOG_MAX_LINES)
 
     async def on_mount(self) -> None:
+        self.set_interval(self.LOG_FLUSH_INTERVAL, self.flush_logs)
         # 启动时显示欢迎页
         await self.show_welcome()
         # 启动逻辑
@@ -163,27 +396,63 @@ class FileSelectorApp(App):
         await self.clear_top()
         await self.mount(InputDialog(prompt, callback, default_value, placeholder, id="input_dialog"))
 
-    async def show_file_browser(self, opapi: oplist_api.OpenListAPI, content_dict, callback):
-        """显示文件浏览器"""
+    async def show_file_browser(self, opapi: "oplist_api.OpenListAPI", content_dict, callback, index=None):
+        """显示文件浏览器，给出 index（RemoteIndex）时可按 / 搜索"""
         await self.clear_top()
         top_area = self.query_one("#top_area", Vertical)
-        file_browser = FileBrowser(opapi, content_dict, callback, id="file_browser")
+        file_browser = FileBrowser(opapi, content_dict, callback, index=index, id="file_browser")
         await top_area.mount(file_browser)
 
+    async def show_copy_progress(self):
+        """显示复制进度面板（已显示时沿用，多个目标共用一个面板）"""
+        if self.query(CopyProgress):
+            return
+        await self.clear_top()
+        top_area = self.query_one("#top_area", Vertical)
+        await top_area.mount(CopyProgress(id="copy_progress"))
+
+    def update_copy_progress(self, snap):
+        """刷新复制进度面板（面板不存在时忽略）"""
+        for panel in self.query(CopyProgress):
+            panel.update_progress(snap)
+
+    def action_toggle_metrics(self):
+        """显示/隐藏请求统计面板"""
+        panel = self.query_one("#metrics_panel", MetricsPanel)
+        panel.display = not panel.display
+        panel.refresh_table()
+
     async def clear_top(self):
         """清空顶部区域"""
         top_area = self.query_one("#top_area", Vertical)
         await top_area.remove_children()
 
-    def on_log_message(self, message: LogMessage) -> None:
-        """渲染日志消息"""
-        log_area = self.query_one("#log_area", RichLog)
-        colors = {
-            logging.DEBUG: "cyan",
-            logging.INFO: "green",
-            logging.WARNING: "yellow",
-            logging.ERROR: "red",
-            logging.CRITICAL: "magenta bold",
-        }
-        style = colors.get(message.level, "white")
-        log_area.write(f"[{style}]{message.text}")
\ No newline at end of file
+    def queue_log(self, text, level=logging.INFO, detail=False):
+        """暂存一条日志，等待下次 flush_logs 批量写入；可在任意线程调用"""
+        self._log_buffer.append((text, level, detail))
+
+    def flush_logs(self):
+        """把暂存的日志一次性写入日志区，明细与超出上限的普通行合并为摘要（警告与错误总是显示）"""
+        if not self._log_buffer:
+            return
+        lines = []
+        details = hidden_details = hidden = 0
+        while self._log_buffer:
+            text, level, detail = self._log_buffer.popleft()
+            # 警告与错误不受明细与行数上限限制，日志文件默认不开启，省略后就再也看不到
+            if detail and level < logging.WARNING:
+                if details >= self.LOG_DETAIL_LINES:
+                    hidden_details += 1
+                    continue
+                details += 1
+            if level < logging.WARNING and len(lines) >= self.LOG_FLUSH_LINES:
+                hidden += 1
+                continue
+            style = self.LOG_COLORS.get(level, "white")
+            lines.append(f"[{style}]{escape(text)}[/]")
+        where = f"，完整内容见 {escape(self.log_file)}" if self.log_file else ""
+        if hidden_details:
+            lines.append(f"[dim]... 另有 {hidden_details} 条明细未显示{where}[/]")
+        if hidden:
+            lines.append(f"[dim]... 日志过多，省略 {hidden} 行{where}[/]")
+        self.query_one("#log_area", RichLog).write("\n".join(lines))
\ No newline at end of file
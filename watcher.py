@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import PurePosixPath
+
+from create_conf import resource_path
+from dir_cache import ListingError, norm_path
+
+PER_PAGE = 200  # 服务器限制了每页数量时按页读取
+
+
+def listing_digest(entries):
+    """
+    一次目录列表的摘要，与条目顺序无关
+
+    子目录按名称、文件只按大小计入：整理时重命名文件不算变化，新增、删除或替换文件才算。
+    """
+    lines = sorted(f"d\0{e['name']}" if e.get("is_dir") else f"f\0{e.get('size', 0)}" for e in entries)
+    return hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+async def list_dir(api, path):
+    """
+    不要求上游刷新地列出一个目录（refresh=False，只跳过本地缓存），失败时返回 None
+
+    per_page=0 时 OpenList 一次返回全部条目，大目录（例如 base_dir）也只需一个请求；
+    请求失败或分页不完整时返回 None，避免把获取失败当成目录被清空。
+    """
+    api.dir_cache.invalidate(path)
+    first = await api.get_cloud_dir_info(path, page=1, per_page=0)
+    if first is None:
+        return None
+    total = first.get("total")
+    if not isinstance(total, int) or total <= len(first["content"]):
+        return first["content"]
+    try:
+        return [entry async for entry in api.iter_dir(path, per_page=PER_PAGE)]
+    except ListingError as e:
+        logging.warning(str(e))
+        return None
+
+
+class ShareWatcher:
+    """
+    base_dir 的变化检测（监视模式），状态保存在配置文件同目录的 JSON 文件中
+
+    每轮只列出 base_dir 本身；其下每个分享目录按修改时间判断是否变化，没变的整棵子树不再列出。
+    变化的目录逐层列出，子目录同样按修改时间剪枝，再用各层列表的摘要判断内容是否真的变化。
+    新出现或内容变化的目录在 settle 秒内没有再变化（上传、转存完成）后交给 ready() 返回。
+
+    第一次运行时 base_dir 中已有的目录记为基线，不做处理，之后的变化也不跟踪。
+    """
+    def __init__(self, root, filename="watch.json", settle=300.0, max_depth=3, rescan_after=86400.0,
+                 concurrency=4, persist=True):
+        """
+        :param settle: 目录内容保持不变多少秒后才处理
+        :param max_depth: 分享目录下最多列出的层数（季子目录等）
+        :param rescan_after: 超过该秒数未列出的目录即使修改时间未变也重新列出（多数存储的修改时间不向上层传递）
+        :param persist: False 时只在内存中记录（预演模式）
+        """
+        self.root = norm_path(root)
+        self.filename = resource_path(filename)
+        self.settle = settle
+        self.max_depth = max_depth
+        self.rescan_after = rescan_after
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.persist = persist
+        self.shows = {}  # 分享目录路径 -> 记录，见 poll()
+        self.listed = 0  # 累计列出的目录数
+        self.baseline = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.filename):
+            self.baseline = True
+            return
+        try:
+            with open(self.filename, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"监视状态文件读取失败，将重新建立基线: {e}")
+            self.baseline = True
+            return
+        if state.get("root") != self.root:
+            logging.warning(f"监视目录由 {state.get('root')} 改为 {self.root}，将重新建立基线")
+            self.baseline = True
+            return
+        self.shows = state.get("shows", {})
+        for record in self.shows.values():
+            if record["status"] == "running":
+                # 上次处理到一半就退出了，重新处理（操作日志中的检查点会跳过已完成的步骤）
+                record["status"] = "pending"
+
+    def save(self):
+        if not self.persist:
+            return
+        tmp = self.filename + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"root": self.root, "shows": self.shows}, f, ensure_ascii=False)
+            os.replace(tmp, self.filename)
+        except OSError as e:
+            logging.error(f"监视状态保存失败: {e}")
+
+    async def _list(self, api, path):
+        async with self.semaphore:
+            self.listed += 1
+            return await list_dir(api, path)
+
+    async def _scan(self, api, path, modified, dirs, seen, depth, now):
+        """
+        列出 path 并递归处理修改时间有变化（或超过 rescan_after 未列出）的子目录
+
+        :param modified: path 在上级目录列表中的修改时间，列出成功后才记录，失败时下次仍会重新列出
+        :param dirs: 上次的各目录记录 {相对路径: {"modified", "digest", "listed_at", "files"}}，原地更新
+        :param seen: 本次仍然存在的相对路径
+        :return: False 表示有目录列出失败
+        """
+        entries = await self._list(api, path)
+        if entries is None:
+            return False
+        rel = self._rel(path)
+        seen.add(rel)
+        dirs[rel] = {"modified": modified, "digest": listing_digest(entries), "listed_at": now,
+                     "files": sum(not e.get("is_dir") for e in entries)}
+        if depth >= self.max_depth:
+            return True
+        jobs = []
+        for entry in entries:
+            if not entry.get("is_dir"):
+                continue
+            child = str(PurePosixPath(path) / entry["name"])
+            child_rel = self._rel(child)
+            seen.add(child_rel)
+            record = dirs.get(child_rel)
+            modified = entry.get("modified") or ""
+            if record is None or record["modified"] != modified or now - record["listed_at"] > self.rescan_after:
+                jobs.append(self._scan(api, child, modified, dirs, seen, depth + 1, now))
+            else:
+                # 修改时间没变：沿用上次的摘要，连同其下的子目录都不再列出
+                seen.update(r for r in dirs if r.startswith(child_rel + "/"))
+        return all(await asyncio.gather(*jobs))
+
+    def _rel(self, path):
+        return str(PurePosixPath(path).relative_to(self.root))
+
+    async def _scan_show(self, api, path, record, now):
+        """重新计算一个分享目录的摘要（各层列表摘要的摘要），失败时返回 None"""
+        dirs, seen = record.setdefault("dirs", {}), set()
+        if not await self._scan(api, path, record["modified"], dirs, seen, 0, now):
+            return None
+        for rel in set(dirs) - seen:
+            del dirs[rel]
+        return hashlib.sha1("\n".join(f"{rel}\0{dirs[rel]['digest']}" for rel in sorted(dirs)).encode()).hexdigest()
+
+    async def poll(self, api):
+        """
+        检查一轮变化：只列出 base_dir 与修改时间有变化的分享目录
+
+        :return: 本轮列出的目录数；base_dir 列出失败时返回 None
+        """
+        now = time.time()
+        listed = self.listed
+        entries = await self._list(api, self.root)
+        if entries is None:
+            logging.error(f"无法列出监视目录 {self.root}，跳过本轮")
+            return None
+        current = {str(PurePosixPath(self.root) / e["name"]): e.get("modified") or ""
+                   for e in entries if e.get("is_dir")}
+        for path in set(self.shows) - set(current):
+            logging.info(f"分享目录已不存在，停止跟踪: {path}")
+            del self.shows[path]
+        if self.baseline:
+            for path, modified in current.items():
+                self.shows[path] = {"status": "baseline", "modified": modified}
+            self.baseline = False
+            logging.info(f"首次监视 {self.root}：已有的 {len(current)} 个目录记为基线，不做处理")
+            self.save()
+            return self.listed - listed
+
+        async def check(path, modified):
+            record = self.shows.get(path)
+            if record is None:
+                record = self.shows[path] = {"status": "new", "modified": modified, "digest": None,
+                                             "ingested_digest": None, "changed_at": now}
+                logging.info(f"发现新的分享目录: {path}")
+            elif record["status"] == "baseline":
+                return
+            elif record["modified"] == modified and now - record.get("listed_at", 0) <= self.rescan_after:
+                return
+            # 目录里的各层都按子目录修改时间剪枝，因此这里的请求数与变化的目录数成正比
+            record["modified"] = modified
+            digest = await self._scan_show(api, path, record, now)
+            if digest is None:
+                logging.warning(f"{path} 列出失败，下一轮再检查")
+                record["modified"] = ""
+                return
+            record["listed_at"] = now
+            record["files"] = sum(d.get("files", 0) for d in record["dirs"].values())
+            if digest != record["digest"]:
+                record["digest"] = digest
+                record["changed_at"] = now
+                if digest != record["ingested_digest"] and not record["files"] and record["status"] == "done":
+                    # 文件已被整理移走（传输方式 auto 的服务器端移动），没有需要处理的内容
+                    record["ingested_digest"] = digest
+                elif digest != record["ingested_digest"]:
+                    if record["status"] in ("done", "failed"):
+                        logging.info(f"分享目录内容有变化: {path}")
+                    record["status"] = "pending"
+
+        await asyncio.gather(*(check(path, modified) for path, modified in current.items()))
+        self.save()
+        return self.listed - listed
+
+    def ready(self, now=None):
+        """内容已稳定 settle 秒、等待处理的分享目录，返回后标记为处理中，处理完用 finish() 记录结果"""
+        now = now or time.time()
+        paths = [path for path, record in self.shows.items()
+                 if record["status"] in ("new", "pending") and record.get("files")
+                 and now - record["changed_at"] >= self.settle]
+        for path in paths:
+            self.shows[path].update(status="running", running_digest=self.shows[path]["digest"])
+        return paths
+
+    def waiting(self):
+        """有变化但尚未稳定的分享目录数"""
+        return sum(record["status"] in ("new", "pending") for record in self.shows.values())
+
+    def name(self, path):
+        """上次处理时使用的剧集目录名，内容增加后再次处理时沿用，以免目录名中的集数变化"""
+        return self.shows.get(path, {}).get("name")
+
+    def finish(self, path, ok, name=""):
+        """
+        记录一次处理的结果
+
+        以开始处理时的摘要作为已处理的内容，处理期间新增的文件会在下一轮被发现并再次处理；
+        失败的目录在内容再次变化后重试。
+        """
+        record = self.shows.get(path)
+        if record is None:
+            return
+        record["ingested_digest"] = record.pop("running_digest", record["digest"])
+        record["status"] = "done" if ok else "failed"
+        if ok and name:
+            record["name"] = name
+        self.save()